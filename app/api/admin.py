@@ -0,0 +1,269 @@
+"""
+Admin API endpoints
+Handles the meme coin registry (one coin per pet IP) and the advertisement campaign catalog
+"""
+from fastapi import APIRouter, Depends, Body, Header, HTTPException
+from app.async_db import (
+    insert_coin,
+    get_registered_coins,
+    set_coin_active,
+    upsert_ad_campaign,
+    get_ad_campaigns,
+    set_ad_campaign_active,
+    DatabaseBusyError
+)
+from app.services.coin_service import invalidate_coin_registry
+from app.services.advertisement_service import invalidate_ad_catalog
+from typing import List, Dict, Optional
+from pydantic import BaseModel
+import hmac
+import os
+import sqlite3
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+# Request Models
+class CoinRegistryRequest(BaseModel):
+    """Request model for registering a meme coin"""
+    symbol: str
+    name: str
+    address: str
+    image_url: str = ""
+
+
+class AdCampaignRequest(BaseModel):
+    """Request model for creating or replacing an advertisement campaign"""
+    ad_id: str
+    title: str
+    ad_text: str
+    banner_image_url: str = ""
+    category: str
+    min_followers: int = 0
+    max_followers: Optional[int] = None  # exclusive; None = no upper bound
+    keywords: List[str] = []  # required phrases for post verification
+    is_active: bool = True
+
+
+# Dependency Injection
+def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """
+    관리자 API 키 검증
+    - 환경변수 ADMIN_API_KEY가 없으면 관리자 API 전체가 비활성화됩니다.
+    """
+    expected = os.getenv("ADMIN_API_KEY")
+    if not expected:
+        raise HTTPException(status_code=503, detail="Admin API is disabled (ADMIN_API_KEY not set)")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
+@router.get("/coins", dependencies=[Depends(require_admin)])
+async def list_registered_coins(include_inactive: bool = False) -> List[Dict]:
+    """
+    Get all coins in the registry
+    
+    Args:
+        include_inactive: Also return delisted coins
+    
+    Returns:
+        List[Dict]: Coin registry records
+    """
+    try:
+        return await get_registered_coins(active_only=not include_inactive)
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch coin registry: {str(e)}"
+        )
+
+
+@router.post("/coins", dependencies=[Depends(require_admin)])
+async def register_coin(
+    coin: CoinRegistryRequest = Body(..., description="Coin to register"),
+) -> Dict:
+    """
+    Register a new meme coin
+    
+    **기능:**
+    - 펫 IP에 연결된 밈코인을 레지스트리에 추가합니다.
+    - 등록 즉시 `GET /coins` 목록과 가격 조회 대상에 포함됩니다.
+    
+    Args:
+        coin: Coin data containing symbol, name, address and optional image_url
+    
+    Returns:
+        Dict: Status and saved record ID
+    """
+    if not coin.symbol.strip():
+        raise HTTPException(status_code=400, detail="Coin symbol is required")
+    if not coin.name.strip():
+        raise HTTPException(status_code=400, detail="Coin name is required")
+    if not coin.address.strip() or "," in coin.address:
+        raise HTTPException(status_code=400, detail="A single token address is required")
+    
+    try:
+        saved_id = await insert_coin(
+            symbol=coin.symbol.strip(),
+            name=coin.name.strip(),
+            address=coin.address.strip(),
+            image_url=coin.image_url
+        )
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail="Coin address is already registered")
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: Failed to register coin. {str(e)}"
+        )
+    
+    invalidate_coin_registry()
+    return {
+        "status": "success",
+        "saved_id": saved_id,
+        "message": "Coin registered successfully"
+    }
+
+
+@router.delete("/coins/{address}", dependencies=[Depends(require_admin)])
+async def delist_coin(address: str) -> Dict:
+    """
+    Delist a coin (the registry row is kept so it can be listed again)
+    
+    Args:
+        address: Token contract address
+    
+    Returns:
+        Dict: Status message
+    """
+    try:
+        found = await set_coin_active(address, False)
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: Failed to delist coin. {str(e)}"
+        )
+    if not found:
+        raise HTTPException(status_code=404, detail="Coin not found")
+    
+    invalidate_coin_registry()
+    return {
+        "status": "success",
+        "message": "Coin delisted successfully"
+    }
+
+
+@router.get("/campaigns", dependencies=[Depends(require_admin)])
+async def list_ad_campaigns(include_inactive: bool = False) -> List[Dict]:
+    """
+    Get all advertisement campaigns
+    
+    Args:
+        include_inactive: Also return stopped campaigns
+    
+    Returns:
+        List[Dict]: Campaign records
+    """
+    try:
+        return await get_ad_campaigns(active_only=not include_inactive)
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch ad campaigns: {str(e)}"
+        )
+
+
+@router.post("/campaigns", dependencies=[Depends(require_admin)])
+async def save_ad_campaign(
+    campaign: AdCampaignRequest = Body(..., description="Campaign to create or replace"),
+) -> Dict:
+    """
+    Create an advertisement campaign, or replace the one with the same ad_id
+    
+    **기능:**
+    - 캠페인은 팔로워 구간 [min_followers, max_followers) 에 속한 크리에이터에게 추천됩니다.
+    - 저장 즉시 카탈로그 버전이 올라가 각 워커의 구간 인덱스가 재구축됩니다.
+    
+    Args:
+        campaign: Campaign data
+    
+    Returns:
+        Dict: Status and whether the campaign was newly created
+    """
+    if not campaign.ad_id.strip():
+        raise HTTPException(status_code=400, detail="ad_id is required")
+    if not campaign.title.strip() or not campaign.ad_text.strip():
+        raise HTTPException(status_code=400, detail="title and ad_text are required")
+    if not campaign.category.strip():
+        raise HTTPException(status_code=400, detail="category is required")
+    if campaign.min_followers < 0:
+        raise HTTPException(status_code=400, detail="min_followers must be non-negative")
+    if campaign.max_followers is not None and campaign.max_followers <= campaign.min_followers:
+        raise HTTPException(status_code=400, detail="max_followers must be greater than min_followers")
+    
+    data = {
+        "ad_id": campaign.ad_id.strip(),
+        "title": campaign.title.strip(),
+        "ad_text": campaign.ad_text,
+        "banner_image_url": campaign.banner_image_url,
+        "category": campaign.category.strip(),
+        "min_followers": campaign.min_followers,
+        "max_followers": campaign.max_followers,
+        "keywords": [keyword.strip() for keyword in campaign.keywords if keyword.strip()],
+        "is_active": campaign.is_active
+    }
+    
+    try:
+        created = await upsert_ad_campaign(data)
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: Failed to save ad campaign. {str(e)}"
+        )
+    
+    invalidate_ad_catalog()
+    return {
+        "status": "success",
+        "created": created,
+        "message": "Ad campaign saved successfully"
+    }
+
+
+@router.delete("/campaigns/{ad_id}", dependencies=[Depends(require_admin)])
+async def stop_ad_campaign(ad_id: str) -> Dict:
+    """
+    Stop an advertisement campaign (the row is kept so it can be restarted)
+    
+    Args:
+        ad_id: Campaign ID
+    
+    Returns:
+        Dict: Status message
+    """
+    try:
+        found = await set_ad_campaign_active(ad_id, False)
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: Failed to stop ad campaign. {str(e)}"
+        )
+    if not found:
+        raise HTTPException(status_code=404, detail="Ad campaign not found")
+    
+    invalidate_ad_catalog()
+    return {
+        "status": "success",
+        "message": "Ad campaign stopped successfully"
+    }
@@ -1,10 +1,54 @@
-from fastapi import APIRouter, Depends, Body
-from app.services.advertisement_service import AdvertisementService
+from fastapi import APIRouter, Depends, Body, Query, HTTPException
+from fastapi.responses import JSONResponse
+from app.async_db import save_ad_selection, get_ad_event_counters, DatabaseBusyError
+from app.services.ad_events import ad_event_ingestor, EVENT_TYPES
+from app.services.advertisement_service import (
+    AdvertisementService,
+    CHANNEL_TIER_KEYS,
+    get_selected_campaign,
+    load_ad_catalog
+)
 from app.services.social_service import SocialService
 from typing import Optional, List, Dict
+from pydantic import BaseModel
+import asyncio
+import time
+import numpy as np
 
 router = APIRouter(prefix="/advertisements", tags=["advertisements"])
 
+# 대량 단가 견적 제한
+MAX_PRICING_CREATORS = 100_000
+MAX_PRICING_USERNAMES = 1000  # 채널 볼륨 조회가 필요한 사용자명 입력 상한
+
+# 노출/클릭 이벤트 배치 상한
+MAX_AD_EVENT_BATCH = 1000
+# 이 시간보다 미래의 이벤트 시각은 거부 (클라이언트 시계 오차 허용 범위)
+AD_EVENT_MAX_CLOCK_SKEW_SECONDS = 300
+
+
+# Request Models
+class BulkPricingRequest(BaseModel):
+    """대량 광고 단가 견적 요청 (followers/engagement_rates 배열 또는 usernames)"""
+    followers: Optional[List[int]] = None
+    engagement_rates: Optional[List[float]] = None
+    usernames: Optional[List[str]] = None
+    tier_multipliers: Optional[Dict[str, float]] = None  # small / medium / large
+    include_breakdown: bool = False  # base_price / engagement_bonus 배열도 반환
+
+
+class AdEvent(BaseModel):
+    """광고 노출/클릭 이벤트 1건"""
+    type: str  # impression / click
+    ad_id: str
+    username: str  # 광고를 게시한 크리에이터
+    ts: Optional[int] = None  # 발생 시각 (Unix 초, 없으면 수신 시각)
+
+
+class AdEventBatchRequest(BaseModel):
+    """광고 이벤트 배치"""
+    events: List[AdEvent]
+
 
 # Dependency Injection을 위한 함수들
 def get_advertisement_service() -> AdvertisementService:
@@ -20,6 +64,8 @@ def get_social_service() -> SocialService:
 @router.get("/recommendations/{username}")
 async def get_advertisement_recommendations(
     username: str,
+    category: Optional[str] = Query(None, description="특정 광고 카테고리만 추천"),
+    rank_by_content: bool = Query(True, description="최근 트윗과 광고 문구의 관련도 순으로 정렬"),
     advertisement_service: AdvertisementService = Depends(get_advertisement_service)
 ):
     """
@@ -28,10 +74,13 @@ async def get_advertisement_recommendations(
     **기능:**
     1. 사용자 채널 볼륨 분석 (팔로워, 참여율 등)
     2. 채널 볼륨에 맞춰 광고 단가 계산
-    3. 맞춤 광고 목록 제공 (텍스트 + 배너 이미지)
+    3. 팔로워 구간이 맞는 캠페인을 카탈로그 인덱스에서 조회 (텍스트 + 배너 이미지)
+    4. 최근 트윗 내용과 광고 문구의 관련도(relevance_score) 순으로 정렬
     
     Args:
         username: X(Twitter) 사용자명
+        category: 광고 카테고리 필터 (선택)
+        rank_by_content: 관련도 정렬 여부 (기본값: True)
     
     Returns:
         {
@@ -54,7 +103,11 @@ async def get_advertisement_recommendations(
                     "banner_image_url": "배너 이미지 URL",
                     "pricing": 단가,
                     "category": "카테고리",
-                    "suitable_for": "적합한 채널 규모"
+                    "suitable_for": "적합한 채널 규모",
+                    "min_followers": 최소 팔로워 수,
+                    "max_followers": 최대 팔로워 수 (null이면 상한 없음),
+                    "keywords": ["검증 키워드", ...],
+                    "relevance_score": 트윗-광고 관련도 (0~1, 정렬하지 않으면 null)
                 },
                 ...
             ]
@@ -70,10 +123,15 @@ async def get_advertisement_recommendations(
             engagement_rate=channel_volume["engagement_rate"]
         )
         
-        # 3. 맞춤 광고 목록 제공
-        advertisements = advertisement_service.get_recommended_advertisements(
+        # 3. 맞춤 광고 목록 제공 (최근 트윗 관련도 순)
+        tweets = None
+        if rank_by_content:
+            tweets = await advertisement_service.get_creator_tweets(username)
+        advertisements = await advertisement_service.get_recommended_advertisements(
             username=username,
-            channel_volume=channel_volume
+            channel_volume=channel_volume,
+            category=category,
+            tweets=tweets
         )
         
         return {
@@ -90,6 +148,219 @@ async def get_advertisement_recommendations(
         }
 
 
+@router.post("/pricing/bulk")
+async def quote_bulk_pricing(
+    request: BulkPricingRequest = Body(..., description="견적 대상 크리에이터"),
+    advertisement_service: AdvertisementService = Depends(get_advertisement_service)
+):
+    """
+    여러 크리에이터의 광고 단가를 한 번에 견적하는 API
+    
+    **기능:**
+    - followers와 engagement_rates 배열(같은 길이)을 받아 NumPy로 한 번에 단가를 계산합니다.
+    - 배열 대신 usernames를 보내면 각 사용자의 채널 볼륨을 조회해 계산합니다.
+    - tier_multipliers로 채널 규모(small <5천, medium <2만, large)별 배율을 지정할 수 있습니다.
+    - 응답은 열(column) 단위 배열입니다. JSON 직렬화 비용을 줄이기 위해 단가 세부 항목은
+      include_breakdown=true일 때만 포함됩니다.
+    
+    Returns:
+        {
+            "count": 크리에이터 수,
+            "usernames", "followers", "engagement_rates": 조회한 채널 볼륨 (usernames 입력 시),
+            "tier": 채널 규모 배열 ("small" | "medium" | "large"),
+            "base_price", "engagement_bonus": 세부 단가 배열 (include_breakdown 시),
+            "total_price": 총 단가 배열,
+            "summary": { "total": 총합, "mean": 평균, "min": 최소, "max": 최대 }
+        }
+    """
+    if request.tier_multipliers:
+        unknown = set(request.tier_multipliers) - set(CHANNEL_TIER_KEYS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown tier(s): {', '.join(sorted(unknown))}. Use: {', '.join(CHANNEL_TIER_KEYS)}"
+            )
+        if any(not np.isfinite(value) or value < 0 for value in request.tier_multipliers.values()):
+            raise HTTPException(status_code=400, detail="tier_multipliers must be non-negative numbers")
+    
+    usernames = None
+    if request.usernames is not None:
+        if request.followers is not None or request.engagement_rates is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Send either usernames or followers/engagement_rates, not both"
+            )
+        if len(request.usernames) > MAX_PRICING_USERNAMES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many usernames (max {MAX_PRICING_USERNAMES})"
+            )
+        usernames = request.usernames
+        unique_usernames = list(dict.fromkeys(usernames))
+        try:
+            volumes = await asyncio.gather(*[
+                advertisement_service.get_user_channel_volume(username)
+                for username in unique_usernames
+            ])
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"채널 볼륨 조회에 실패했습니다: {str(e)}")
+        volume_by_username = dict(zip(unique_usernames, volumes))
+        followers = np.array([volume_by_username[u]["followers"] for u in usernames], dtype=np.float64)
+        engagement_rates = np.array([volume_by_username[u]["engagement_rate"] for u in usernames], dtype=np.float64)
+    else:
+        if request.followers is None or request.engagement_rates is None:
+            raise HTTPException(
+                status_code=400,
+                detail="followers and engagement_rates are required when usernames is not given"
+            )
+        if len(request.followers) != len(request.engagement_rates):
+            raise HTTPException(
+                status_code=400,
+                detail="followers and engagement_rates must have the same length"
+            )
+        followers = np.asarray(request.followers, dtype=np.float64)
+        engagement_rates = np.asarray(request.engagement_rates, dtype=np.float64)
+    
+    if len(followers) > MAX_PRICING_CREATORS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many creators (max {MAX_PRICING_CREATORS})"
+        )
+    
+    invalid = (followers < 0) | ~np.isfinite(engagement_rates) | (engagement_rates < 0)
+    if invalid.any():
+        index = int(np.argmax(invalid))
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid followers/engagement_rate at index {index}"
+        )
+    
+    quote = advertisement_service.calculate_ad_pricing_bulk(
+        followers, engagement_rates, request.tier_multipliers
+    )
+    total_price = quote["total_price"]
+    tier_names = np.array(CHANNEL_TIER_KEYS)
+    
+    content = {"count": int(len(total_price))}
+    if usernames is not None:
+        content["usernames"] = usernames
+        content["followers"] = followers.astype(np.int64).tolist()
+        content["engagement_rates"] = engagement_rates.tolist()
+    content["tier"] = tier_names[quote["tier"]].tolist()
+    if request.include_breakdown:
+        content["base_price"] = quote["base_price"].tolist()
+        content["engagement_bonus"] = quote["engagement_bonus"].tolist()
+    content.update({
+        "total_price": total_price.tolist(),
+        "summary": {
+            "total": round(float(total_price.sum()), 2),
+            "mean": round(float(total_price.mean()), 2) if len(total_price) else 0.0,
+            "min": float(total_price.min()) if len(total_price) else 0.0,
+            "max": float(total_price.max()) if len(total_price) else 0.0
+        }
+    })
+    
+    # 큰 배열은 jsonable_encoder를 거치지 않고 바로 직렬화
+    return JSONResponse(content=content)
+
+
+@router.post("/events")
+async def ingest_ad_events(request: AdEventBatchRequest):
+    """
+    광고 노출/클릭 이벤트 수집 API
+    
+    **기능:**
+    - 이벤트 배치를 로컬 append-only 로그에 한 번에 기록합니다. (이벤트마다 DB 쓰기 없음)
+    - 동시에 들어온 배치는 fsync 한 번으로 함께 디스크에 반영되며, 응답은 반영 후 반환됩니다.
+    - 백그라운드 컴팩터가 로그를 캠페인/크리에이터별 카운터로 집계합니다. (수 초 지연)
+    - 잘못된 이벤트만 rejected로 반환하고 나머지는 저장합니다.
+    
+    Args:
+        request: {"events": [{"type": "impression" | "click", "ad_id", "username", "ts"}]}
+    
+    Returns:
+        {
+            "status": "success",
+            "accepted": 저장한 이벤트 수,
+            "rejected": [{"index": 배치 내 위치, "reason": "거부 사유"}]
+        }
+    """
+    if len(request.events) > MAX_AD_EVENT_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"한 번에 최대 {MAX_AD_EVENT_BATCH}개의 이벤트까지 전송할 수 있습니다."
+        )
+    
+    try:
+        catalog = await load_ad_catalog()
+        now = int(time.time())
+        
+        accepted = []
+        rejected = []
+        for index, event in enumerate(request.events):
+            if event.type not in EVENT_TYPES:
+                reason = f"지원하지 않는 이벤트 유형입니다: {event.type}"
+            elif event.ad_id not in catalog.by_id:
+                reason = "존재하지 않거나 종료된 광고입니다."
+            elif not event.username:
+                reason = "username이 비어 있습니다."
+            elif event.ts is not None and (event.ts <= 0 or event.ts > now + AD_EVENT_MAX_CLOCK_SKEW_SECONDS):
+                reason = "이벤트 시각이 올바르지 않습니다."
+            else:
+                accepted.append({
+                    "type": event.type,
+                    "ad_id": event.ad_id,
+                    "username": event.username,
+                    "ts": event.ts if event.ts is not None else now
+                })
+                continue
+            rejected.append({"index": index, "reason": reason})
+        
+        if accepted:
+            await ad_event_ingestor.ingest(accepted)
+        
+        return {
+            "status": "success",
+            "accepted": len(accepted),
+            "rejected": rejected
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"이벤트 저장 중 오류가 발생했습니다: {str(e)}")
+
+
+@router.get("/events/counters")
+async def get_ad_event_stats(
+    ad_id: Optional[str] = Query(None, description="캠페인 ID"),
+    username: Optional[str] = Query(None, description="크리에이터 사용자명"),
+    start_day: Optional[str] = Query(None, description="시작일 (YYYY-MM-DD, UTC)"),
+    end_day: Optional[str] = Query(None, description="종료일 (YYYY-MM-DD, UTC)")
+):
+    """
+    광고 노출/클릭 집계 조회 API
+    
+    **기능:**
+    - 컴팩터가 집계한 캠페인/크리에이터별 노출 수, 클릭 수, CTR을 반환합니다.
+    - 아직 컴팩션되지 않은 최근 이벤트(수 초 분량)는 포함되지 않습니다.
+    
+    Returns:
+        {
+            "counters": [
+                {"ad_id", "username", "impressions", "clicks", "ctr", "last_event_ts"}
+            ]
+        }
+    """
+    try:
+        counters = await get_ad_event_counters(ad_id, username, start_day, end_day)
+        return {"counters": counters}
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"집계 조회 중 오류가 발생했습니다: {str(e)}")
+
+
 @router.post("/select")
 async def select_advertisement(
     username: str = Body(..., description="사용자명"),
@@ -101,8 +372,8 @@ async def select_advertisement(
     사용자가 선택한 광고 저장 API
     
     **기능:**
-    - 사용자가 선택한 광고 정보를 저장합니다.
-    - 이후 게시물 평가 시 선택한 광고와 매칭하여 검증합니다.
+    - 사용자가 선택한 광고 정보를 DB에 저장합니다. (사용자당 진행 중인 선택은 1개)
+    - 이후 게시물 평가 시 선택한 광고의 키워드/배너로 검증합니다.
     
     Args:
         username: 사용자명
@@ -122,19 +393,11 @@ async def select_advertisement(
         }
     """
     try:
-        # 실제로는 DB에 저장하지만, 현재는 Mock으로 처리
-        # TODO: 데이터베이스에 광고 선택 정보 저장
+        catalog = await load_ad_catalog()
+        if ad_id not in catalog.by_id:
+            raise HTTPException(status_code=404, detail="존재하지 않거나 종료된 광고입니다.")
         
-        from datetime import datetime
-        
-        selected_ad = {
-            "ad_id": ad_id,
-            "username": username,
-            "wallet_address": wallet_address,
-            "selected_at": datetime.now().isoformat()
-        }
-        
-        print(f"📝 광고 선택 저장: {selected_ad}")
+        selected_ad = await save_ad_selection(username, ad_id, wallet_address)
         
         return {
             "status": "success",
@@ -142,6 +405,10 @@ async def select_advertisement(
             "selected_ad": selected_ad
         }
         
+    except HTTPException:
+        raise
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         return {
             "status": "error",
@@ -167,23 +434,30 @@ async def get_selected_advertisement(
             "selected_ad": {
                 "ad_id": "광고 ID",
                 "selected_at": "선택 시간",
-                ...
+                "wallet_address": "지갑 주소",
+                "title", "ad_text", "banner_image_url", "category", "keywords": 캠페인 정보
             }
         }
     """
     try:
-        # 실제로는 DB에서 조회하지만, 현재는 Mock으로 처리
-        # TODO: 데이터베이스에서 광고 선택 정보 조회
+        selected_ad = await get_selected_campaign(username)
+        
+        if selected_ad is None:
+            return {
+                "username": username,
+                "selected_ad": None,
+                "message": "선택한 광고가 없습니다."
+            }
         
         return {
             "username": username,
-            "selected_ad": None,  # 현재는 Mock
-            "message": "선택한 광고가 없습니다."
+            "selected_ad": selected_ad
         }
         
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         return {
             "error": str(e),
             "message": "광고 조회 중 오류가 발생했습니다."
         }
-
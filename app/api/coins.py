@@ -2,12 +2,26 @@
 Coins API endpoints for meme coin market
 Handles coin listing, purchase recording, and purchase history
 """
-from fastapi import APIRouter, Depends, Body, HTTPException
-from app.services.coin_service import CoinService
-from app.db import insert_purchase, get_history_by_username
-from typing import List, Dict
+from fastapi import APIRouter, Depends, Body, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.services.coin_service import CoinService, get_price_snapshot
+from app.services.price_stream import price_hub, PRICE_POLL_INTERVAL_SECONDS
+from app.services.price_history import price_history, RESOLUTIONS
+from app.async_db import (
+    insert_purchase,
+    insert_purchases_batch,
+    get_history_by_username,
+    get_holdings_by_username,
+    get_user_volume,
+    get_coin_volume_stats,
+    get_volume_buckets,
+    DatabaseBusyError
+)
+from typing import List, Dict, Optional
 from pydantic import BaseModel
+import asyncio
 import sqlite3
+import time
 
 router = APIRouter(prefix="/coins", tags=["coins"])
 
@@ -28,6 +42,21 @@ class PurchaseResponse(BaseModel):
     message: str
 
 
+class PurchaseBatchRequest(BaseModel):
+    """Request model for bulk purchase ingestion"""
+    purchases: List[PurchaseRequest]
+
+
+# Upper bound on rows accepted by POST /coins/purchase/batch
+MAX_PURCHASE_BATCH_SIZE = 5000
+MAX_PURCHASE_AMOUNT = 1e15  # Prevent unrealistic values
+
+# Volume analytics bucket widths (seconds) and limits
+ANALYTICS_INTERVALS = {"minute": 60, "hour": 3600, "day": 86400}
+ANALYTICS_DEFAULT_RANGE_SECONDS = 24 * 3600
+ANALYTICS_MAX_BUCKETS = 10000
+
+
 # Dependency Injection
 def get_coin_service() -> CoinService:
     """CoinService 인스턴스 생성 및 반환"""
@@ -57,6 +86,10 @@ async def get_coins(
             - liquidity: Current liquidity in USD
     """
     try:
+        # Serve the background poller's snapshot while it is fresh
+        snapshot = get_price_snapshot(max_age=PRICE_POLL_INTERVAL_SECONDS * 2)
+        if snapshot is not None:
+            return snapshot
         coins = await coin_service.get_coin_list()
         return coins
     except Exception as e:
@@ -66,6 +99,43 @@ async def get_coins(
         )
 
 
+@router.get("/stream")
+async def stream_coin_prices(request: Request) -> StreamingResponse:
+    """
+    Server-Sent Events stream of live coin prices
+    
+    **기능:**
+    - 백그라운드 폴러가 가져온 가격 업데이트를 실시간으로 푸시합니다.
+    - 접속 직후 최신 스냅샷을 먼저 보내고, 이후 갱신될 때마다 `prices` 이벤트를 보냅니다.
+    - 느린 클라이언트는 최신 스냅샷만 받도록 병합되며, 읽지 않는 클라이언트는 연결이 끊깁니다.
+    
+    Returns:
+        StreamingResponse: text/event-stream with `prices` events
+            (data: {"type": "prices", "timestamp": ..., "coins": [...]})
+    """
+    subscriber = price_hub.subscribe()
+    
+    async def event_stream():
+        try:
+            while not subscriber.closed.is_set():
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                yield frame
+        finally:
+            price_hub.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/purchase")
 async def purchase_coin(
     purchase: PurchaseRequest = Body(..., description="Purchase transaction data"),
@@ -103,7 +173,7 @@ async def purchase_coin(
         
         if purchase.amount <= 0:
             raise HTTPException(status_code=400, detail="Amount must be greater than 0")
-        if purchase.amount > 1e15:  # Prevent unrealistic values
+        if purchase.amount > MAX_PURCHASE_AMOUNT:
             raise HTTPException(status_code=400, detail="Amount too large")
         
         if not purchase.tx_hash or not purchase.tx_hash.strip():
@@ -111,12 +181,16 @@ async def purchase_coin(
         
         # Save to database
         try:
-            saved_id = insert_purchase(
+            saved_id = await insert_purchase(
                 username=purchase.username,
                 coin_symbol=purchase.coin_symbol.upper(),
                 amount=purchase.amount,
                 tx_hash=purchase.tx_hash
             )
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=409, detail="Purchase with this transaction hash already exists")
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -138,17 +212,115 @@ async def purchase_coin(
         )
 
 
+def _validate_purchase_batch(purchases: List[PurchaseRequest]) -> List[Optional[str]]:
+    """
+    Validate a purchase batch in one pass, with the same checks as /purchase
+    
+    Returns:
+        List[Optional[str]]: Error message per item, None if the item is valid
+    """
+    errors = []
+    for p in purchases:
+        if not p.username.strip():
+            errors.append("Username is required")
+        elif not p.coin_symbol.strip():
+            errors.append("Coin symbol is required")
+        elif not p.amount > 0:  # also rejects NaN
+            errors.append("Amount must be greater than 0")
+        elif p.amount > MAX_PURCHASE_AMOUNT:
+            errors.append("Amount too large")
+        elif not p.tx_hash.strip():
+            errors.append("Transaction hash is required")
+        else:
+            errors.append(None)
+    return errors
+
+
+@router.post("/purchase/batch")
+async def purchase_coin_batch(
+    batch: PurchaseBatchRequest = Body(..., description="Confirmed purchase transactions"),
+) -> Dict:
+    """
+    Record many coin purchase transactions at once
+    
+    **기능:**
+    - 인덱서가 확인한 온체인 구매 트랜잭션을 한 번의 요청으로 저장합니다.
+    - 모든 항목을 한 번에 검증한 뒤, 유효한 항목을 단일 트랜잭션(executemany)으로 저장합니다.
+    - 이미 저장된 tx_hash는 중복으로 건너뛰므로 같은 트랜잭션을 다시 보내도 안전합니다.
+    
+    Args:
+        batch: {"purchases": [PurchaseRequest, ...]} (최대 MAX_PURCHASE_BATCH_SIZE개)
+    
+    Returns:
+        Dict: Batch result containing:
+            - status: "success"
+            - created / duplicates / errors: Counts per outcome
+            - results: Per-item {index, status ("created" | "duplicate" | "error"),
+              saved_id, error} in request order
+    """
+    purchases = batch.purchases
+    if not purchases:
+        raise HTTPException(status_code=400, detail="At least one purchase is required")
+    if len(purchases) > MAX_PURCHASE_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large (max {MAX_PURCHASE_BATCH_SIZE} purchases)"
+        )
+    
+    errors = _validate_purchase_batch(purchases)
+    valid_indexes = [i for i, error in enumerate(errors) if error is None]
+    
+    try:
+        inserted = await insert_purchases_batch([
+            (purchases[i].username, purchases[i].coin_symbol.upper(), purchases[i].amount, purchases[i].tx_hash)
+            for i in valid_indexes
+        ])
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Database error: Failed to save purchases. {str(e)}"
+        )
+    
+    results = [
+        {"index": i, "status": "error", "saved_id": None, "error": error}
+        for i, error in enumerate(errors)
+    ]
+    for i, row in zip(valid_indexes, inserted):
+        results[i] = {"index": i, "status": row["status"], "saved_id": row["id"], "error": row.get("error")}
+    
+    created = sum(1 for row in inserted if row["status"] == "created")
+    duplicates = sum(1 for row in inserted if row["status"] == "duplicate")
+    return {
+        "status": "success",
+        "created": created,
+        "duplicates": duplicates,
+        "errors": len(purchases) - created - duplicates,
+        "results": results
+    }
+
+
 @router.get("/history/{username}")
-async def get_purchase_history(username: str) -> Dict:
+async def get_purchase_history(
+    username: str,
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of records per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    coin_symbol: Optional[str] = Query(None, description="Only return purchases of this coin")
+) -> Dict:
     """
     Get purchase history for a specific user
     
     **기능:**
-    - 특정 사용자의 모든 밈코인 구매 내역을 조회합니다.
+    - 특정 사용자의 밈코인 구매 내역을 페이지 단위로 조회합니다.
     - 최신 구매 내역부터 정렬하여 반환합니다.
+    - 다음 페이지는 응답의 `next_cursor`를 `cursor`로 전달하여 조회합니다.
     
     Args:
         username: Username to query purchase history for
+        limit: Page size (1~500)
+        cursor: Opaque pagination cursor
+        coin_symbol: Optional coin filter (e.g., "BONK")
     
     Returns:
         Dict: Purchase history containing:
@@ -159,17 +331,32 @@ async def get_purchase_history(username: str) -> Dict:
                 - amount: Amount purchased
                 - tx_hash: Transaction hash
                 - created_at: Purchase timestamp
+            - total_purchases: Number of records in this page
+            - next_cursor: Cursor for the next page (None on the last page)
+            - has_more: Whether more records exist
     """
     try:
         if not username or not username.strip():
             raise HTTPException(status_code=400, detail="Username is required")
         
-        purchases = get_history_by_username(username)
+        try:
+            page = await get_history_by_username(
+                username,
+                limit=limit,
+                cursor=cursor,
+                coin_symbol=coin_symbol.strip() if coin_symbol else None
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         
         return {
             "username": username,
-            "purchases": purchases,
-            "total_purchases": len(purchases)
+            "purchases": page["purchases"],
+            "total_purchases": len(page["purchases"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["next_cursor"] is not None
         }
         
     except HTTPException:
@@ -180,3 +367,278 @@ async def get_purchase_history(username: str) -> Dict:
             detail=f"Failed to fetch purchase history: {str(e)}"
         )
 
+
+@router.get("/portfolio/{username}")
+async def get_portfolio(
+    username: str,
+    coin_service: CoinService = Depends(get_coin_service)
+) -> Dict:
+    """
+    Get a user's coin holdings valued in USD
+    
+    **기능:**
+    - 구매 시 함께 갱신되는 집계 테이블(user_coin_totals)에서 코인별 보유량을 읽습니다.
+    - 메모리에 있는 최신 가격 스냅샷과 결합하여 USD 평가액을 계산합니다.
+    - 보유량 집계는 사용자별로 캐시되며, 새 구매가 저장되면 무효화됩니다.
+    
+    Args:
+        username: Username to value holdings for
+    
+    Returns:
+        Dict: Portfolio containing:
+            - username: Username
+            - holdings: List of {coin_symbol, name, address, amount, priceUsd,
+              priceChange24h, valueUsd} ordered by value
+            - total_value_usd: Sum of all holding values
+    """
+    try:
+        if not username or not username.strip():
+            raise HTTPException(status_code=400, detail="Username is required")
+        
+        try:
+            holdings = await get_holdings_by_username(username)
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        prices = get_price_snapshot(max_age=PRICE_POLL_INTERVAL_SECONDS * 2)
+        if prices is None and holdings:
+            prices = await coin_service.get_coin_list()
+        price_map = {coin["symbol"].upper(): coin for coin in prices or []}
+        
+        valued = []
+        total_value = 0.0
+        for holding in holdings:
+            coin = price_map.get(holding["coin_symbol"])
+            try:
+                price = float(coin["priceUsd"]) if coin else None
+            except (TypeError, ValueError):
+                price = None
+            value = holding["amount"] * price if price is not None else 0.0
+            total_value += value
+            valued.append({
+                "coin_symbol": holding["coin_symbol"],
+                "name": coin["name"] if coin else None,
+                "address": coin["address"] if coin else None,
+                "amount": holding["amount"],
+                "priceUsd": price,
+                "priceChange24h": coin.get("priceChange24h", 0) if coin else 0,
+                "valueUsd": round(value, 6)
+            })
+        
+        valued.sort(key=lambda x: x["valueUsd"], reverse=True)
+        
+        return {
+            "username": username,
+            "holdings": valued,
+            "total_value_usd": round(total_value, 6)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch portfolio: {str(e)}"
+        )
+
+
+@router.get("/volume/{username}")
+async def get_user_volume_summary(username: str) -> Dict:
+    """
+    Get a user's total purchase volume per coin
+    
+    **기능:**
+    - 구매 트랜잭션과 같은 트랜잭션에서 갱신되는 집계 테이블을 조회합니다.
+    - 구매 내역 전체를 스캔하지 않으므로 내역 크기와 무관하게 일정한 시간에 응답합니다.
+    
+    Args:
+        username: Username to summarize
+    
+    Returns:
+        Dict: Volume summary containing:
+            - username: Username
+            - coins: List of {coin_symbol, total_amount, purchase_count}
+            - total_purchases: Purchase count across all coins
+    """
+    try:
+        if not username or not username.strip():
+            raise HTTPException(status_code=400, detail="Username is required")
+        
+        try:
+            coins = await get_user_volume(username)
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        return {
+            "username": username,
+            "coins": coins,
+            "total_purchases": sum(coin["purchase_count"] for coin in coins)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch purchase volume: {str(e)}"
+        )
+
+
+@router.get("/stats")
+async def get_coin_stats(
+    coin_symbol: Optional[str] = Query(None, description="특정 코인 심볼만 조회")
+) -> Dict:
+    """
+    Get platform-wide purchase statistics per coin
+    
+    **기능:**
+    - 코인별 총 구매량, 구매 횟수, 보유자 수를 집계 테이블에서 바로 반환합니다.
+    - coin_symbol을 지정하면 해당 코인 한 건만 반환합니다.
+    
+    Args:
+        coin_symbol: Optional coin symbol filter
+    
+    Returns:
+        Dict: Statistics containing:
+            - coins: List of {coin_symbol, total_amount, purchase_count, holder_count}
+              ordered by total_amount
+    """
+    try:
+        try:
+            coins = await get_coin_volume_stats(coin_symbol)
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        if coin_symbol and not coins:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No purchases found for coin {coin_symbol.upper()}"
+            )
+        
+        return {"coins": coins}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch coin stats: {str(e)}"
+        )
+
+
+@router.get("/analytics/volume")
+async def get_volume_analytics(
+    interval: str = Query("hour", description="Bucket size: " + ", ".join(ANALYTICS_INTERVALS)),
+    start: Optional[int] = Query(None, description="Start time (Unix seconds, inclusive)"),
+    end: Optional[int] = Query(None, description="End time (Unix seconds, exclusive)"),
+    coin_symbol: Optional[str] = Query(None, description="특정 코인 심볼만 집계")
+) -> Dict:
+    """
+    Get purchase volume and trade counts per coin over time
+    
+    **기능:**
+    - 구매 내역을 분/시간/일 단위 구간으로 묶어 코인별 거래량과 거래 횟수를 반환합니다.
+    - 정수 타임스탬프(created_ts) 커버링 인덱스만 읽어 집계하므로 테이블을 스캔하지 않습니다.
+    - start를 생략하면 end 기준 최근 24시간, end를 생략하면 현재 시각까지 조회합니다.
+    
+    Args:
+        interval: Bucket size (minute, hour, day)
+        start: Optional start of the time range
+        end: Optional end of the time range
+        coin_symbol: Optional coin symbol filter
+    
+    Returns:
+        Dict: Analytics containing:
+            - interval, start, end: Effective query parameters
+            - buckets: List of {coin_symbol, bucket_start, volume, trade_count}
+              ordered by coin_symbol and bucket_start (empty buckets omitted)
+    """
+    try:
+        if interval not in ANALYTICS_INTERVALS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported interval. Use one of: {', '.join(ANALYTICS_INTERVALS)}"
+            )
+        bucket_seconds = ANALYTICS_INTERVALS[interval]
+        
+        end_ts = end if end is not None else int(time.time()) + 1
+        start_ts = start if start is not None else end_ts - ANALYTICS_DEFAULT_RANGE_SECONDS
+        if start_ts >= end_ts:
+            raise HTTPException(status_code=400, detail="start must be before end")
+        if (end_ts - start_ts) // bucket_seconds > ANALYTICS_MAX_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Time range too large for {interval} buckets (max {ANALYTICS_MAX_BUCKETS})"
+            )
+        
+        try:
+            buckets = await get_volume_buckets(start_ts, end_ts, bucket_seconds, coin_symbol)
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        return {
+            "interval": interval,
+            "start": start_ts,
+            "end": end_ts,
+            "buckets": buckets
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch volume analytics: {str(e)}"
+        )
+
+
+@router.get("/{address}/candles")
+async def get_coin_candles(
+    address: str,
+    resolution: str = Query("1h", description="Candle size: " + ", ".join(RESOLUTIONS)),
+    start: Optional[int] = Query(None, description="Start time (Unix seconds, inclusive)"),
+    end: Optional[int] = Query(None, description="End time (Unix seconds, inclusive)"),
+    limit: int = Query(300, ge=1, le=5000, description="Maximum number of candles")
+) -> Dict:
+    """
+    Get OHLC price candles for a coin chart
+    
+    **기능:**
+    - 가격 갱신 때마다 기록된 시계열에서 미리 집계된 OHLC 캔들을 반환합니다.
+    - 원본 가격 포인트를 스캔하지 않고 해상도별 롤업 파일만 조회합니다.
+    
+    Args:
+        address: Solana token contract address
+        resolution: Candle resolution (1m, 5m, 15m, 1h, 4h, 1d)
+        start: Optional start of the time range
+        end: Optional end of the time range
+        limit: Maximum number of candles (most recent first in range)
+    
+    Returns:
+        Dict: Candles containing:
+            - address: Token address
+            - resolution: Candle resolution
+            - candles: List of {time, open, high, low, close} ordered by time
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported resolution. Use one of: {', '.join(RESOLUTIONS)}"
+        )
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    try:
+        # memmap reads can block on disk, so keep them off the event loop
+        candles = await asyncio.to_thread(price_history.get_candles, address, resolution, start, end, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch price history: {str(e)}"
+        )
+    
+    return {
+        "address": address,
+        "resolution": resolution,
+        "candles": candles
+    }
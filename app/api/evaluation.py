@@ -1,8 +1,16 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
+from app.async_db import record_evaluation, get_reward_status, DatabaseBusyError
 from app.services.ai_service import AIService
 from app.services.social_service import SocialService
 from app.services.contract_service import ContractService
+from app.services.advertisement_service import get_selected_campaign
+from app.services.reward_dispatcher import reward_dispatcher
+from app.metrics import EVALUATION_STAGE_SECONDS, StageTimer
 from typing import Optional
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/evaluation", tags=["evaluation"])
 
@@ -18,19 +26,13 @@ def get_social_service() -> SocialService:
     return SocialService()
 
 
-def get_contract_service() -> ContractService:
-    """ContractService 인스턴스 생성 및 반환"""
-    return ContractService()
-
-
 @router.post("/analyze/{username}")
 async def analyze_pet_account(
     username: str,
     wallet_address: str = Body(..., description="보상을 받을 지갑 주소"),
     required_keyword: Optional[str] = Body(None, description="필수 광고 키워드 (선택사항)"),
     ai_service: AIService = Depends(get_ai_service),
-    social_service: SocialService = Depends(get_social_service),
-    contract_service: ContractService = Depends(get_contract_service)
+    social_service: SocialService = Depends(get_social_service)
 ):
     """
     펫 계정 분석 및 보상 지급 워크플로우 API
@@ -38,30 +40,36 @@ async def analyze_pet_account(
     **보상 지급 프로세스 1~6단계:**
     1. 데이터 수집: SocialService를 통해 사용자 정보와 게시물을 가져옵니다.
     2. 광고 검증: 게시물이 특정 광고 문구와 배너 이미지를 포함했는지 확인합니다.
+       (required_keyword가 없으면 사용자가 선택한 광고의 키워드/배너를 사용합니다.)
     3. 정량 데이터 확인: 팔로워, 좋아요, 리포스트 등의 수치 데이터를 확보합니다.
     4. 정성 평가 (AI): Gemini를 통해 게시물의 품질을 점수화합니다.
-    5. 최종 점수 산정 & 컨트랙트 전송: (정량 점수 + 정성 점수)로 Total Score를 계산하여 컨트랙트로 보냅니다.
-    6. 결과 반환: 컨트랙트가 지급한 토큰 개수와 트랜잭션 해시를 반환합니다.
+    5. 최종 점수 산정 & 보상 기록: (정량 점수 + 정성 점수)로 Total Score를 계산하고,
+       평가와 보상을 같은 트랜잭션으로 보상 아웃박스에 기록합니다.
+       (컨트랙트 전송은 백그라운드 디스패처가 재시도/확인 추적과 함께 처리합니다.)
+    6. 결과 반환: 체인 확인을 기다리지 않고 평가 ID와 보상 상태(pending)를 바로 반환합니다.
+       보상 진행 상황은 GET /evaluation/rewards/{evaluation_id}로 조회합니다.
     
     Args:
         username: 분석할 펫 계정의 X(Twitter) 사용자명
         wallet_address: 보상을 받을 지갑 주소
-        required_keyword: 필수 광고 키워드 (선택사항, 기본값: None)
+        required_keyword: 필수 광고 키워드 (선택사항, 기본값: None이면 선택한 광고의 키워드 사용)
         ai_service: AIService 의존성 주입
         social_service: SocialService 의존성 주입
-        contract_service: ContractService 의존성 주입
     
     Returns:
         {
+            "evaluation_id": "평가 ID",
             "username": "사용자명",
-            "verification": { "is_ad_verified": true },
+            "verification": { "is_ad_verified": true, "has_banner": true, "ad_id": "ad_001" },
             "scores": { "social_score": 00, "ai_score": 00, "final_score": 00 },
-            "reward": { "tx_hash": "0x...", "amount": 500 }
+            "reward": { "status": "pending", "amount": 500, "tx_hash": null, "status_url": "/evaluation/rewards/{evaluation_id}" }
         }
     """
+    stages = StageTimer(EVALUATION_STAGE_SECONDS)
     try:
         # ===== 1단계: 데이터 수집 =====
-        print(f"\n📊 [1단계] 데이터 수집 시작: @{username}")
+        stages.start("collect")
+        logger.debug("[1단계] 데이터 수집 시작", extra={"stage": "collect", "username": username})
         stats = await social_service.get_user_data(username)
         tweets = await social_service.get_user_tweets(username, max_results=20)
         
@@ -72,10 +80,19 @@ async def analyze_pet_account(
             }
         
         # ===== 2단계: 광고 검증 (Ad Verification) =====
-        print(f"\n✅ [2단계] 광고 검증 시작")
+        stages.start("ad_verification")
+        logger.debug("[2단계] 광고 검증 시작", extra={"stage": "ad_verification"})
         is_ad_verified = False
         has_banner = False
         
+        # 키워드가 지정되지 않은 경우, 사용자가 선택한 광고의 키워드/배너 사용
+        selected_ad = None
+        if not required_keyword:
+            try:
+                selected_ad = await get_selected_campaign(username)
+            except Exception as e:
+                logger.warning("선택한 광고 조회 실패: %s", e, extra={"username": username})
+        
         if required_keyword:
             # 최근 트윗들에서 필수 키워드 검색
             for tweet in tweets[:5]:  # 최근 5개 트윗만 확인
@@ -83,8 +100,15 @@ async def analyze_pet_account(
                 if social_service.verify_ad_compliance(tweet_text, required_keyword):
                     is_ad_verified = True
                     break
+        elif selected_ad and selected_ad["keywords"]:
+            logger.debug("선택한 광고로 검증", extra={"ad_id": selected_ad["ad_id"], "keywords": selected_ad["keywords"]})
+            for tweet in tweets[:5]:
+                tweet_text = tweet.get("text", "")
+                if any(social_service.verify_ad_compliance(tweet_text, keyword) for keyword in selected_ad["keywords"]):
+                    is_ad_verified = True
+                    break
         else:
-            # 키워드가 지정되지 않은 경우, 기본 홍보 키워드로 확인
+            # 선택한 광고도 없는 경우, 기본 홍보 키워드로 확인
             promotion_keywords = ["광고", "홍보", "협찬", "제공", "sponsored", "ad", "promotion"]
             for tweet in tweets[:5]:
                 tweet_text = tweet.get("text", "")
@@ -93,13 +117,15 @@ async def analyze_pet_account(
                     break
         
         # 배너 이미지 검증 (Mock: 항상 True)
-        has_banner = social_service.verify_banner_image()
+        has_banner = social_service.verify_banner_image(
+            selected_ad["banner_image_url"] if selected_ad else None
+        )
         
         # 광고 검증 통과 여부 (키워드 또는 배너 중 하나라도 있으면 통과)
         is_ad_verified = is_ad_verified or has_banner
         
         # ===== 3단계: 정량 데이터 확인 =====
-        print(f"\n📈 [3단계] 정량 데이터 확인")
+        stages.start("social_score")
         # stats None 체크 추가
         if not stats:
             stats = {}
@@ -107,12 +133,15 @@ async def analyze_pet_account(
         social_reach_score = stats.get("reach_score", 0.0)  # 0~10 점수
         social_score = (social_reach_score / 10.0) * 100 if social_reach_score > 0 else 0.0  # 0~100 점수로 변환
         
-        print(f"   - 팔로워 수: {stats.get('followers', 0):,}명")
-        print(f"   - 참여율: {stats.get('engagement_rate', 0):.2f}%")
-        print(f"   - 소셜 점수: {social_score:.2f}/100")
+        logger.debug("[3단계] 정량 데이터 확인", extra={
+            "stage": "social_score",
+            "followers": stats.get("followers", 0),
+            "engagement_rate": stats.get("engagement_rate", 0),
+            "social_score": social_score
+        })
         
         # ===== 4단계: 정성 평가 (AI) =====
-        print(f"\n🤖 [4단계] 정성 평가 (AI) 시작")
+        stages.start("ai_evaluation")
         ai_result = await ai_service.evaluate_content_quality(username, stats, tweets)
         ai_score = ai_result.get("quality_score", 85)
         identity_score = ai_result.get("identity_score", 0)
@@ -120,42 +149,54 @@ async def analyze_pet_account(
         safety_score = ai_result.get("safety_score", 0)
         analysis_summary = ai_result.get("analysis_summary", "분석 결과 없음")
         
-        print(f"   - AI 품질 점수: {ai_score}/100")
-        print(f"   - Identity 점수: {identity_score}/40")
-        print(f"   - Fandom 점수: {fandom_score}/30")
-        print(f"   - Safety 점수: {safety_score}/30")
+        logger.debug("[4단계] 정성 평가 (AI) 완료", extra={
+            "stage": "ai_evaluation",
+            "ai_score": ai_score,
+            "identity_score": identity_score,
+            "fandom_score": fandom_score,
+            "safety_score": safety_score
+        })
         
-        # ===== 5단계: 최종 점수 산정 & 컨트랙트 전송 =====
-        print(f"\n💰 [5단계] 최종 점수 산정 & 컨트랙트 전송")
+        # ===== 5단계: 최종 점수 산정 & 보상 기록 =====
+        stages.start("reward_record")
         # 점수 산식: Final Score = (Social Reach Score * 40) + (AI Quality Score * 60)
         final_score = int((social_score * 0.4) + (ai_score * 0.6))
         final_score = max(0, min(100, final_score))  # 0~100 범위 보장
         
-        print(f"   - 최종 점수: {final_score}/100")
-        print(f"   - 계산식: ({social_score:.2f} * 0.4) + ({ai_score} * 0.6) = {final_score}")
-        
-        # 컨트랙트에 트랜잭션 전송 (에러 처리 추가)
-        try:
-            reward_result = await contract_service.execute_reward_transaction(
-                wallet_address=wallet_address,
-                score=final_score
-            )
-        except Exception as e:
-            print(f"⚠️  Contract service failed: {e}")
-            # Fallback to safe defaults
-            reward_result = {
-                "tx_hash": "0x0000000000000000000000000000000000000000000000000000000000000000",
-                "rewarded_amount": 0
-            }
+        # 평가 + 보상을 한 트랜잭션으로 기록 (실패하면 보상을 잃지 않도록 요청 자체를 실패 처리)
+        evaluation_id = uuid.uuid4().hex
+        reward = await record_evaluation(
+            {
+                "evaluation_id": evaluation_id,
+                "username": username,
+                "wallet_address": wallet_address,
+                "ad_id": selected_ad["ad_id"] if selected_ad else None,
+                "social_score": round(social_score, 2),
+                "ai_score": ai_score,
+                "final_score": final_score
+            },
+            ContractService.calculate_reward_amount(final_score)
+        )
+        reward_dispatcher.notify()
+        logger.info("[5단계] 평가 완료, 보상 전송 대기", extra={
+            "stage": "reward_record",
+            "evaluation_id": evaluation_id,
+            "username": username,
+            "social_score": round(social_score, 2),
+            "ai_score": ai_score,
+            "final_score": final_score,
+            "reward_amount": reward["amount"]
+        })
         
         # ===== 6단계: 결과 반환 =====
-        print(f"\n✅ [6단계] 결과 반환 완료")
-        
+        stages.stop()
         return {
+            "evaluation_id": evaluation_id,
             "username": username,
             "verification": {
                 "is_ad_verified": is_ad_verified,
-                "has_banner": has_banner
+                "has_banner": has_banner,
+                "ad_id": selected_ad["ad_id"] if selected_ad else None
             },
             "scores": {
                 "social_score": round(social_score, 2),
@@ -169,18 +210,71 @@ async def analyze_pet_account(
             },
             "analysis_summary": analysis_summary,
             "reward": {
-                "tx_hash": reward_result.get("tx_hash") or "N/A",
-                "amount": reward_result.get("rewarded_amount") or 0,
-                "wallet_address": wallet_address
+                "status": reward["status"],
+                "amount": reward["amount"],
+                "wallet_address": wallet_address,
+                "tx_hash": reward["tx_hash"],
+                "status_url": f"/evaluation/rewards/{evaluation_id}"
             }
         }
         
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"❌ 오류 발생: {str(e)}")
-        import traceback
-        traceback.print_exc()  # Better debugging
+        logger.exception("펫 계정 분석 실패", extra={"username": username})
         raise HTTPException(
             status_code=500,
             detail=f"펫 계정 분석 중 오류가 발생했습니다: {str(e)}"
         )
+    finally:
+        stages.stop()
 
+
+@router.get("/rewards/{evaluation_id}")
+async def get_evaluation_reward(evaluation_id: str):
+    """
+    평가 보상 상태 조회 API
+    
+    **보상 상태:**
+    - pending: 전송 대기 중 (실패 후 재시도 대기 포함, next_attempt_at 참고)
+    - submitting: 디스패처가 체인에 전송 중
+    - submitted: 트랜잭션 전송 완료, 확인 블록 대기 중
+    - confirmed: 필요한 확인 블록 수에 도달
+    - failed: 최대 재시도 횟수 초과, 또는 체인에서 트랜잭션을 계속 찾을 수 없음 (last_error 참고)
+    
+    Args:
+        evaluation_id: 평가 API가 반환한 평가 ID
+    
+    Returns:
+        {
+            "evaluation_id": "평가 ID",
+            "username": "사용자명",
+            "wallet_address": "지갑 주소",
+            "ad_id": "광고 ID",
+            "scores": { "social_score": 00, "ai_score": 00, "final_score": 00 },
+            "evaluated_at": "평가 시간",
+            "reward": {
+                "status": "confirmed",
+                "amount": 500,
+                "attempts": 1,
+                "next_attempt_at": null,
+                "tx_hash": "0x...",
+                "batch_index": 3,
+                "block_number": 120,
+                "confirmations": 1,
+                "last_error": null,
+                "created_at": "기록 시간",
+                "updated_at": "마지막 상태 변경 시간"
+            }
+        }
+    """
+    try:
+        status = await get_reward_status(evaluation_id)
+    except DatabaseBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"보상 상태 조회 중 오류가 발생했습니다: {str(e)}")
+    
+    if status is None:
+        raise HTTPException(status_code=404, detail="평가를 찾을 수 없습니다.")
+    return status
@@ -0,0 +1,288 @@
+"""
+Async data-access layer over app.db
+
+The functions in app.db are blocking. Calling them directly from async
+endpoints stalls the event loop for the duration of every query and fsync.
+This module runs them on a dedicated DB thread pool (each thread keeps its own
+pooled connection, see app.db) behind a bounded number of pending calls.
+When the queue is full, callers wait up to DB_QUEUE_TIMEOUT_SECONDS for a slot
+and then fail with DatabaseBusyError instead of piling up without limit.
+
+Single purchase inserts go through a write-behind buffer that group-commits
+concurrent inserts: rows are collected for up to PURCHASE_BUFFER_MAX_DELAY_MS
+or PURCHASE_BUFFER_MAX_ROWS rows, written in one transaction, and each caller
+is resolved with its own row ID only after that transaction has committed.
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app import db
+from app.metrics import CACHE_LOOKUPS_TOTAL, DB_BUSY_TOTAL, DB_QUERY_SECONDS, DB_QUEUE_WAIT_SECONDS
+
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+DB_MAX_PENDING = int(os.getenv("DB_MAX_PENDING", "256"))
+DB_QUEUE_TIMEOUT_SECONDS = float(os.getenv("DB_QUEUE_TIMEOUT_SECONDS", "5"))
+
+PURCHASE_BUFFER_MAX_ROWS = int(os.getenv("PURCHASE_BUFFER_MAX_ROWS", "256"))
+PURCHASE_BUFFER_MAX_DELAY_MS = float(os.getenv("PURCHASE_BUFFER_MAX_DELAY_MS", "5"))
+
+
+class DatabaseBusyError(Exception):
+    """Raised when the DB queue stays full for longer than DB_QUEUE_TIMEOUT_SECONDS"""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+    return _executor
+
+
+def _get_pending_slots() -> asyncio.Semaphore:
+    global _pending_slots
+    if _pending_slots is None:
+        _pending_slots = asyncio.Semaphore(DB_MAX_PENDING)
+    return _pending_slots
+
+
+async def run_db(fn: Callable, *args, **kwargs):
+    """
+    Run a blocking app.db function on the DB executor
+    
+    The queue slot is held until the executor job itself finishes, not just
+    until the caller stops waiting: a cancelled caller (client disconnect,
+    timeout) cannot stop a query that is already running on a DB thread.
+    
+    Raises:
+        DatabaseBusyError: If no queue slot frees up within DB_QUEUE_TIMEOUT_SECONDS
+    """
+    slots = _get_pending_slots()
+    queued = time.perf_counter()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=DB_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        DB_BUSY_TOTAL.inc()
+        raise DatabaseBusyError("Database is busy, please retry")
+    started = time.perf_counter()
+    DB_QUEUE_WAIT_SECONDS.observe(started - queued)
+    loop = asyncio.get_running_loop()
+    
+    def job_done(_):
+        # Runs on the DB thread (or here, if the job was cancelled before it started)
+        DB_QUERY_SECONDS.labels(fn.__name__).observe(time.perf_counter() - started)
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            pass  # event loop already closed at shutdown
+    
+    try:
+        job = _get_executor().submit(functools.partial(fn, *args, **kwargs))
+    except BaseException:
+        slots.release()
+        raise
+    job.add_done_callback(job_done)
+    return await asyncio.wrap_future(job)
+
+
+class PurchaseWriteBuffer:
+    """Group commit for concurrent purchase inserts"""
+    
+    def __init__(self, max_rows: int = PURCHASE_BUFFER_MAX_ROWS, max_delay_ms: float = PURCHASE_BUFFER_MAX_DELAY_MS):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._commits: Set[asyncio.Task] = set()
+    
+    async def insert(self, username: str, coin_symbol: str, amount: float, tx_hash: str) -> int:
+        """
+        Queue a purchase and wait until the group containing it has committed
+        
+        Raises:
+            sqlite3.IntegrityError: If the tx_hash already exists
+            DatabaseBusyError: If the DB queue is full
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((username, coin_symbol, amount, tx_hash), future))
+        
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._commit(batch))
+        self._commits.add(task)
+        task.add_done_callback(self._commits.discard)
+    
+    async def _commit(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        try:
+            results = await run_db(db.insert_purchases_group, [row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        # Shards commit separately: only rows of a shard that failed carry its exception
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller went away; nothing to report
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    async def drain(self):
+        """Commit everything still buffered and wait for in-flight groups"""
+        self._flush()
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+
+
+purchase_write_buffer = PurchaseWriteBuffer()
+
+
+async def shutdown_db_executor():
+    """Flush buffered writes, wait for queued DB calls and close pooled connections (called on shutdown)"""
+    global _executor, _pending_slots
+    await purchase_write_buffer.drain()
+    if _executor is not None:
+        # Waiting for queued DB calls blocks, so keep it off the event loop
+        await asyncio.to_thread(_executor.shutdown, True)
+        _executor = None
+    _pending_slots = None
+    db.close_db_connections()
+
+
+async def insert_purchase(username: str, coin_symbol: str, amount: float, tx_hash: str) -> int:
+    return await purchase_write_buffer.insert(username, coin_symbol, amount, tx_hash)
+
+
+async def insert_purchases_batch(purchases: List[tuple]) -> List[Dict]:
+    return await run_db(db.insert_purchases_batch, purchases)
+
+
+async def get_history_by_username(
+    username: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    coin_symbol: Optional[str] = None
+) -> Dict:
+    return await run_db(db.get_history_by_username, username, limit=limit, cursor=cursor, coin_symbol=coin_symbol)
+
+
+async def get_holdings_by_username(username: str) -> List[Dict]:
+    return await run_db(db.get_holdings_by_username, username)
+
+
+async def get_user_volume(username: str) -> List[Dict]:
+    return await run_db(db.get_user_volume, username)
+
+
+async def get_coin_volume_stats(coin_symbol: Optional[str] = None) -> List[Dict]:
+    return await run_db(db.get_coin_volume_stats, coin_symbol)
+
+
+async def get_volume_buckets(
+    start_ts: int,
+    end_ts: int,
+    bucket_seconds: int,
+    coin_symbol: Optional[str] = None
+) -> List[Dict]:
+    return await run_db(db.get_volume_buckets, start_ts, end_ts, bucket_seconds, coin_symbol)
+
+
+async def insert_coin(symbol: str, name: str, address: str, image_url: str = "") -> int:
+    return await run_db(db.insert_coin, symbol, name, address, image_url)
+
+
+async def get_registered_coins(active_only: bool = True) -> List[Dict]:
+    return await run_db(db.get_registered_coins, active_only)
+
+
+async def set_coin_active(address: str, is_active: bool) -> bool:
+    return await run_db(db.set_coin_active, address, is_active)
+
+
+async def get_catalog_version(name: str) -> int:
+    return await run_db(db.get_catalog_version, name)
+
+
+async def upsert_ad_campaign(campaign: Dict) -> bool:
+    return await run_db(db.upsert_ad_campaign, campaign)
+
+
+async def get_ad_campaigns(active_only: bool = True) -> List[Dict]:
+    return await run_db(db.get_ad_campaigns, active_only)
+
+
+async def set_ad_campaign_active(ad_id: str, is_active: bool) -> bool:
+    return await run_db(db.set_ad_campaign_active, ad_id, is_active)
+
+
+async def save_ad_selection(username: str, ad_id: str, wallet_address: str) -> Dict:
+    return await run_db(db.save_ad_selection, username, ad_id, wallet_address)
+
+
+async def get_active_ad_selection(username: str) -> Optional[Dict]:
+    # Cache hits are answered on the event loop without an executor hop
+    hit, selection = db.get_cached_ad_selection(username)
+    CACHE_LOOKUPS_TOTAL.labels("ad_selection", "hit" if hit else "miss").inc()
+    if hit:
+        return selection
+    return await run_db(db.get_active_ad_selection, username)
+
+
+async def get_ad_event_counters(
+    ad_id: Optional[str] = None,
+    username: Optional[str] = None,
+    start_day: Optional[str] = None,
+    end_day: Optional[str] = None
+) -> List[Dict]:
+    return await run_db(db.get_ad_event_counters, ad_id, username, start_day, end_day)
+
+
+async def record_evaluation(evaluation: Dict, reward_amount: int) -> Dict:
+    return await run_db(db.record_evaluation, evaluation, reward_amount)
+
+
+async def claim_pending_rewards(limit: int, lease_seconds: float) -> List[Dict]:
+    return await run_db(db.claim_pending_rewards, limit, lease_seconds)
+
+
+async def record_reward_sends(sends: List[Dict]):
+    return await run_db(db.record_reward_sends, sends)
+
+
+async def complete_reward_submissions(submitted: List[Dict], failed: List[Dict]):
+    return await run_db(db.complete_reward_submissions, submitted, failed)
+
+
+async def get_submitted_rewards(limit: int) -> List[Dict]:
+    return await run_db(db.get_submitted_rewards, limit)
+
+
+async def record_reward_checks(checks: List[tuple], required: int, max_unknown_checks: int):
+    return await run_db(db.record_reward_checks, checks, required, max_unknown_checks)
+
+
+async def get_reward_status(evaluation_id: str) -> Optional[Dict]:
+    return await run_db(db.get_reward_status, evaluation_id)
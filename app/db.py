@@ -1,23 +1,226 @@
 """
 Database module for SQLite persistence
-Handles purchase transactions storage
+Handles purchase transactions storage, volume aggregates, the meme coin registry,
+the advertisement campaign catalog, ad delivery counters and the reward outbox
 """
 import sqlite3
+import base64
+import json
+import logging
 import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional
 from contextlib import contextmanager
 
+logger = logging.getLogger(__name__)
+
 # Database file path
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "companion_camp.db")
+DB_PATH = os.getenv(
+    "DATABASE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "companion_camp.db")
+)
+
+# Optional username sharding of per-user tables (purchases, their aggregates and
+# ad selections; 0 or 1 = single database file).
+# tx_hash uniqueness is then enforced per shard: a replayed transaction always
+# carries the same username, so it lands on the same shard.
+DB_SHARDS = int(os.getenv("DB_SHARDS", "0"))
+# Purchase IDs of shard i start at i * SHARD_ID_SPAN so they never collide across shards
+SHARD_ID_SPAN = 1 << 40
+
+# Connection tuning (applied to every pooled connection)
+SQLITE_BUSY_TIMEOUT_SECONDS = 5.0
+SQLITE_CACHE_SIZE_KIB = 20000            # ~20MB page cache per connection
+SQLITE_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+SQLITE_STATEMENT_CACHE_SIZE = 256        # prepared statements kept per connection
+
+# One connection per (thread, database file), reused across calls
+_thread_local = threading.local()
+_pooled_connections: List[sqlite3.Connection] = []
+_pool_lock = threading.Lock()
+_pool_generation = 0
+
+# Fans cross-shard queries out in parallel (created lazily, only when sharded)
+_shard_executor: Optional[ThreadPoolExecutor] = None
+
+# Per-user holdings cache (see get_holdings_by_username)
+HOLDINGS_CACHE_SIZE = 10000
+# Safety net for inserts made by other worker processes, which cannot invalidate this cache
+HOLDINGS_CACHE_TTL_SECONDS = 30.0
+
+_holdings_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_holdings_cache_lock = threading.Lock()
+_holdings_generation = 0
+
+# Latest active ad selection per user (see get_active_ad_selection)
+AD_SELECTION_CACHE_SIZE = 10000
+AD_SELECTION_CACHE_TTL_SECONDS = 30.0
+
+_ad_selection_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_ad_selection_cache_lock = threading.Lock()
+_ad_selection_generation = 0
 
 
 def init_db():
     """
     Initialize the database and create tables if they don't exist
+    
+    The main database holds global tables (coin registry). Per-user tables
+    (purchases and their aggregates) live in each shard, which is the main
+    database itself unless DB_SHARDS is set.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = _open_connection(DB_PATH)
+    cursor = conn.cursor()
+    
+    # WAL lets readers proceed while a writer commits; the mode is stored in the file
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
+    # Create coin registry table (one meme coin per pet IP)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS coins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            name TEXT NOT NULL,
+            address TEXT NOT NULL UNIQUE,
+            image_url TEXT NOT NULL DEFAULT '',
+            is_active INTEGER NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Advertisement campaigns, matched to creators by follower range
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ad_campaigns (
+            ad_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            ad_text TEXT NOT NULL,
+            banner_image_url TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL,
+            min_followers INTEGER NOT NULL DEFAULT 0,
+            max_followers INTEGER,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # JSON list of phrases a creator's post must contain to verify the ad
+    _ensure_column(cursor, "ad_campaigns", "keywords", "TEXT NOT NULL DEFAULT '[]'")
+    
+    # Bumped on every catalog change so in-memory copies in each worker know when to reload
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    
+    # Ad delivery counters, rolled up from the impression/click event log
+    # (see app.services.ad_events); one row per campaign, creator and UTC day
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ad_event_counters (
+            ad_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            day TEXT NOT NULL,
+            impressions INTEGER NOT NULL DEFAULT 0,
+            clicks INTEGER NOT NULL DEFAULT 0,
+            last_event_ts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (ad_id, username, day)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ad_event_counters_username
+        ON ad_event_counters(username, ad_id)
+    """)
+    
+    # Position up to which the event log has been folded into the counters
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ad_event_checkpoints (
+            name TEXT PRIMARY KEY,
+            segment INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Scored pet account evaluations
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS evaluations (
+            evaluation_id TEXT PRIMARY KEY,
+            username TEXT NOT NULL,
+            wallet_address TEXT NOT NULL,
+            ad_id TEXT,
+            social_score REAL NOT NULL,
+            ai_score INTEGER NOT NULL,
+            final_score INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_evaluations_username
+        ON evaluations(username, created_at)
+    """)
+    
+    # Rewards waiting for (or done with) chain submission, written together with
+    # the evaluation. status: pending -> submitting -> submitted -> confirmed,
+    # or failed once REWARD_MAX_ATTEMPTS submissions have failed or the chain
+    # still does not know the submitted tx after REWARD_MAX_UNKNOWN_CHECKS checks.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reward_outbox (
+            evaluation_id TEXT PRIMARY KEY,
+            wallet_address TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_ts REAL NOT NULL DEFAULT 0,
+            lease_until_ts REAL NOT NULL DEFAULT 0,
+            tx_hash TEXT,
+            batch_index INTEGER,
+            tx_nonce INTEGER,
+            tx_sent_block INTEGER,
+            block_number INTEGER,
+            confirmations INTEGER NOT NULL DEFAULT 0,
+            unknown_checks INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            last_checked_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _ensure_column(cursor, "reward_outbox", "unknown_checks", "INTEGER NOT NULL DEFAULT 0")
+    _ensure_column(cursor, "reward_outbox", "last_checked_at", "TIMESTAMP")
+    _ensure_column(cursor, "reward_outbox", "tx_nonce", "INTEGER")
+    _ensure_column(cursor, "reward_outbox", "tx_sent_block", "INTEGER")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reward_outbox_status
+        ON reward_outbox(status, next_attempt_ts)
+    """)
+    # Confirmation checks go round-robin over submitted rewards
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reward_outbox_checked
+        ON reward_outbox(status, last_checked_at)
+    """)
+    
+    conn.commit()
+    conn.close()
+    
+    for shard_index, path in enumerate(shard_paths()):
+        _init_shard(path, shard_index)
+    
+    if DB_SHARDS > 1:
+        logger.info("Database initialized at: %s (+%d purchase shards)", DB_PATH, DB_SHARDS)
+    else:
+        logger.info("Database initialized at: %s", DB_PATH)
+
+
+def _init_shard(path: str, shard_index: int):
+    """Create the per-user tables in one shard database"""
+    conn = _open_connection(path)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
     
     # Create purchases table
     cursor.execute("""
@@ -27,26 +230,244 @@ def init_db():
             coin_symbol TEXT NOT NULL,
             amount REAL NOT NULL,
             tx_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_ts INTEGER
         )
     """)
     
+    # Epoch-seconds copy of created_at for range queries and time bucketing
+    if _ensure_column(cursor, "purchases", "created_ts", "INTEGER"):
+        # created_at was written with datetime.now(), i.e. server local time
+        cursor.execute("""
+            UPDATE purchases
+            SET created_ts = CAST(strftime('%s', created_at, 'utc') AS INTEGER)
+            WHERE created_ts IS NULL
+        """)
+        logger.info("Backfilled created_ts for %d purchases", cursor.rowcount)
+    
+    # Covering indexes for volume analytics (index-only scans, no table lookups)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchases_coin_ts_amount
+        ON purchases (coin_symbol, created_ts, amount)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchases_ts_coin_amount
+        ON purchases (created_ts, coin_symbol, amount)
+    """)
+    
+    # Indexes for per-user history pages (keyset pagination, optional coin filter)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchases_username_created
+        ON purchases (username, created_at, id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_purchases_username_coin_created
+        ON purchases (username, coin_symbol, created_at, id)
+    """)
+    
+    # One row per on-chain transaction, so replayed purchases are idempotent
+    try:
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_purchases_tx_hash
+            ON purchases (tx_hash)
+        """)
+    except sqlite3.IntegrityError:
+        logger.warning("Duplicate tx_hash rows exist; idx_purchases_tx_hash was not created")
+    
+    # Volume aggregates, maintained in the same transaction as every purchase insert
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_coin_totals (
+            username TEXT NOT NULL,
+            coin_symbol TEXT NOT NULL,
+            total_amount REAL NOT NULL DEFAULT 0,
+            purchase_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, coin_symbol)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS coin_totals (
+            coin_symbol TEXT PRIMARY KEY,
+            total_amount REAL NOT NULL DEFAULT 0,
+            purchase_count INTEGER NOT NULL DEFAULT 0,
+            holder_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    # Campaign each creator committed to (one active selection per user)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ad_selections (
+            username TEXT NOT NULL,
+            ad_id TEXT NOT NULL,
+            wallet_address TEXT NOT NULL,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            selected_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (username, ad_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_ad_selections_username_active
+        ON ad_selections (username, is_active, selected_at)
+    """)
+    
+    # Give every shard its own purchase ID range so IDs stay globally unique
+    if shard_index > 0:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'purchases'")
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('purchases', ?)",
+                (shard_index * SHARD_ID_SPAN,)
+            )
+    
     conn.commit()
+    
+    # Backfill aggregates for databases created before the aggregate tables existed
+    has_purchases = cursor.execute("SELECT EXISTS (SELECT 1 FROM purchases)").fetchone()[0]
+    has_totals = cursor.execute("SELECT EXISTS (SELECT 1 FROM coin_totals)").fetchone()[0]
+    if has_purchases and not has_totals:
+        _rebuild_aggregates(conn)
+        logger.info("Volume aggregates rebuilt from purchases in %s", os.path.basename(path))
+    
     conn.close()
-    print(f"✅ Database initialized at: {DB_PATH}")
+
+
+def shard_paths(shards: Optional[int] = None) -> List[str]:
+    """
+    Database files holding per-user tables, indexed by shard number
+    
+    Args:
+        shards: Shard count (defaults to DB_SHARDS); 0 or 1 means unsharded
+    """
+    shards = DB_SHARDS if shards is None else shards
+    if shards <= 1:
+        return [DB_PATH]
+    base, _ = os.path.splitext(DB_PATH)
+    return [f"{base}.shard{i}.db" for i in range(shards)]
+
+
+def shard_index_for(username: str, shards: Optional[int] = None) -> int:
+    """Stable shard number for a username (CRC32, identical across processes)"""
+    shards = DB_SHARDS if shards is None else shards
+    if shards <= 1:
+        return 0
+    return zlib.crc32(username.encode("utf-8")) % shards
+
+
+def shard_path_for(username: str) -> str:
+    """Database file holding the given user's rows"""
+    return shard_paths()[shard_index_for(username)]
+
+
+def _group_by_shard(purchases: List[tuple]) -> Dict[int, List[int]]:
+    """Map shard number -> positions of the purchases (username first) routed to it"""
+    positions: Dict[int, List[int]] = {}
+    for position, row in enumerate(purchases):
+        positions.setdefault(shard_index_for(row[0]), []).append(position)
+    return positions
+
+
+def _map_shards(fn) -> List:
+    """Run fn(path) on every shard, in parallel when sharded, and return the results in shard order"""
+    paths = shard_paths()
+    if len(paths) == 1:
+        return [fn(paths[0])]
+    return list(_get_shard_executor().map(fn, paths))
+
+
+def _get_shard_executor() -> ThreadPoolExecutor:
+    global _shard_executor
+    with _pool_lock:
+        if _shard_executor is None:
+            _shard_executor = ThreadPoolExecutor(
+                max_workers=DB_SHARDS,
+                thread_name_prefix="db-shard"
+            )
+        return _shard_executor
+
+
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    """
+    Add a column to an existing table if it is missing
+    
+    Returns:
+        bool: True if the column was added
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    if any(row[1] == column for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Open a connection with the tuned pragmas"""
+    conn = sqlite3.connect(
+        path,
+        timeout=SQLITE_BUSY_TIMEOUT_SECONDS,
+        cached_statements=SQLITE_STATEMENT_CACHE_SIZE,
+        check_same_thread=False  # only used by its owning thread; closed at shutdown
+    )
+    conn.row_factory = sqlite3.Row  # Enable column access by name
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _get_pooled_connection(path: str) -> sqlite3.Connection:
+    """Return this thread's connection to the given database, opening it on first use"""
+    connections = getattr(_thread_local, "connections", None)
+    if connections is None or _thread_local.generation != _pool_generation:
+        # First use in this thread, or the pool was closed since
+        connections = _thread_local.connections = {}
+        _thread_local.generation = _pool_generation
+    
+    conn = connections.get(path)
+    if conn is None:
+        conn = _open_connection(path)
+        connections[path] = conn
+        with _pool_lock:
+            _pooled_connections.append(conn)
+    return conn
 
 
 @contextmanager
-def get_db_connection():
+def get_db_connection(path: Optional[str] = None):
     """
     Context manager for database connections
+    
+    Connections are pooled per worker thread and stay open between calls.
+    Any transaction left open by the block (e.g. after an exception) is
+    rolled back so the connection is clean for the next caller.
+    
+    Args:
+        path: Database file (defaults to the main database; see shard_path_for)
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Enable column access by name
+    conn = _get_pooled_connection(path or DB_PATH)
     try:
         yield conn
     finally:
-        conn.close()
+        if conn.in_transaction:
+            conn.rollback()
+
+
+def close_db_connections():
+    """Close every pooled connection (called on application shutdown)"""
+    global _pool_generation, _shard_executor
+    with _pool_lock:
+        connections = list(_pooled_connections)
+        _pooled_connections.clear()
+        # Threads that call get_db_connection again will reopen lazily
+        _pool_generation += 1
+        shard_executor, _shard_executor = _shard_executor, None
+    if shard_executor is not None:
+        shard_executor.shutdown(wait=True)
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
 
 
 def insert_purchase(username: str, coin_symbol: str, amount: float, tx_hash: str) -> int:
@@ -61,46 +482,1377 @@ def insert_purchase(username: str, coin_symbol: str, amount: float, tx_hash: str
     
     Returns:
         int: The ID of the inserted record
+    
+    Raises:
+        sqlite3.IntegrityError: If a purchase with the same tx_hash exists
+            (checked within the user's shard)
     """
-    with get_db_connection() as conn:
+    now = datetime.now()
+    with get_db_connection(shard_path_for(username)) as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO purchases (username, coin_symbol, amount, tx_hash, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (username, coin_symbol.upper(), amount, tx_hash, datetime.now().isoformat()))
+            INSERT INTO purchases (username, coin_symbol, amount, tx_hash, created_at, created_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (username, coin_symbol.upper(), amount, tx_hash, now.isoformat(), int(now.timestamp())))
+        _apply_purchase_aggregates(cursor, [(username, coin_symbol.upper(), amount)])
         conn.commit()
+        invalidate_holdings(username)
         return cursor.lastrowid
 
 
-def get_history_by_username(username: str) -> List[Dict]:
+def insert_purchases_group(purchases: List[tuple]) -> List:
     """
-    Get purchase history for a specific username
+    Commit purchases from many independent callers as one transaction
+    
+    Used by the write-behind buffer in app.async_db: rows are inserted one
+    statement at a time so a duplicate tx_hash only fails its own row, but
+    they share a single COMMIT (and fsync) per shard.
+    
+    Args:
+        purchases: List of (username, coin_symbol, amount, tx_hash) tuples
+    
+    Returns:
+        List: Per row, the inserted record ID or the exception for that row
+            (sqlite3.IntegrityError for a duplicate, or the error of its shard's
+            transaction if that shard failed to commit)
+    """
+    now = datetime.now()
+    results = _write_per_shard(
+        purchases,
+        lambda path, rows: _insert_purchases_group_shard(path, rows, now)
+    )
+    
+    for username in {row[0] for row in purchases}:
+        invalidate_holdings(username)
+    
+    return results
+
+
+def _insert_purchases_group_shard(path: str, purchases: List[tuple], now: datetime) -> List:
+    created_at, created_ts = now.isoformat(), int(now.timestamp())
+    results = []
+    inserted = []
+    with get_db_connection(path) as conn:
+        cursor = conn.cursor()
+        for username, coin_symbol, amount, tx_hash in purchases:
+            try:
+                cursor.execute("""
+                    INSERT INTO purchases (username, coin_symbol, amount, tx_hash, created_at, created_ts)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (username, coin_symbol.upper(), amount, tx_hash, created_at, created_ts))
+                results.append(cursor.lastrowid)
+                inserted.append((username, coin_symbol.upper(), amount))
+            except sqlite3.IntegrityError as e:
+                results.append(e)
+        _apply_purchase_aggregates(cursor, inserted)
+        conn.commit()
+    return results
+
+
+def insert_purchases_batch(purchases: List[tuple]) -> List[Dict]:
+    """
+    Insert many purchase records in a single transaction
+    
+    Rows whose tx_hash is already stored (or repeated earlier in the batch)
+    are skipped by the unique tx_hash index instead of being checked one by
+    one, so replaying the same transactions is idempotent. When sharded, each
+    shard commits its part of the batch in its own transaction.
+    
+    Args:
+        purchases: List of (username, coin_symbol, amount, tx_hash) tuples
+    
+    Returns:
+        List[Dict]: One {"id", "status"} per input row, in order, where status is
+            "created" or "duplicate" (id is the existing record's ID for duplicates),
+            or "error" with an "error" message for rows whose shard failed to commit
+            (nothing from that shard was stored, so resending them is safe)
+    
+    Raises:
+        sqlite3.Error: If no shard could commit
+    """
+    if not purchases:
+        return []
+    
+    now = datetime.now()
+    results = [
+        {"id": None, "status": "error", "error": str(result)} if isinstance(result, Exception) else result
+        for result in _write_per_shard(
+            purchases,
+            lambda path, rows: _insert_purchases_batch_shard(path, rows, now)
+        )
+    ]
+    
+    for username in {row[0] for row in purchases}:
+        invalidate_holdings(username)
+    
+    return results
+
+
+def _insert_purchases_batch_shard(path: str, purchases: List[tuple], now: datetime) -> List[Dict]:
+    created_at, created_ts = now.isoformat(), int(now.timestamp())
+    with get_db_connection(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM purchases")
+        max_id_before = cursor.fetchone()[0]
+        
+        cursor.executemany("""
+            INSERT OR IGNORE INTO purchases (username, coin_symbol, amount, tx_hash, created_at, created_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (username, coin_symbol.upper(), amount, tx_hash, created_at, created_ts)
+            for username, coin_symbol, amount, tx_hash in purchases
+        ])
+        
+        # Resolve IDs for the whole batch (new and pre-existing rows) in a few IN queries
+        tx_hashes = list(dict.fromkeys(row[3] for row in purchases))
+        id_by_hash = {}
+        for i in range(0, len(tx_hashes), 500):
+            chunk = tx_hashes[i:i + 500]
+            cursor.execute(
+                f"SELECT id, tx_hash FROM purchases WHERE tx_hash IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            id_by_hash.update((row["tx_hash"], row["id"]) for row in cursor.fetchall())
+        
+        # Rows above the previous max ID are exactly the ones this batch inserted
+        cursor.execute(
+            "SELECT username, coin_symbol, amount FROM purchases WHERE id > ?",
+            (max_id_before,)
+        )
+        _apply_purchase_aggregates(cursor, [tuple(row) for row in cursor.fetchall()])
+        
+        conn.commit()
+    
+    results = []
+    seen = set()
+    for _, _, _, tx_hash in purchases:
+        record_id = id_by_hash.get(tx_hash)
+        created = record_id is not None and record_id > max_id_before and tx_hash not in seen
+        seen.add(tx_hash)
+        results.append({"id": record_id, "status": "created" if created else "duplicate"})
+    return results
+
+
+def _write_per_shard(purchases: List[tuple], write_shard) -> List:
+    """
+    Split purchases by shard, run write_shard(path, rows) for each shard and
+    return the per-row results in the original order
+    
+    Shards commit independently, so one failing shard does not hide the
+    results of the others: every row of a failed shard gets that shard's
+    exception as its result. If every shard fails, the first exception is
+    raised instead.
+    """
+    positions_by_shard = _group_by_shard(purchases)
+    paths = shard_paths()
+    
+    def run(shard_index: int) -> tuple:
+        positions = positions_by_shard[shard_index]
+        try:
+            return write_shard(paths[shard_index], [purchases[i] for i in positions]), None
+        except Exception as e:
+            logger.error("Purchase write to shard %d failed: %s", shard_index, e)
+            return [e] * len(positions), e
+    
+    shard_indexes = list(positions_by_shard)
+    if len(shard_indexes) == 1:
+        shard_results = [run(shard_indexes[0])]
+    else:
+        shard_results = list(_get_shard_executor().map(run, shard_indexes))
+    
+    errors = [error for _, error in shard_results if error is not None]
+    if len(errors) == len(shard_results):
+        raise errors[0]
+    
+    results: List = [None] * len(purchases)
+    for shard_index, (rows, _) in zip(shard_indexes, shard_results):
+        for position, result in zip(positions_by_shard[shard_index], rows):
+            results[position] = result
+    return results
+
+
+def _apply_purchase_aggregates(cursor: sqlite3.Cursor, rows: List[tuple]):
+    """
+    Add newly inserted purchases to the aggregate tables
+    
+    Must run inside the transaction that inserted the rows, so aggregates and
+    raw purchases always commit together.
+    
+    Args:
+        cursor: Cursor of the inserting transaction
+        rows: List of (username, coin_symbol, amount) for rows actually inserted
+    """
+    if not rows:
+        return
+    
+    per_user_coin: Dict[tuple, list] = {}
+    for username, coin_symbol, amount in rows:
+        totals = per_user_coin.setdefault((username, coin_symbol), [0.0, 0])
+        totals[0] += amount
+        totals[1] += 1
+    
+    per_coin: Dict[str, list] = {}
+    for (username, coin_symbol), (amount, count) in per_user_coin.items():
+        # A zero row is created only the first time this user buys this coin
+        cursor.execute("""
+            INSERT OR IGNORE INTO user_coin_totals (username, coin_symbol, total_amount, purchase_count)
+            VALUES (?, ?, 0, 0)
+        """, (username, coin_symbol))
+        is_new_holder = cursor.rowcount == 1
+        cursor.execute("""
+            UPDATE user_coin_totals
+            SET total_amount = total_amount + ?, purchase_count = purchase_count + ?
+            WHERE username = ? AND coin_symbol = ?
+        """, (amount, count, username, coin_symbol))
+        
+        coin_totals = per_coin.setdefault(coin_symbol, [0.0, 0, 0])
+        coin_totals[0] += amount
+        coin_totals[1] += count
+        coin_totals[2] += 1 if is_new_holder else 0
+    
+    cursor.executemany("""
+        INSERT INTO coin_totals (coin_symbol, total_amount, purchase_count, holder_count)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(coin_symbol) DO UPDATE SET
+            total_amount = total_amount + excluded.total_amount,
+            purchase_count = purchase_count + excluded.purchase_count,
+            holder_count = holder_count + excluded.holder_count
+    """, [
+        (coin_symbol, amount, count, new_holders)
+        for coin_symbol, (amount, count, new_holders) in per_coin.items()
+    ])
+
+
+def _rebuild_aggregates(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("DELETE FROM user_coin_totals")
+    cursor.execute("DELETE FROM coin_totals")
+    cursor.execute("""
+        INSERT INTO user_coin_totals (username, coin_symbol, total_amount, purchase_count)
+        SELECT username, coin_symbol, SUM(amount), COUNT(*)
+        FROM purchases
+        GROUP BY username, coin_symbol
+    """)
+    cursor.execute("""
+        INSERT INTO coin_totals (coin_symbol, total_amount, purchase_count, holder_count)
+        SELECT coin_symbol, SUM(total_amount), SUM(purchase_count), COUNT(*)
+        FROM user_coin_totals
+        GROUP BY coin_symbol
+    """)
+    conn.commit()
+
+
+def rebuild_aggregates() -> Dict:
+    """
+    Recompute every aggregate table from the raw purchases rows
+    
+    Returns:
+        Dict: Number of user×coin and coin aggregate rows written
+    """
+    def rebuild_shard(path: str) -> int:
+        with get_db_connection(path) as conn:
+            _rebuild_aggregates(conn)
+            return conn.execute("SELECT COUNT(*) FROM user_coin_totals").fetchone()[0]
+    
+    user_coin_rows = sum(_map_shards(rebuild_shard))
+    
+    with _holdings_cache_lock:
+        _holdings_cache.clear()
+    
+    # Per-shard coin_totals partials for the same coin count as one coin
+    return {"user_coin_totals": user_coin_rows, "coin_totals": len(get_coin_volume_stats())}
+
+
+def get_user_volume(username: str) -> List[Dict]:
+    """
+    Get a user's purchase volume per coin from the aggregate table
     
     Args:
         username: Username to query
     
     Returns:
-        List[Dict]: List of purchase records
+        List[Dict]: One record per coin with coin_symbol, total_amount and purchase_count
     """
-    with get_db_connection() as conn:
+    with get_db_connection(shard_path_for(username)) as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT id, username, coin_symbol, amount, tx_hash, created_at
-            FROM purchases
+            SELECT coin_symbol, total_amount, purchase_count
+            FROM user_coin_totals
             WHERE username = ?
-            ORDER BY created_at DESC
+            ORDER BY coin_symbol
         """, (username,))
-        
-        rows = cursor.fetchall()
         return [
             {
-                "id": row["id"],
-                "username": row["username"],
                 "coin_symbol": row["coin_symbol"],
-                "amount": row["amount"],
-                "tx_hash": row["tx_hash"],
-                "created_at": row["created_at"]
+                "total_amount": row["total_amount"],
+                "purchase_count": row["purchase_count"]
             }
-            for row in rows
+            for row in cursor.fetchall()
         ]
 
+
+def get_coin_volume_stats(coin_symbol: Optional[str] = None) -> List[Dict]:
+    """
+    Get total purchase volume, purchase count and distinct holders per coin
+    
+    Args:
+        coin_symbol: Only return this coin (all coins if None)
+    
+    Returns:
+        List[Dict]: One record per coin ordered by total volume
+    """
+    def query_shard(path: str) -> List[tuple]:
+        with get_db_connection(path) as conn:
+            cursor = conn.cursor()
+            if coin_symbol:
+                cursor.execute("""
+                    SELECT coin_symbol, total_amount, purchase_count, holder_count
+                    FROM coin_totals
+                    WHERE coin_symbol = ?
+                """, (coin_symbol.upper(),))
+            else:
+                cursor.execute("""
+                    SELECT coin_symbol, total_amount, purchase_count, holder_count
+                    FROM coin_totals
+                """)
+            return [tuple(row) for row in cursor.fetchall()]
+    
+    # A user lives in exactly one shard, so per-shard holder counts add up exactly
+    merged: Dict[str, Dict] = {}
+    for rows in _map_shards(query_shard):
+        for symbol, total_amount, purchase_count, holder_count in rows:
+            stats = merged.setdefault(symbol, {
+                "coin_symbol": symbol,
+                "total_amount": 0.0,
+                "purchase_count": 0,
+                "holder_count": 0
+            })
+            stats["total_amount"] += total_amount
+            stats["purchase_count"] += purchase_count
+            stats["holder_count"] += holder_count
+    
+    return sorted(merged.values(), key=lambda x: x["total_amount"], reverse=True)
+
+
+def get_volume_buckets(
+    start_ts: int,
+    end_ts: int,
+    bucket_seconds: int,
+    coin_symbol: Optional[str] = None
+) -> List[Dict]:
+    """
+    Get purchase volume and trade count per coin per time bucket
+    
+    Buckets are computed on the integer created_ts column, so the query is
+    answered from the (coin_symbol, created_ts, amount) or
+    (created_ts, coin_symbol, amount) covering index without touching the table.
+    
+    Args:
+        start_ts: Range start, epoch seconds (inclusive)
+        end_ts: Range end, epoch seconds (exclusive)
+        bucket_seconds: Bucket width in seconds (60, 3600, 86400)
+        coin_symbol: Only aggregate this coin (all coins if None)
+    
+    Returns:
+        List[Dict]: {coin_symbol, bucket_start, volume, trade_count} ordered by
+            coin_symbol then bucket_start; empty buckets are omitted
+    """
+    conditions = ["created_ts >= ?", "created_ts < ?"]
+    params: list = [start_ts, end_ts]
+    if coin_symbol:
+        conditions.insert(0, "coin_symbol = ?")
+        params.insert(0, coin_symbol.upper())
+    
+    def query_shard(path: str) -> List[tuple]:
+        with get_db_connection(path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT coin_symbol,
+                       (created_ts / ?) * ? AS bucket_start,
+                       SUM(amount) AS volume,
+                       COUNT(*) AS trade_count
+                FROM purchases
+                WHERE {' AND '.join(conditions)}
+                GROUP BY coin_symbol, bucket_start
+            """, [bucket_seconds, bucket_seconds] + params)
+            return [tuple(row) for row in cursor.fetchall()]
+    
+    merged: Dict[tuple, list] = {}
+    for rows in _map_shards(query_shard):
+        for symbol, bucket_start, volume, trade_count in rows:
+            totals = merged.setdefault((symbol, bucket_start), [0.0, 0])
+            totals[0] += volume
+            totals[1] += trade_count
+    
+    return [
+        {
+            "coin_symbol": symbol,
+            "bucket_start": bucket_start,
+            "volume": volume,
+            "trade_count": trade_count
+        }
+        for (symbol, bucket_start), (volume, trade_count) in sorted(merged.items())
+    ]
+
+
+def encode_history_cursor(created_at: str, record_id: int) -> str:
+    """Encode the position after a history record as an opaque cursor"""
+    raw = json.dumps([created_at, record_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor produced by encode_history_cursor
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, record_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(record_id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, record_id
+
+
+def get_history_by_username(
+    username: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    coin_symbol: Optional[str] = None
+) -> Dict:
+    """
+    Get one page of purchase history for a specific username (newest first)
+    
+    Uses keyset pagination over (created_at, id), served by the
+    (username, created_at, id) and (username, coin_symbol, created_at, id)
+    indexes, so each page is an index range scan without a sort.
+    
+    Args:
+        username: Username to query
+        limit: Maximum number of records in the page
+        cursor: Opaque cursor from the previous page's next_cursor
+        coin_symbol: Only return purchases of this coin
+    
+    Returns:
+        Dict: {"purchases": List of purchase records, "next_cursor": cursor or None}
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    conditions = ["username = ?"]
+    params: list = [username]
+    
+    if coin_symbol:
+        conditions.append("coin_symbol = ?")
+        params.append(coin_symbol.upper())
+    
+    if cursor:
+        created_at, record_id = decode_history_cursor(cursor)
+        conditions.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params.extend([created_at, created_at, record_id])
+    
+    params.append(limit + 1)
+    
+    with get_db_connection(shard_path_for(username)) as conn:
+        cursor_obj = conn.cursor()
+        cursor_obj.execute(f"""
+            SELECT id, username, coin_symbol, amount, tx_hash, created_at
+            FROM purchases
+            WHERE {" AND ".join(conditions)}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        """, params)
+        
+        rows = cursor_obj.fetchall()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    purchases = [
+        {
+            "id": row["id"],
+            "username": row["username"],
+            "coin_symbol": row["coin_symbol"],
+            "amount": row["amount"],
+            "tx_hash": row["tx_hash"],
+            "created_at": row["created_at"]
+        }
+        for row in rows
+    ]
+    
+    next_cursor = None
+    if has_more:
+        last = purchases[-1]
+        next_cursor = encode_history_cursor(last["created_at"], last["id"])
+    
+    return {"purchases": purchases, "next_cursor": next_cursor}
+
+
+def invalidate_holdings(username: str):
+    """Drop the cached holdings of a user after their purchases changed"""
+    global _holdings_generation
+    with _holdings_cache_lock:
+        _holdings_generation += 1
+        _holdings_cache.pop(username, None)
+
+
+def get_holdings_by_username(username: str) -> List[Dict]:
+    """
+    Get a user's total amount held per coin
+    
+    Reads the incrementally maintained user_coin_totals table (a primary-key
+    range lookup, no GROUP BY). The result is cached per user and invalidated
+    by insert_purchase, so repeated page views cost no query until the user
+    buys again.
+    
+    Args:
+        username: Username to query
+    
+    Returns:
+        List[Dict]: One record per coin with coin_symbol, amount and purchase_count
+    """
+    with _holdings_cache_lock:
+        cached = _holdings_cache.get(username)
+        if cached is not None and time.monotonic() - cached[0] <= HOLDINGS_CACHE_TTL_SECONDS:
+            _holdings_cache.move_to_end(username)
+            return cached[1]
+        generation = _holdings_generation
+    
+    with get_db_connection(shard_path_for(username)) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT coin_symbol, total_amount AS amount, purchase_count
+            FROM user_coin_totals
+            WHERE username = ?
+            ORDER BY coin_symbol
+        """, (username,))
+        holdings = [
+            {
+                "coin_symbol": row["coin_symbol"],
+                "amount": row["amount"],
+                "purchase_count": row["purchase_count"]
+            }
+            for row in cursor.fetchall()
+        ]
+    
+    with _holdings_cache_lock:
+        # Skip caching if a purchase was inserted while the query ran
+        if generation == _holdings_generation:
+            _holdings_cache[username] = (time.monotonic(), holdings)
+            _holdings_cache.move_to_end(username)
+            while len(_holdings_cache) > HOLDINGS_CACHE_SIZE:
+                _holdings_cache.popitem(last=False)
+    
+    return holdings
+
+
+def _coin_row_to_dict(row) -> Dict:
+    return {
+        "id": row["id"],
+        "symbol": row["symbol"],
+        "name": row["name"],
+        "address": row["address"],
+        "image_url": row["image_url"],
+        "is_active": bool(row["is_active"]),
+        "created_at": row["created_at"]
+    }
+
+
+def insert_coin(symbol: str, name: str, address: str, image_url: str = "") -> int:
+    """
+    Register a new meme coin
+    
+    Args:
+        symbol: Coin symbol (e.g., "BONK")
+        name: Display name of the coin
+        address: Solana token contract address (unique)
+        image_url: Optional logo URL used when DexScreener has none
+    
+    Returns:
+        int: The ID of the inserted record
+    
+    Raises:
+        sqlite3.IntegrityError: If the address is already registered
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO coins (symbol, name, address, image_url, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (symbol.upper(), name, address, image_url, datetime.now().isoformat()))
+        conn.commit()
+        return cursor.lastrowid
+
+
+def seed_coins(coins: List[Dict]) -> int:
+    """
+    Insert coins that are not registered yet (existing addresses are left untouched)
+    
+    Args:
+        coins: List of dicts with symbol, name, address and optional image_url
+    
+    Returns:
+        int: Number of newly registered coins
+    """
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        before = conn.total_changes
+        cursor.executemany("""
+            INSERT OR IGNORE INTO coins (symbol, name, address, image_url, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            (coin["symbol"].upper(), coin["name"], coin["address"], coin.get("image_url", ""), now)
+            for coin in coins
+        ])
+        conn.commit()
+        return conn.total_changes - before
+
+
+def get_registered_coins(active_only: bool = True) -> List[Dict]:
+    """
+    Get the registered meme coins
+    
+    Args:
+        active_only: Only return coins that are currently listed
+    
+    Returns:
+        List[Dict]: List of coin registry records ordered by symbol
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        query = """
+            SELECT id, symbol, name, address, image_url, is_active, created_at
+            FROM coins
+        """
+        if active_only:
+            query += " WHERE is_active = 1"
+        query += " ORDER BY symbol, id"
+        cursor.execute(query)
+        return [_coin_row_to_dict(row) for row in cursor.fetchall()]
+
+
+def set_coin_active(address: str, is_active: bool) -> bool:
+    """
+    List or delist a registered coin
+    
+    Args:
+        address: Token contract address
+        is_active: New listing state
+    
+    Returns:
+        bool: True if a coin with that address exists
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE coins SET is_active = ? WHERE address = ?",
+            (1 if is_active else 0, address)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+
+def _bump_catalog_version(cursor: sqlite3.Cursor, name: str):
+    cursor.execute("""
+        INSERT INTO catalog_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, (name,))
+
+
+def get_catalog_version(name: str) -> int:
+    """
+    Get the change counter of a catalog (0 if it was never written)
+    
+    Args:
+        name: Catalog name (e.g., "ad_campaigns")
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM catalog_versions WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return row["version"] if row else 0
+
+
+def _ad_campaign_row_to_dict(row) -> Dict:
+    return {
+        "ad_id": row["ad_id"],
+        "title": row["title"],
+        "ad_text": row["ad_text"],
+        "banner_image_url": row["banner_image_url"],
+        "category": row["category"],
+        "min_followers": row["min_followers"],
+        "max_followers": row["max_followers"],
+        "keywords": json.loads(row["keywords"] or "[]"),
+        "is_active": bool(row["is_active"]),
+        "updated_at": row["updated_at"]
+    }
+
+
+def upsert_ad_campaign(campaign: Dict) -> bool:
+    """
+    Create an advertisement campaign or replace an existing one with the same ad_id
+    
+    Args:
+        campaign: Dict with ad_id, title, ad_text, banner_image_url, category,
+            min_followers, max_followers (None = no upper bound), keywords and is_active
+    
+    Returns:
+        bool: True if a new campaign was created
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM ad_campaigns WHERE ad_id = ?", (campaign["ad_id"],))
+        exists = cursor.fetchone() is not None
+        cursor.execute("""
+            INSERT INTO ad_campaigns (
+                ad_id, title, ad_text, banner_image_url, category,
+                min_followers, max_followers, keywords, is_active, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ad_id) DO UPDATE SET
+                title = excluded.title,
+                ad_text = excluded.ad_text,
+                banner_image_url = excluded.banner_image_url,
+                category = excluded.category,
+                min_followers = excluded.min_followers,
+                max_followers = excluded.max_followers,
+                keywords = excluded.keywords,
+                is_active = excluded.is_active,
+                updated_at = excluded.updated_at
+        """, (
+            campaign["ad_id"],
+            campaign["title"],
+            campaign["ad_text"],
+            campaign.get("banner_image_url", ""),
+            campaign["category"],
+            campaign.get("min_followers", 0),
+            campaign.get("max_followers"),
+            json.dumps(campaign.get("keywords", []), ensure_ascii=False),
+            1 if campaign.get("is_active", True) else 0,
+            datetime.now().isoformat()
+        ))
+        _bump_catalog_version(cursor, "ad_campaigns")
+        conn.commit()
+        return not exists
+
+
+def seed_ad_campaigns(campaigns: List[Dict]) -> int:
+    """
+    Insert campaigns that do not exist yet (existing ad_ids are left untouched)
+    
+    Args:
+        campaigns: List of campaign dicts (see upsert_ad_campaign)
+    
+    Returns:
+        int: Number of newly created campaigns
+    """
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        before = conn.total_changes
+        cursor.executemany("""
+            INSERT OR IGNORE INTO ad_campaigns (
+                ad_id, title, ad_text, banner_image_url, category,
+                min_followers, max_followers, keywords, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                campaign["ad_id"],
+                campaign["title"],
+                campaign["ad_text"],
+                campaign.get("banner_image_url", ""),
+                campaign["category"],
+                campaign.get("min_followers", 0),
+                campaign.get("max_followers"),
+                json.dumps(campaign.get("keywords", []), ensure_ascii=False),
+                now
+            )
+            for campaign in campaigns
+        ])
+        added = conn.total_changes - before
+        if added:
+            _bump_catalog_version(cursor, "ad_campaigns")
+        conn.commit()
+        return added
+
+
+def get_ad_campaigns(active_only: bool = True) -> List[Dict]:
+    """
+    Get the advertisement campaigns
+    
+    Args:
+        active_only: Only return campaigns that are currently running
+    
+    Returns:
+        List[Dict]: List of campaign records ordered by ad_id
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        query = """
+            SELECT ad_id, title, ad_text, banner_image_url, category,
+                   min_followers, max_followers, keywords, is_active, updated_at
+            FROM ad_campaigns
+        """
+        if active_only:
+            query += " WHERE is_active = 1"
+        query += " ORDER BY ad_id"
+        cursor.execute(query)
+        return [_ad_campaign_row_to_dict(row) for row in cursor.fetchall()]
+
+
+def set_ad_campaign_active(ad_id: str, is_active: bool) -> bool:
+    """
+    Start or stop an advertisement campaign
+    
+    Args:
+        ad_id: Campaign ID
+        is_active: New running state
+    
+    Returns:
+        bool: True if a campaign with that ID exists
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE ad_campaigns SET is_active = ?, updated_at = ? WHERE ad_id = ?",
+            (1 if is_active else 0, datetime.now().isoformat(), ad_id)
+        )
+        found = cursor.rowcount > 0
+        if found:
+            _bump_catalog_version(cursor, "ad_campaigns")
+        conn.commit()
+        return found
+
+
+def _ad_selection_row_to_dict(row) -> Dict:
+    return {
+        "username": row["username"],
+        "ad_id": row["ad_id"],
+        "wallet_address": row["wallet_address"],
+        "selected_at": row["selected_at"]
+    }
+
+
+def save_ad_selection(username: str, ad_id: str, wallet_address: str) -> Dict:
+    """
+    Record the campaign a creator committed to
+    
+    The new selection becomes the user's only active one; selecting the same
+    campaign again refreshes its wallet address and selection time.
+    
+    Args:
+        username: Creator username
+        ad_id: Selected campaign ID
+        wallet_address: Wallet that receives the reward
+    
+    Returns:
+        Dict: The saved selection
+    """
+    selection = {
+        "username": username,
+        "ad_id": ad_id,
+        "wallet_address": wallet_address,
+        "selected_at": datetime.now().isoformat()
+    }
+    with get_db_connection(shard_path_for(username)) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE ad_selections SET is_active = 0 WHERE username = ? AND is_active = 1 AND ad_id != ?",
+            (username, ad_id)
+        )
+        cursor.execute("""
+            INSERT INTO ad_selections (username, ad_id, wallet_address, is_active, selected_at)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(username, ad_id) DO UPDATE SET
+                wallet_address = excluded.wallet_address,
+                is_active = 1,
+                selected_at = excluded.selected_at
+        """, (username, ad_id, wallet_address, selection["selected_at"]))
+        conn.commit()
+    
+    invalidate_ad_selection(username)
+    return selection
+
+
+def invalidate_ad_selection(username: str):
+    """Drop the cached selection of a user after it changed"""
+    global _ad_selection_generation
+    with _ad_selection_cache_lock:
+        _ad_selection_generation += 1
+        _ad_selection_cache.pop(username, None)
+
+
+def get_cached_ad_selection(username: str) -> tuple:
+    """
+    Look up a user's selection in the cache only
+    
+    Returns:
+        tuple: (hit, selection) where selection may be None for a cached "no selection"
+    """
+    with _ad_selection_cache_lock:
+        cached = _ad_selection_cache.get(username)
+        if cached is not None and time.monotonic() - cached[0] <= AD_SELECTION_CACHE_TTL_SECONDS:
+            _ad_selection_cache.move_to_end(username)
+            return True, cached[1]
+    return False, None
+
+
+def get_active_ad_selection(username: str) -> Optional[Dict]:
+    """
+    Get the campaign a user currently has selected
+    
+    Read-through cached per user (including "no selection") and invalidated
+    by save_ad_selection.
+    
+    Args:
+        username: Creator username
+    
+    Returns:
+        Optional[Dict]: The latest active selection, or None
+    """
+    hit, selection = get_cached_ad_selection(username)
+    if hit:
+        return selection
+    with _ad_selection_cache_lock:
+        generation = _ad_selection_generation
+    
+    with get_db_connection(shard_path_for(username)) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT username, ad_id, wallet_address, selected_at
+            FROM ad_selections
+            WHERE username = ? AND is_active = 1
+            ORDER BY selected_at DESC
+            LIMIT 1
+        """, (username,))
+        row = cursor.fetchone()
+        selection = _ad_selection_row_to_dict(row) if row else None
+    
+    with _ad_selection_cache_lock:
+        # Skip caching if a selection was saved while the query ran
+        if generation == _ad_selection_generation:
+            _ad_selection_cache[username] = (time.monotonic(), selection)
+            _ad_selection_cache.move_to_end(username)
+            while len(_ad_selection_cache) > AD_SELECTION_CACHE_SIZE:
+                _ad_selection_cache.popitem(last=False)
+    
+    return selection
+
+
+def get_ad_event_checkpoint(name: str = "ad_events") -> tuple:
+    """
+    Get the event log position already folded into ad_event_counters
+    
+    Returns:
+        tuple: (segment number, byte offset), (0, 0) if nothing was compacted yet
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT segment, offset FROM ad_event_checkpoints WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return (row["segment"], row["offset"]) if row else (0, 0)
+
+
+def apply_ad_event_counts(counts: Dict[tuple, List[int]], segment: int, offset: int, name: str = "ad_events"):
+    """
+    Add rolled-up event counts and advance the log checkpoint in one transaction
+    
+    Because both happen atomically, a crash between compaction runs can never
+    count the same log range twice or skip it.
+    
+    Args:
+        counts: {(ad_id, username, day): [impressions, clicks, last_event_ts]}
+        segment: Log segment the compactor stopped in
+        offset: Byte offset within that segment
+    """
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO ad_event_counters (ad_id, username, day, impressions, clicks, last_event_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(ad_id, username, day) DO UPDATE SET
+                impressions = impressions + excluded.impressions,
+                clicks = clicks + excluded.clicks,
+                last_event_ts = MAX(last_event_ts, excluded.last_event_ts)
+        """, [
+            (ad_id, username, day, impressions, clicks, last_ts)
+            for (ad_id, username, day), (impressions, clicks, last_ts) in counts.items()
+        ])
+        cursor.execute("""
+            INSERT INTO ad_event_checkpoints (name, segment, offset, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                segment = excluded.segment,
+                offset = excluded.offset,
+                updated_at = excluded.updated_at
+        """, (name, segment, offset, now))
+        conn.commit()
+
+
+def get_ad_event_counters(
+    ad_id: Optional[str] = None,
+    username: Optional[str] = None,
+    start_day: Optional[str] = None,
+    end_day: Optional[str] = None
+) -> List[Dict]:
+    """
+    Get impression/click totals per campaign and creator
+    
+    Args:
+        ad_id: Only this campaign (optional)
+        username: Only this creator (optional)
+        start_day: Inclusive lower bound, YYYY-MM-DD (optional)
+        end_day: Inclusive upper bound, YYYY-MM-DD (optional)
+    
+    Returns:
+        List[Dict]: ad_id, username, impressions, clicks, ctr and last_event_ts,
+            ordered by impressions desc
+    """
+    conditions = []
+    params: List = []
+    if ad_id is not None:
+        conditions.append("ad_id = ?")
+        params.append(ad_id)
+    if username is not None:
+        conditions.append("username = ?")
+        params.append(username)
+    if start_day is not None:
+        conditions.append("day >= ?")
+        params.append(start_day)
+    if end_day is not None:
+        conditions.append("day <= ?")
+        params.append(end_day)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT ad_id, username,
+                   SUM(impressions) AS impressions,
+                   SUM(clicks) AS clicks,
+                   MAX(last_event_ts) AS last_event_ts
+            FROM ad_event_counters
+            {where}
+            GROUP BY ad_id, username
+            ORDER BY impressions DESC, ad_id, username
+        """, params)
+        return [
+            {
+                "ad_id": row["ad_id"],
+                "username": row["username"],
+                "impressions": row["impressions"],
+                "clicks": row["clicks"],
+                "ctr": round(row["clicks"] / row["impressions"], 4) if row["impressions"] else 0.0,
+                "last_event_ts": row["last_event_ts"]
+            }
+            for row in cursor.fetchall()
+        ]
+
+
+def record_evaluation(evaluation: Dict, reward_amount: int) -> Dict:
+    """
+    Store an evaluation and its pending reward in one transaction
+    
+    The reward is never lost between scoring and chain submission: either
+    both rows exist and the dispatcher will submit the reward, or neither does.
+    
+    Args:
+        evaluation: Dict with evaluation_id, username, wallet_address, ad_id,
+            social_score, ai_score and final_score
+        reward_amount: Token amount to pay out
+    
+    Returns:
+        Dict: The stored reward status (see get_reward_status)
+    """
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO evaluations (
+                evaluation_id, username, wallet_address, ad_id,
+                social_score, ai_score, final_score, created_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            evaluation["evaluation_id"],
+            evaluation["username"],
+            evaluation["wallet_address"],
+            evaluation.get("ad_id"),
+            evaluation["social_score"],
+            evaluation["ai_score"],
+            evaluation["final_score"],
+            now
+        ))
+        cursor.execute("""
+            INSERT INTO reward_outbox (evaluation_id, wallet_address, amount, status, created_at, updated_at)
+            VALUES (?, ?, ?, 'pending', ?, ?)
+        """, (evaluation["evaluation_id"], evaluation["wallet_address"], reward_amount, now, now))
+        conn.commit()
+    
+    return {
+        "evaluation_id": evaluation["evaluation_id"],
+        "status": "pending",
+        "amount": reward_amount,
+        "wallet_address": evaluation["wallet_address"],
+        "attempts": 0,
+        "tx_hash": None,
+        "batch_index": None,
+        "block_number": None,
+        "confirmations": 0,
+        "last_error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def claim_pending_rewards(limit: int, lease_seconds: float) -> List[Dict]:
+    """
+    Lease due rewards for submission
+    
+    Claims pending rewards whose retry time has come, plus rewards left in
+    'submitting' by a dispatcher whose lease expired (e.g., it crashed), and
+    counts the attempt. Claiming in one write transaction keeps two
+    dispatchers from submitting the same reward concurrently.
+    
+    A reward re-claimed after an expired lease may already be on chain. Before
+    broadcasting, the dispatcher records the send (see record_reward_sends),
+    and those columns come back with the claim so the next attempt checks the
+    chain for that transaction instead of relying on the previous process's
+    memory. evaluation_id also travels with the transfer as its idempotency key.
+    
+    Args:
+        limit: Maximum rewards to claim
+        lease_seconds: How long the claim is exclusive
+    
+    Returns:
+        List[Dict]: evaluation_id, wallet_address, amount, attempts (including this one)
+            and the send recorded by the previous attempt (tx_hash, batch_index,
+            tx_nonce, tx_sent_block)
+    """
+    now = time.time()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            SELECT evaluation_id FROM reward_outbox
+            WHERE (status = 'pending' AND next_attempt_ts <= ?)
+               OR (status = 'submitting' AND lease_until_ts <= ?)
+            ORDER BY next_attempt_ts
+            LIMIT ?
+        """, (now, now, limit))
+        ids = [row["evaluation_id"] for row in cursor.fetchall()]
+        if not ids:
+            conn.commit()
+            return []
+        
+        placeholders = ",".join("?" * len(ids))
+        cursor.execute(f"""
+            UPDATE reward_outbox
+            SET status = 'submitting', attempts = attempts + 1,
+                lease_until_ts = ?, updated_at = ?
+            WHERE evaluation_id IN ({placeholders})
+        """, [now + lease_seconds, datetime.now().isoformat(), *ids])
+        cursor.execute(f"""
+            SELECT evaluation_id, wallet_address, amount, attempts,
+                   tx_hash, batch_index, tx_nonce, tx_sent_block
+            FROM reward_outbox
+            WHERE evaluation_id IN ({placeholders})
+        """, ids)
+        claimed = [dict(row) for row in cursor.fetchall()]
+        conn.commit()
+        return claimed
+
+
+def record_reward_sends(sends: List[Dict]):
+    """
+    Record how claimed rewards are about to be sent, before the broadcast
+    
+    Written while the reward is still 'submitting', so a dispatcher that
+    re-claims it after a crash or an expired lease can look the transaction
+    up on chain instead of paying it again.
+    
+    Args:
+        sends: Dicts with evaluation_id and either tx_hash and batch_index
+            (batched settlement) or tx_nonce and tx_sent_block (pipeline)
+    """
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE reward_outbox
+            SET tx_hash = ?, batch_index = ?, tx_nonce = ?, tx_sent_block = ?, updated_at = ?
+            WHERE evaluation_id = ? AND status = 'submitting'
+        """, [
+            (
+                row.get("tx_hash"),
+                row.get("batch_index"),
+                row.get("tx_nonce"),
+                row.get("tx_sent_block"),
+                now,
+                row["evaluation_id"]
+            )
+            for row in sends
+        ])
+        conn.commit()
+
+
+def complete_reward_submissions(submitted: List[Dict], failed: List[Dict]):
+    """
+    Record the outcome of one dispatch round in a single transaction
+    
+    Args:
+        submitted: Dicts with evaluation_id, tx_hash, batch_index and block_number
+        failed: Dicts with evaluation_id, error, and next_attempt_ts
+            (None = give up and mark the reward failed)
+    """
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE reward_outbox
+            SET status = 'submitted', tx_hash = ?, batch_index = ?, block_number = ?,
+                last_error = NULL, updated_at = ?
+            WHERE evaluation_id = ? AND status = 'submitting'
+        """, [
+            (row["tx_hash"], row.get("batch_index"), row.get("block_number"), now, row["evaluation_id"])
+            for row in submitted
+        ])
+        cursor.executemany("""
+            UPDATE reward_outbox
+            SET status = ?, next_attempt_ts = ?, last_error = ?, updated_at = ?
+            WHERE evaluation_id = ? AND status = 'submitting'
+        """, [
+            (
+                "pending" if row["next_attempt_ts"] is not None else "failed",
+                row["next_attempt_ts"] or 0,
+                row["error"],
+                now,
+                row["evaluation_id"]
+            )
+            for row in failed
+        ])
+        conn.commit()
+
+
+def get_submitted_rewards(limit: int) -> List[Dict]:
+    """
+    Rewards sent to the chain that are not confirmed yet, least recently checked first
+    
+    Every check stamps last_checked_at (see record_reward_checks), so rows
+    whose confirmations never change rotate to the back instead of
+    starving newer rewards. Never-checked rows (NULL) sort first.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT evaluation_id, tx_hash, confirmations, unknown_checks
+            FROM reward_outbox
+            WHERE status = 'submitted'
+            ORDER BY last_checked_at
+            LIMIT ?
+        """, (limit,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def record_reward_checks(checks: List[tuple], required: int, max_unknown_checks: int):
+    """
+    Store the result of one confirmation check per reward
+    
+    Args:
+        checks: [(evaluation_id, confirmations)], confirmations None when the
+            chain does not know the transaction
+        required: Confirmations needed to mark a reward confirmed
+        max_unknown_checks: Consecutive "unknown" checks after which the reward
+            is marked failed for manual review
+    """
+    now = datetime.now().isoformat()
+    known = [(evaluation_id, confirmations) for evaluation_id, confirmations in checks if confirmations is not None]
+    unknown = [evaluation_id for evaluation_id, confirmations in checks if confirmations is None]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("""
+            UPDATE reward_outbox
+            SET status = CASE WHEN :confirmations >= :required THEN 'confirmed' ELSE status END,
+                updated_at = CASE WHEN confirmations != :confirmations THEN :now ELSE updated_at END,
+                confirmations = :confirmations,
+                unknown_checks = 0,
+                last_checked_at = :now
+            WHERE evaluation_id = :evaluation_id AND status = 'submitted'
+        """, [
+            {"confirmations": confirmations, "required": required, "now": now, "evaluation_id": evaluation_id}
+            for evaluation_id, confirmations in known
+        ])
+        cursor.executemany("""
+            UPDATE reward_outbox
+            SET status = CASE WHEN unknown_checks + 1 >= :max_checks THEN 'failed' ELSE status END,
+                last_error = CASE WHEN unknown_checks + 1 >= :max_checks
+                    THEN 'transaction not found on chain after ' || (unknown_checks + 1) || ' checks'
+                    ELSE last_error END,
+                updated_at = CASE WHEN unknown_checks + 1 >= :max_checks THEN :now ELSE updated_at END,
+                unknown_checks = unknown_checks + 1,
+                last_checked_at = :now
+            WHERE evaluation_id = :evaluation_id AND status = 'submitted'
+        """, [
+            {"max_checks": max_unknown_checks, "now": now, "evaluation_id": evaluation_id}
+            for evaluation_id in unknown
+        ])
+        conn.commit()
+
+
+def get_reward_status(evaluation_id: str) -> Optional[Dict]:
+    """
+    Get an evaluation with the state of its reward
+    
+    Returns:
+        Optional[Dict]: Evaluation scores and a "reward" dict, or None if unknown
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT e.evaluation_id, e.username, e.wallet_address, e.ad_id,
+                   e.social_score, e.ai_score, e.final_score, e.created_at AS evaluated_at,
+                   r.amount, r.status, r.attempts, r.next_attempt_ts, r.tx_hash, r.batch_index,
+                   r.block_number, r.confirmations, r.last_error, r.created_at, r.updated_at
+            FROM evaluations e
+            JOIN reward_outbox r ON r.evaluation_id = e.evaluation_id
+            WHERE e.evaluation_id = ?
+        """, (evaluation_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            "evaluation_id": row["evaluation_id"],
+            "username": row["username"],
+            "wallet_address": row["wallet_address"],
+            "ad_id": row["ad_id"],
+            "scores": {
+                "social_score": row["social_score"],
+                "ai_score": row["ai_score"],
+                "final_score": row["final_score"]
+            },
+            "evaluated_at": row["evaluated_at"],
+            "reward": {
+                "status": row["status"],
+                "amount": row["amount"],
+                "attempts": row["attempts"],
+                "next_attempt_at": (
+                    datetime.fromtimestamp(row["next_attempt_ts"]).isoformat()
+                    if row["status"] == "pending" and row["next_attempt_ts"] else None
+                ),
+                "tx_hash": row["tx_hash"],
+                "batch_index": row["batch_index"],
+                "block_number": row["block_number"],
+                "confirmations": row["confirmations"],
+                "last_error": row["last_error"],
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"]
+            }
+        }
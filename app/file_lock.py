@@ -0,0 +1,61 @@
+"""
+Advisory inter-process file locks
+
+Used where several uvicorn workers share files on local disk. POSIX uses
+fcntl.flock; Windows locks the first byte of the file with msvcrt.locking.
+Either way the lock is released when the descriptor is closed, including
+when the process dies.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def try_lock(fd: int) -> bool:
+    """Take an exclusive lock without waiting; False if another holder has it"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def lock(fd: int, poll_interval: float = 0.01):
+    """Take an exclusive lock, waiting for the current holder to release it"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    while not try_lock(fd):
+        time.sleep(poll_interval)
+
+
+def unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked(path: str):
+    """Hold an exclusive lock on path (created if missing) for the duration of the block"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        lock(fd)
+        try:
+            yield
+        finally:
+            unlock(fd)
+    finally:
+        os.close(fd)
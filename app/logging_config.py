@@ -0,0 +1,166 @@
+"""
+Structured, non-blocking logging
+
+setup_logging() routes every record through a QueueHandler. The request path
+only runs the handler filters and puts the record on an in-memory queue. A
+QueueListener thread does the %-formatting, JSON encoding and stdout writes.
+Messages should therefore use logger.info("... %s", value) or extra={...}
+rather than f-strings, so formatting is deferred as well.
+
+Each line is one JSON object:
+    {"ts": ..., "level": "INFO", "logger": "app.api.evaluation",
+     "message": "...", "request_id": "...", <extra fields>}
+
+Environment:
+    LOG_LEVEL              Root level (default INFO)
+    LOG_LEVELS             Per-logger levels, e.g. "app.db=WARNING,app.services.tx_pipeline=DEBUG"
+    LOG_DEBUG_SAMPLE_RATE  Share of requests whose DEBUG records are kept (default 0.1).
+                           Sampling is per request id, so a sampled request keeps all of
+                           its debug lines; records outside a request are sampled randomly.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+# Request id of the request being handled (set by the middleware in app.main)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_stream_handler: Optional[logging.Handler] = None
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """
+    Parse "logger=LEVEL,logger=LEVEL" into {logger: level}
+    
+    Raises:
+        ValueError: If an entry is malformed or names an unknown level
+    """
+    levels = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid LOG_LEVELS entry: {item!r}")
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Unknown log level in LOG_LEVELS: {item!r}")
+        levels[name.strip()] = value
+    return levels
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id (runs on the calling thread, before the queue)"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep DEBUG records for a sample of requests; other levels always pass"""
+    
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._threshold = int(max(0.0, min(1.0, rate)) * 10000)
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return zlib.crc32(request_id.encode()) % 10000 < self._threshold
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including extra={...} fields"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue the record as-is; formatting happens on the listener thread"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging():
+    """Install the queue handler on the root logger and start the listener thread (idempotent)"""
+    global _listener, _stream_handler
+    if _listener is not None:
+        return
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(DebugSamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+    
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    
+    _stream_handler = stream_handler
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the listener thread (call at shutdown)
+    
+    Records logged afterwards are written directly instead of piling up in
+    a queue nobody reads.
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    direct_handler = logging.StreamHandler(sys.stdout)
+    direct_handler.setFormatter(_stream_handler.formatter)
+    direct_handler.addFilter(RequestIdFilter())
+    logging.getLogger().handlers = [direct_handler]
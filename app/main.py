@@ -1,6 +1,24 @@
-from fastapi import FastAPI
-from app.api import evaluation, advertisement, coins
+import time
+import uuid
+from fastapi import FastAPI, Request, Response
+from app.logging_config import request_id_var, setup_logging, stop_logging
+from app.api import evaluation, advertisement, coins, admin
+from app.metrics import HTTP_REQUEST_SECONDS, render_metrics
 from app.db import init_db
+from app.async_db import shutdown_db_executor
+from app.services.coin_service import close_http_session, seed_coin_registry
+from app.services.advertisement_service import (
+    seed_ad_catalog,
+    start_channel_cache_warmer,
+    stop_channel_cache_warmer
+)
+from app.services.price_stream import start_price_poller, stop_price_poller
+from app.services.ad_events import start_ad_event_pipeline, stop_ad_event_pipeline
+from app.services.contract_service import flush_reward_settlements
+from app.services.reward_dispatcher import start_reward_dispatcher, stop_reward_dispatcher
+
+# JSON 구조화 로깅 (포맷/출력은 로그 리스너 스레드에서 처리)
+setup_logging()
 
 app = FastAPI(
     title="Companion Camp Backend",
@@ -9,16 +27,67 @@ app = FastAPI(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """라우트별 응답 시간 기록 (경로 템플릿 기준, 매칭되지 않은 경로는 하나로 묶음)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method,
+            route.path if route is not None else "unmatched",
+            str(status)
+        ).observe(time.perf_counter() - started)
+
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """요청 ID 지정 (X-Request-ID 헤더가 있으면 사용), 이 요청의 모든 로그에 포함되고 응답 헤더로 반환"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 @app.on_event("startup")
 async def startup_event():
-    """애플리케이션 시작 시 데이터베이스 초기화"""
+    """애플리케이션 시작 시 데이터베이스 초기화 및 기본 코인 등록"""
     init_db()
+    seed_coin_registry()
+    seed_ad_catalog()
+    start_price_poller()
+    start_ad_event_pipeline()
+    start_channel_cache_warmer()
+    start_reward_dispatcher()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 가격 폴러/캐시 예열 중지, 광고 이벤트 로그/보상 전송 반영, 공유 HTTP 세션, DB 실행기 및 로그 리스너 정리"""
+    await stop_price_poller()
+    await stop_ad_event_pipeline()
+    await stop_channel_cache_warmer()
+    await stop_reward_dispatcher()
+    await flush_reward_settlements()
+    await close_http_session()
+    await shutdown_db_executor()
+    stop_logging()
 
 
 # 라우터 등록
 app.include_router(evaluation.router)
 app.include_router(advertisement.router)
 app.include_router(coins.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -35,3 +104,10 @@ async def health_check():
     """헬스 체크 엔드포인트"""
     return {"status": "healthy"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 메트릭 엔드포인트"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
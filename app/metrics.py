@@ -0,0 +1,191 @@
+"""
+Prometheus metrics
+
+All metrics live in this module so every service records into the same
+registry, and GET /metrics (see app.main) exposes them in the Prometheus text
+format. Route labels use the route template (/coins/{symbol}/candles), never
+the raw path, so label cardinality stays bounded.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers; /metrics then aggregates all of them.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Buckets (seconds) for request and upstream latencies
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Finer buckets for DB calls, which are mostly sub-millisecond
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+EVALUATION_STAGE_SECONDS = Histogram(
+    "evaluation_stage_duration_seconds",
+    "Latency of each analyze_pet_account stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+UPSTREAM_REQUESTS_TOTAL = Counter(
+    "upstream_requests_total",
+    "Calls to external services by outcome",
+    ["upstream", "operation", "outcome"]
+)
+
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to external services",
+    ["upstream", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+UPSTREAM_CONNECTIONS_TOTAL = Counter(
+    "upstream_connections_total",
+    "Requests on a shared HTTP session by whether they opened a new connection or reused a pooled one",
+    ["upstream", "connection"]
+)
+
+UPSTREAM_CONNECT_SECONDS = Histogram(
+    "upstream_connect_duration_seconds",
+    "Time to open a new connection (DNS, TCP and TLS) on a shared HTTP session",
+    ["upstream"],
+    buckets=LATENCY_BUCKETS
+)
+
+UPSTREAM_DNS_LOOKUPS_TOTAL = Counter(
+    "upstream_dns_lookups_total",
+    "Host lookups on a shared HTTP session by result (resolved, cache_hit)",
+    ["upstream", "result"]
+)
+
+FALLBACKS_TOTAL = Counter(
+    "fallbacks_total",
+    "Responses served from placeholder data because an upstream failed",
+    ["source", "reason"]
+)
+
+CACHE_LOOKUPS_TOTAL = Counter(
+    "cache_lookups_total",
+    "In-process cache lookups by result (hit, stale, miss)",
+    ["cache", "result"]
+)
+
+PRICE_STREAM_SUBSCRIBERS = Gauge(
+    "price_stream_subscribers",
+    "Connected price stream clients",
+    multiprocess_mode="livesum"
+)
+
+PRICE_STREAM_EVENTS_TOTAL = Counter(
+    "price_stream_events_total",
+    "Price stream fan-out events (published, coalesced, dropped)",
+    ["event"]
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Time spent running app.db functions on the DB executor",
+    ["operation"],
+    buckets=DB_BUCKETS
+)
+
+DB_QUEUE_WAIT_SECONDS = Histogram(
+    "db_queue_wait_seconds",
+    "Time spent waiting for a DB executor queue slot",
+    buckets=DB_BUCKETS
+)
+
+DB_BUSY_TOTAL = Counter(
+    "db_busy_total",
+    "DB calls rejected because the executor queue stayed full"
+)
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Time one call to an external service and count its outcome
+    
+    The call counts as an error if the block raises. Code that detects a
+    failure without raising (a non-200 status, for example) can call
+    mark_error() on the yielded tracker.
+    
+    Usage:
+        with track_upstream("dexscreener", "tokens") as call:
+            ...
+            if response.status != 200:
+                call.mark_error()
+    """
+    call = _UpstreamCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.mark_error()
+        raise
+    finally:
+        UPSTREAM_REQUEST_SECONDS.labels(upstream, operation).observe(time.perf_counter() - started)
+        UPSTREAM_REQUESTS_TOTAL.labels(upstream, operation, call.outcome).inc()
+
+
+class _UpstreamCall:
+    def __init__(self):
+        self.outcome = "success"
+    
+    def mark_error(self):
+        self.outcome = "error"
+
+
+class StageTimer:
+    """
+    Records consecutive stages of one request into a histogram
+    
+    start(stage) closes the previous stage and opens the next one;
+    stop() closes the last one.
+    """
+    
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self._stage: Optional[str] = None
+        self._started = 0.0
+    
+    def start(self, stage: str):
+        self.stop()
+        self._stage = stage
+        self._started = time.perf_counter()
+    
+    def stop(self):
+        if self._stage is not None:
+            self.histogram.labels(self._stage).observe(time.perf_counter() - self._started)
+            self._stage = None
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format
+    
+    Returns:
+        Tuple[bytes, str]: Response body and content type
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,447 @@
+"""
+Ad impression/click event ingestion
+
+Events are never written to SQLite one by one. Each ingested batch is
+serialized to JSON lines and appended to the active segment of an
+append-only log on local disk. Concurrent batches share one fsync
+(group commit): a caller returns only after the fsync that covers its batch,
+and fsyncs run at most once per AD_EVENT_FSYNC_INTERVAL_MS.
+
+A background compactor periodically reads the log from its last checkpoint,
+rolls the events up into per-campaign/per-creator/per-day counters in memory
+and applies them to ad_event_counters together with the new checkpoint in a
+single transaction. Fully compacted segments are deleted afterwards.
+
+Layout:
+    <AD_EVENT_LOG_DIR>/segment-<number>.log            worker slot 0
+    <AD_EVENT_LOG_DIR>/worker-<n>/segment-<number>.log worker slot n
+    <slot directory>/.lock                             held by the slot's owner
+
+Worker processes share AD_EVENT_LOG_DIR. Each one takes the first slot
+whose .lock it can lock exclusively and writes, compacts and checkpoints
+only that slot. Slots are reused after a restart, so segments left by a
+previous process are picked up by its successor; if the worker count
+shrinks, the higher slots are compacted once a process takes them again.
+
+Each process opens a new segment on startup, so a line torn by a crash is
+always at the end of a sealed segment, where the compactor skips it.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from app import db, file_lock
+
+logger = logging.getLogger(__name__)
+
+AD_EVENT_LOG_DIR = os.getenv(
+    "AD_EVENT_LOG_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "ad_events")
+)
+AD_EVENT_SEGMENT_BYTES = int(os.getenv("AD_EVENT_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+AD_EVENT_FSYNC_INTERVAL_MS = float(os.getenv("AD_EVENT_FSYNC_INTERVAL_MS", "10"))
+AD_EVENT_COMPACT_INTERVAL_SECONDS = float(os.getenv("AD_EVENT_COMPACT_INTERVAL_SECONDS", "10"))
+# Upper bound on log bytes folded per compaction run (bounds compactor memory)
+AD_EVENT_COMPACT_MAX_BYTES = int(os.getenv("AD_EVENT_COMPACT_MAX_BYTES", str(32 * 1024 * 1024)))
+
+EVENT_TYPES = ("impression", "click")
+
+_SEGMENT_NAME = re.compile(r"^segment-(\d+)\.log$")
+
+
+class AdEventLog:
+    """
+    Segmented append-only event log
+
+    append() only copies bytes into the active segment's buffer; durability
+    comes from sync(), which is called by the group-commit flusher.
+    """
+
+    def __init__(self, base_dir: str = AD_EVENT_LOG_DIR, segment_bytes: int = AD_EVENT_SEGMENT_BYTES):
+        self.base_dir = base_dir
+        self.segment_bytes = segment_bytes
+        self.log_dir: Optional[str] = None          # this process's slot, set by claim()
+        self.checkpoint_name: Optional[str] = None
+        self._slot_lock_fd: Optional[int] = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment = 0
+        self._written = 0        # bytes appended to the active segment
+        self._durable = 0        # bytes of the active segment known to be fsynced
+        self._appended_seq = 0   # number of append() calls so far
+        self._synced_seq = 0     # appends covered by the last completed fsync
+
+    def claim(self) -> str:
+        """
+        Take this process's worker slot (idempotent)
+
+        Returns:
+            str: The slot directory segments are written to
+        """
+        with self._lock:
+            return self._claim()
+
+    def _claim(self) -> str:
+        slot = 0
+        while self.log_dir is None:
+            path = self.base_dir if slot == 0 else os.path.join(self.base_dir, f"worker-{slot}")
+            os.makedirs(path, exist_ok=True)
+            fd = os.open(os.path.join(path, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            if file_lock.try_lock(fd):
+                self._slot_lock_fd = fd
+                self.log_dir = path
+                self.checkpoint_name = "ad_events" if slot == 0 else f"ad_events:worker-{slot}"
+            else:
+                os.close(fd)
+                slot += 1
+        return self.log_dir
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.log_dir, f"segment-{segment:012d}.log")
+
+    def segments(self) -> List[int]:
+        """Segment numbers present in this process's slot, oldest first"""
+        if self.log_dir is None or not os.path.isdir(self.log_dir):
+            return []
+        numbers = []
+        for name in os.listdir(self.log_dir):
+            match = _SEGMENT_NAME.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _open_next_segment(self):
+        self._claim()
+        existing = self.segments()
+        self._segment = max(self._segment, existing[-1] if existing else 0) + 1
+        self._file = open(self.segment_path(self._segment), "ab")
+        self._written = 0
+        self._durable = 0
+
+    def _seal_active_segment(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def append(self, payload: bytes) -> int:
+        """
+        Append newline-terminated records to the active segment
+
+        Returns:
+            int: Sequence number to pass to the durability wait
+        """
+        with self._lock:
+            if self._file is None:
+                self._open_next_segment()
+            elif self._written and self._written + len(payload) > self.segment_bytes:
+                self._seal_active_segment()
+                self._open_next_segment()
+            self._file.write(payload)
+            self._written += len(payload)
+            self._appended_seq += 1
+            return self._appended_seq
+
+    def sync(self) -> int:
+        """
+        Flush and fsync everything appended so far
+
+        The fsync runs on a duplicated descriptor outside the lock, so appends
+        are never blocked behind the disk.
+
+        Returns:
+            int: Highest append sequence number that is now durable
+        """
+        with self._lock:
+            if self._file is None:
+                return self._appended_seq
+            seq = self._appended_seq
+            segment = self._segment
+            offset = self._written
+            self._file.flush()
+            fd = os.dup(self._file.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._synced_seq = max(self._synced_seq, seq)
+            if segment == self._segment:
+                self._durable = max(self._durable, offset)
+            return self._synced_seq
+
+    def durable_position(self) -> Tuple[int, int]:
+        """(active segment, fsynced bytes in it); sealed segments are durable in full"""
+        with self._lock:
+            return self._segment, self._durable
+
+    def close(self):
+        """Seal the active segment and release the worker slot"""
+        with self._lock:
+            if self._file is not None:
+                self._seal_active_segment()
+                self._synced_seq = self._appended_seq
+            if self._slot_lock_fd is not None:
+                os.close(self._slot_lock_fd)
+                self._slot_lock_fd = None
+                self.log_dir = None
+                self.checkpoint_name = None
+                self._segment = 0
+
+
+def encode_events(events: List[Dict]) -> bytes:
+    """Serialize validated events as JSON lines"""
+    return b"".join(
+        json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        for event in events
+    )
+
+
+class AdEventIngestor:
+    """
+    Group commit over an AdEventLog
+
+    Batches appended while an fsync is in flight (or within the fsync interval)
+    are made durable together by the next fsync.
+    """
+
+    def __init__(self, log: AdEventLog, fsync_interval_ms: float = AD_EVENT_FSYNC_INTERVAL_MS):
+        self.log = log
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.events = 0
+        self.fsyncs = 0
+
+    async def ingest(self, events: List[Dict]):
+        """Append a batch and return once it is on disk"""
+        # The write can block (page cache pressure, segment rollover fsync), so keep it off the loop
+        seq = await asyncio.to_thread(self.log.append, encode_events(events))
+        self.batches += 1
+        self.events += len(events)
+
+        if self._task is None or self._task.done():
+            # No flusher running (e.g., background tasks disabled): fsync inline
+            await asyncio.to_thread(self.log.sync)
+            self.fsyncs += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((seq, future))
+        self._wakeup.set()
+        await future
+
+    async def _flush_loop(self):
+        last_sync = 0.0
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            delay = self.fsync_interval - (time.monotonic() - last_sync)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            waiters, self._waiters = self._waiters, []
+            try:
+                synced = await asyncio.to_thread(self.log.sync)
+            except asyncio.CancelledError:
+                self._waiters = waiters + self._waiters
+                raise
+            except Exception as e:
+                logger.error("Ad event log fsync failed: %s", e)
+                for _, future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            last_sync = time.monotonic()
+            self.fsyncs += 1
+
+            for seq, future in waiters:
+                if future.done():
+                    continue
+                if seq <= synced:
+                    future.set_result(None)
+                else:
+                    self._waiters.append((seq, future))
+                    self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and make every pending batch durable"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        waiters, self._waiters = self._waiters, []
+        if waiters:
+            await asyncio.to_thread(self.log.sync)
+            for _, future in waiters:
+                if not future.done():
+                    future.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "events": self.events,
+            "fsyncs": self.fsyncs,
+            "pending": len(self._waiters),
+        }
+
+
+class AdEventCompactor:
+    """Rolls the event log up into ad_event_counters, resuming from a checkpoint"""
+
+    def __init__(self, log: AdEventLog, max_bytes: int = AD_EVENT_COMPACT_MAX_BYTES):
+        self.log = log
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def compact_once(self) -> Dict:
+        """
+        Fold newly durable log records into the counters
+
+        Returns:
+            Dict: events and bytes folded in this run, plus malformed lines skipped
+        """
+        with self._lock:
+            return self._compact()
+
+    def _compact(self) -> Dict:
+        self.log.claim()
+        checkpoint_name = self.log.checkpoint_name
+        checkpoint_segment, checkpoint_offset = db.get_ad_event_checkpoint(checkpoint_name)
+        active_segment, active_durable = self.log.durable_position()
+
+        counts: Dict[tuple, List[int]] = {}
+        days: Dict[int, str] = {}
+        position = (checkpoint_segment, checkpoint_offset)
+        events = 0
+        skipped = 0
+        budget = self.max_bytes
+
+        for segment in self.log.segments():
+            if segment < checkpoint_segment:
+                continue
+            sealed = segment != active_segment
+            path = self.log.segment_path(segment)
+            start = checkpoint_offset if segment == checkpoint_segment else 0
+            end = os.path.getsize(path) if sealed else active_durable
+            if end <= start:
+                position = (segment, max(start, end))
+                continue
+
+            length = min(end - start, budget)
+            with open(path, "rb") as f:
+                f.seek(start)
+                chunk = f.read(length)
+            consumed = chunk.rfind(b"\n") + 1
+
+            for line in chunk[:consumed].splitlines():
+                try:
+                    event = json.loads(line)
+                    ts = int(event["ts"])
+                    key_day = ts // 86400
+                    day = days.get(key_day)
+                    if day is None:
+                        day = days[key_day] = time.strftime("%Y-%m-%d", time.gmtime(ts))
+                    counter = counts.setdefault((event["ad_id"], event["username"], day), [0, 0, 0])
+                    counter[0 if event["type"] == "impression" else 1] += 1
+                    counter[2] = max(counter[2], ts)
+                    events += 1
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+
+            budget -= consumed
+            position = (segment, start + consumed)
+            if start + consumed < end:
+                if sealed and length == end - start:
+                    # Torn final line left by a crash: nothing will ever complete it
+                    logger.warning("Skipping %d torn bytes at the end of %s", end - start - consumed, path)
+                    position = (segment, end)
+                else:
+                    break
+            if budget <= 0:
+                break
+
+        if position != (checkpoint_segment, checkpoint_offset):
+            db.apply_ad_event_counts(counts, *position, name=checkpoint_name)
+        self._delete_compacted(position)
+
+        return {
+            "events": events,
+            "skipped": skipped,
+            "bytes": self.max_bytes - budget,
+            "checkpoint": {"segment": position[0], "offset": position[1]},
+        }
+
+    def _delete_compacted(self, position: Tuple[int, int]):
+        active_segment, _ = self.log.durable_position()
+        for segment in self.log.segments():
+            if segment >= position[0] or segment == active_segment:
+                break
+            try:
+                os.remove(self.log.segment_path(segment))
+            except OSError as e:
+                logger.error("Failed to delete compacted ad event segment %d: %s", segment, e)
+                break
+
+
+ad_event_log = AdEventLog()
+ad_event_ingestor = AdEventIngestor(ad_event_log)
+ad_event_compactor = AdEventCompactor(ad_event_log)
+
+_compactor_task: Optional[asyncio.Task] = None
+
+
+async def _run_compactor(interval: float):
+    """Compact the event log once per interval"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await asyncio.to_thread(ad_event_compactor.compact_once)
+            if result["events"]:
+                logger.info("Compacted %d ad events into counters", result["events"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Ad event compaction failed: %s", e)
+
+
+def start_ad_event_pipeline(compact_interval: float = AD_EVENT_COMPACT_INTERVAL_SECONDS):
+    """Start the group-commit flusher and the compactor (called on application startup)"""
+    global _compactor_task
+    ad_event_ingestor.start()
+    if _compactor_task is None or _compactor_task.done():
+        _compactor_task = asyncio.create_task(_run_compactor(compact_interval))
+
+
+async def stop_ad_event_pipeline():
+    """Flush pending events, fold the log into the counters and close it (called on shutdown)"""
+    global _compactor_task
+    if _compactor_task is not None:
+        _compactor_task.cancel()
+        try:
+            await _compactor_task
+        except asyncio.CancelledError:
+            pass
+        _compactor_task = None
+    await ad_event_ingestor.stop()
+    await asyncio.to_thread(ad_event_log.sync)
+    try:
+        await asyncio.to_thread(ad_event_compactor.compact_once)
+    except Exception as e:
+        logger.error("Final ad event compaction failed: %s", e)
+    await asyncio.to_thread(ad_event_log.close)
@@ -0,0 +1,129 @@
+"""
+광고-콘텐츠 관련도 계산
+- 문자 n-gram을 해시해 고정 크기 희소 벡터로 만들고 TF-IDF 가중치를 적용합니다.
+- 캠페인 행렬은 카탈로그가 바뀔 때 한 번만 만들고, 요청마다 크리에이터 트윗 벡터
+  하나와의 희소 행렬-벡터 곱으로 모든 캠페인의 코사인 유사도를 구합니다.
+- 형태소 분석기 없이 한국어/영어/해시태그를 같은 방식으로 처리합니다.
+"""
+import re
+import zlib
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+
+# 해시 공간 크기 (2^18 = 262,144 차원)
+RELEVANCE_HASH_BITS = 18
+# 사용할 문자 n-gram 길이
+RELEVANCE_NGRAM_RANGE = (2, 4)
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    """소문자화 + 문장부호/이모지/# 제거 (단어 경계는 공백 하나로)"""
+    return " " + _NON_WORD.sub(" ", text.lower()).strip() + " "
+
+
+class HashedNgramVectorizer:
+    """
+    문자 n-gram 해시 벡터화기
+    - 어휘 사전이 없으므로 학습 없이 어떤 텍스트도 같은 공간에 매핑됩니다.
+    - 해시는 crc32라서 워커/재시작과 무관하게 같은 차원에 매핑됩니다.
+    """
+
+    def __init__(self, hash_bits: int = RELEVANCE_HASH_BITS, ngram_range: tuple = RELEVANCE_NGRAM_RANGE):
+        self.n_features = 1 << hash_bits
+        self._mask = self.n_features - 1
+        self.ngram_range = ngram_range
+
+    def counts(self, text: str) -> Dict[int, int]:
+        """텍스트 하나의 해시 n-gram 빈도 {차원: 횟수}"""
+        normalized = _normalize(text)
+        counts: Dict[int, int] = {}
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(normalized) - n + 1):
+                gram = normalized[i:i + n]
+                if gram.isspace():
+                    continue
+                column = zlib.crc32(gram.encode("utf-8")) & self._mask
+                counts[column] = counts.get(column, 0) + 1
+        return counts
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        """텍스트 목록 -> (문서 수 x n_features) 빈도 행렬"""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        for text in texts:
+            counts = self.counts(text)
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), self.n_features)
+        )
+
+
+def _l2_normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def campaign_document(campaign: Dict) -> str:
+    """캠페인을 대표하는 텍스트 (제목 + 광고 문구 + 카테고리 + 키워드)"""
+    parts = [
+        campaign.get("title", ""),
+        campaign.get("ad_text", ""),
+        campaign.get("category", ""),
+        " ".join(campaign.get("keywords") or [])
+    ]
+    return " ".join(part for part in parts if part)
+
+
+class CampaignRelevanceIndex:
+    """
+    캠페인 TF-IDF 행렬 (행: 캠페인, 카탈로그 순서)
+    - IDF는 캠페인 말뭉치 기준이라 모든 광고에 흔한 n-gram("반려동물" 등)의 비중이 낮아집니다.
+    - score()는 쿼리 벡터 하나와의 행렬-벡터 곱 한 번으로 전체 캠페인 점수를 반환합니다.
+    """
+
+    def __init__(self, campaigns: List[Dict], vectorizer: HashedNgramVectorizer = None):
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        counts = self.vectorizer.transform([campaign_document(campaign) for campaign in campaigns])
+
+        # smooth idf: log((1 + N) / (1 + df)) + 1
+        n_docs = counts.shape[0]
+        df = np.bincount(counts.indices, minlength=self.vectorizer.n_features)
+        self._idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+        # 쿼리에 등장한 열만 잘라 쓰기 위해 열 우선(CSC)으로 보관
+        self._matrix = _l2_normalize_rows(self._weight(counts)).tocsc()
+        self.size = n_docs
+
+    def _weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        """sublinear tf (1 + log tf) x idf"""
+        weighted = counts.copy()
+        weighted.data = (1.0 + np.log(weighted.data)) * self._idf[weighted.indices]
+        return weighted
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        """
+        텍스트들(예: 최근 트윗)을 하나의 문서로 보고 모든 캠페인과의 코사인 유사도 계산
+
+        Returns:
+            캠페인 순서의 점수 배열 (0~1)
+        """
+        if self.size == 0:
+            return np.zeros(0)
+        counts = self.vectorizer.counts(" ".join(texts))
+        if not counts:
+            return np.zeros(self.size)
+        columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        weights = (1.0 + np.log(tf)) * self._idf[columns]
+        weights /= np.linalg.norm(weights)
+        return self._matrix[:, columns] @ weights
@@ -1,15 +1,484 @@
-from typing import List, Dict
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+import asyncio
+import logging
+import os
+import re
+from typing import Awaitable, Callable, List, Dict, Optional, Sequence, Tuple
+import time
+import numpy as np
+from app import async_db
+from app.db import seed_ad_campaigns
+from app.metrics import CACHE_LOOKUPS_TOTAL
+from app.services.ad_relevance import CampaignRelevanceIndex
 from app.services.social_service import SocialService
 
+logger = logging.getLogger(__name__)
+
+# 채널 규모 구분 (팔로워 수 하한, 이름)
+CHANNEL_TIERS = [(0, "소형"), (5000, "중형"), (20000, "대형")]
+# 대량 단가 견적 API에서 채널 규모별 배율을 지정할 때 쓰는 키 (CHANNEL_TIERS와 같은 순서)
+CHANNEL_TIER_KEYS = ["small", "medium", "large"]
+
+# 추천 광고 최소 개수
+MIN_RECOMMENDATIONS = 3
+
+# 캠페인 카탈로그 버전 확인 주기 (초) - 다른 워커의 변경도 이 시간 안에 반영됩니다
+AD_CATALOG_CHECK_SECONDS = 5.0
+
+# 크리에이터 채널 볼륨 캐시 (팔로워/참여율은 한 시간 안에 거의 변하지 않음)
+# TTL이 지나면 기존 값을 그대로 응답하고 백그라운드에서 갱신하며 (stale-while-revalidate),
+# TTL + STALE 시간이 지난 값만 응답 전에 다시 조회합니다.
+CHANNEL_VOLUME_TTL_SECONDS = float(os.getenv("CHANNEL_VOLUME_TTL_SECONDS", "1800"))
+CHANNEL_VOLUME_STALE_SECONDS = float(os.getenv("CHANNEL_VOLUME_STALE_SECONDS", "21600"))
+# 추천 정렬에 쓰는 최근 트윗 캐시
+CREATOR_TWEETS_TTL_SECONDS = float(os.getenv("CREATOR_TWEETS_TTL_SECONDS", "900"))
+CREATOR_TWEETS_STALE_SECONDS = float(os.getenv("CREATOR_TWEETS_STALE_SECONDS", "3600"))
+CREATOR_CACHE_MAX_ENTRIES = 50000
+
+# 조회수 상위 크리에이터 캐시 예열 (만료 전에 미리 갱신해 페이지 로드 시 X 호출이 없도록)
+CHANNEL_CACHE_WARM_INTERVAL_SECONDS = float(os.getenv("CHANNEL_CACHE_WARM_INTERVAL_SECONDS", "300"))
+CHANNEL_CACHE_WARM_TOP_N = int(os.getenv("CHANNEL_CACHE_WARM_TOP_N", "200"))
+CHANNEL_CACHE_WARM_CONCURRENCY = 8
+CHANNEL_CACHE_WARMER_ENABLED = os.getenv("CHANNEL_CACHE_WARMER_ENABLED", "1") == "1"
+
+# 추천 관련도 계산에 쓰는 최근 트윗 수
+RELEVANCE_TWEET_COUNT = 20
+
+# 기본 광고 캠페인 (최초 실행 시 DB에 등록)
+# 팔로워 구간은 [min_followers, max_followers) 이며 max_followers=None 은 상한 없음
+# keywords: 게시물 광고 검증에 사용할 필수 문구 (없으면 ad_text의 해시태그 사용)
+DEFAULT_AD_CAMPAIGNS = [
+    {
+        "ad_id": "ad_001",
+        "title": "프리미엄 펫 사료 프로모션",
+        "ad_text": "🐾 최고급 펫 사료를 특가로 만나보세요! 지금 구매하면 20% 할인 + 무료배송! #펫사료 #반려동물",
+        "banner_image_url": "https://example.com/banners/pet_food_banner.jpg",
+        "category": "펫 케어",
+        "min_followers": 0,
+        "max_followers": 20000,
+        "keywords": ["펫사료", "반려동물"]
+    },
+    {
+        "ad_id": "ad_002",
+        "title": "반려동물 의류 신상품",
+        "ad_text": "✨ 귀여운 반려동물 의류 신상품 출시! 따뜻한 겨울을 위한 필수 아이템 🧥 #펫패션 #반려동물의류",
+        "banner_image_url": "https://example.com/banners/pet_clothing_banner.jpg",
+        "category": "펫 패션",
+        "min_followers": 0,
+        "max_followers": 20000,
+        "keywords": ["펫패션", "반려동물의류"]
+    },
+    {
+        "ad_id": "ad_003",
+        "title": "펫 호텔 예약 서비스",
+        "ad_text": "🏨 여행 가실 때 걱정 없이! 프리미엄 펫 호텔에서 반려동물을 안전하게 돌봐드립니다. 지금 예약하세요! #펫호텔 #펫케어",
+        "banner_image_url": "https://example.com/banners/pet_hotel_banner.jpg",
+        "category": "펫 서비스",
+        "min_followers": 5000,
+        "max_followers": None,
+        "keywords": ["펫호텔", "펫케어"]
+    },
+    {
+        "ad_id": "ad_004",
+        "title": "반려동물 건강검진 이벤트",
+        "ad_text": "🏥 반려동물 건강검진 특가 이벤트! 정기 검진으로 건강한 반려생활을 시작하세요 💚 #펫건강 #반려동물검진",
+        "banner_image_url": "https://example.com/banners/pet_checkup_banner.jpg",
+        "category": "펫 케어",
+        "min_followers": 0,
+        "max_followers": None,
+        "keywords": ["펫건강", "반려동물검진"]
+    },
+    {
+        "ad_id": "ad_005",
+        "title": "펫 용품 할인 이벤트",
+        "ad_text": "🛍️ 반려동물 필수 용품 대할인! 장난감, 산책용품, 급여기 등 다양한 상품을 특가로! #펫용품 #반려동물용품",
+        "banner_image_url": "https://example.com/banners/pet_supplies_banner.jpg",
+        "category": "펫 용품",
+        "min_followers": 0,
+        "max_followers": 5000,
+        "keywords": ["펫용품", "반려동물용품"]
+    }
+]
+
+
+def describe_follower_range(min_followers: int, max_followers: Optional[int]) -> str:
+    """
+    팔로워 구간을 채널 규모 라벨로 변환 (예: "소형~중형 채널", "모든 채널")
+    """
+    if min_followers <= 0 and max_followers is None:
+        return "모든 채널"
+    
+    thresholds = [threshold for threshold, _ in CHANNEL_TIERS]
+    first = bisect_right(thresholds, max(min_followers, 0)) - 1
+    last = len(CHANNEL_TIERS) - 1 if max_followers is None else bisect_right(thresholds, max_followers - 1) - 1
+    last = max(first, last)
+    
+    if first == last:
+        return f"{CHANNEL_TIERS[first][1]} 채널"
+    return f"{CHANNEL_TIERS[first][1]}~{CHANNEL_TIERS[last][1]} 채널"
+
+
+def campaign_keywords(campaign: Dict) -> List[str]:
+    """캠페인 검증 키워드 (지정되지 않았으면 광고 문구의 해시태그)"""
+    if campaign.get("keywords"):
+        return list(campaign["keywords"])
+    return re.findall(r"#(\w+)", campaign.get("ad_text", ""))
+
+
+class FollowerIntervalIndex:
+    """
+    팔로워 수 -> 해당 구간의 캠페인 목록 인덱스 (centered interval tree)
+    - 각 노드는 중심값을 포함하는 구간들을 시작값 오름차순/종료값 내림차순으로 보관하고,
+      중심값보다 완전히 왼쪽/오른쪽에 있는 구간은 하위 노드로 보냅니다.
+    - 구축 O(n log n), 조회 O(log n + 결과 수). 카탈로그가 바뀔 때만 다시 구축합니다.
+    """
+    
+    def __init__(self, campaigns: List[Dict]):
+        intervals = []
+        for position, campaign in enumerate(campaigns):
+            low = max(campaign["min_followers"], 0)
+            high = campaign["max_followers"] if campaign["max_followers"] is not None else float("inf")
+            if high > low:
+                intervals.append((low, high, position))
+        self._campaigns = campaigns
+        self._root = self._build(intervals)
+        self.size = len(campaigns)
+    
+    def _build(self, intervals: List[Tuple]) -> Optional[Tuple]:
+        if not intervals:
+            return None
+        
+        # 시작값들의 중앙값을 중심으로 사용 (그 구간은 항상 이 노드에 남으므로 재귀가 끝남)
+        lows = sorted(low for low, _, _ in intervals)
+        center = lows[len(lows) // 2]
+        
+        left, right, overlapping = [], [], []
+        for interval in intervals:
+            low, high, _ = interval
+            if high <= center:
+                left.append(interval)
+            elif low > center:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+        
+        by_low = sorted(overlapping, key=lambda interval: interval[0])
+        by_high = sorted(overlapping, key=lambda interval: interval[1], reverse=True)
+        return (center, by_low, by_high, self._build(left), self._build(right))
+    
+    def lookup(self, followers: int) -> Tuple[Dict, ...]:
+        """팔로워 수가 [min_followers, max_followers) 에 포함되는 캠페인 목록 (카탈로그 순서)"""
+        followers = max(followers, 0)
+        positions = []
+        node = self._root
+        while node is not None:
+            center, by_low, by_high, left, right = node
+            if followers < center:
+                # 모든 구간이 center를 덮으므로 시작값만 확인하면 됨
+                for low, _, position in by_low:
+                    if low > followers:
+                        break
+                    positions.append(position)
+                node = left
+            else:
+                # 모든 구간의 시작값이 center 이하이므로 종료값만 확인하면 됨
+                for _, high, position in by_high:
+                    if high <= followers:
+                        break
+                    positions.append(position)
+                node = right
+        positions.sort()
+        return tuple(self._campaigns[position] for position in positions)
+
+
+class AdCatalog:
+    """DB 캠페인 목록과 그로부터 만든 구간/관련도 인덱스 (버전 단위로 교체)"""
+    
+    def __init__(self, version: int, campaigns: List[Dict]):
+        self.version = version
+        self.campaigns = campaigns
+        self.by_id = {campaign["ad_id"]: campaign for campaign in campaigns}
+        self.position = {campaign["ad_id"]: i for i, campaign in enumerate(campaigns)}
+        self.index = FollowerIntervalIndex(campaigns)
+        self.relevance = CampaignRelevanceIndex(
+            [dict(campaign, keywords=campaign_keywords(campaign)) for campaign in campaigns]
+        )
+
+
+_ad_catalog: Optional[AdCatalog] = None
+_ad_catalog_checked_at = 0.0
+
+
+def seed_ad_catalog() -> int:
+    """기본 광고 캠페인 등록 (서버 시작 시 호출, 이미 있는 ad_id는 유지)"""
+    added = seed_ad_campaigns(DEFAULT_AD_CAMPAIGNS)
+    invalidate_ad_catalog()
+    return added
+
+
+async def load_ad_catalog() -> AdCatalog:
+    """
+    활성 캠페인 카탈로그 반환
+    - AD_CATALOG_CHECK_SECONDS마다 catalog_versions의 버전 한 건만 확인하고,
+      버전이 바뀐 경우에만 캠페인을 다시 읽어 인덱스를 재구축합니다.
+    """
+    global _ad_catalog, _ad_catalog_checked_at
+    now = time.monotonic()
+    if _ad_catalog is not None and now - _ad_catalog_checked_at <= AD_CATALOG_CHECK_SECONDS:
+        return _ad_catalog
+    
+    try:
+        version = await async_db.get_catalog_version("ad_campaigns")
+        if _ad_catalog is None or version != _ad_catalog.version:
+            campaigns = await async_db.get_ad_campaigns(active_only=True)
+            _ad_catalog = AdCatalog(version, campaigns)
+    except Exception as e:
+        logger.error("광고 카탈로그 로드 실패, 기본 캠페인 사용: %s", e)
+        if _ad_catalog is None:
+            return AdCatalog(-1, [dict(campaign, is_active=True) for campaign in DEFAULT_AD_CAMPAIGNS])
+        return _ad_catalog
+    
+    _ad_catalog_checked_at = now
+    return _ad_catalog
+
+
+async def get_selected_campaign(username: str) -> Optional[Dict]:
+    """
+    사용자가 선택한 (진행 중인) 캠페인 조회
+    - 선택 정보는 사용자별 캐시, 캠페인 정보는 메모리 카탈로그에서 읽으므로
+      캐시 적중 시 DB 조회가 없습니다.
+    
+    Returns:
+        선택 정보 + 캠페인 제목/문구/배너/키워드, 선택이 없거나 캠페인이 종료되었으면 None
+    """
+    selection = await async_db.get_active_ad_selection(username)
+    if selection is None:
+        return None
+    
+    catalog = await load_ad_catalog()
+    campaign = catalog.by_id.get(selection["ad_id"])
+    if campaign is None:
+        return None
+    
+    return {
+        **selection,
+        "title": campaign["title"],
+        "ad_text": campaign["ad_text"],
+        "banner_image_url": campaign["banner_image_url"],
+        "category": campaign["category"],
+        "keywords": campaign_keywords(campaign)
+    }
+
+
+def invalidate_ad_catalog():
+    """다음 조회 때 카탈로그 버전을 바로 확인하도록 표시 (관리자 변경 직후 호출)"""
+    global _ad_catalog_checked_at
+    _ad_catalog_checked_at = 0.0
+
+
+class CreatorDataCache:
+    """
+    크리에이터별 외부(X) 조회 결과 캐시
+    - TTL 안: 캐시 값 응답
+    - TTL 초과 ~ TTL + stale: 캐시 값을 바로 응답하고 백그라운드에서 갱신
+    - 그 이후 또는 미적재: 조회 후 응답
+    - 같은 사용자에 대한 동시 조회는 하나의 X 호출을 공유합니다.
+    - 사용자별 조회수를 세어 예열 대상(가장 많이 조회된 크리에이터)을 고릅니다.
+    """
+    
+    def __init__(self, name: str, ttl: float, stale: float, max_entries: int = CREATOR_CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # username -> (조회 시각, 값)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._views: Counter = Counter()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+    
+    def age(self, username: str) -> Optional[float]:
+        """캐시된 값의 나이 (초), 없으면 None"""
+        entry = self._entries.get(username)
+        return time.monotonic() - entry[0] if entry else None
+    
+    async def get(self, username: str, loader: Callable[[str], Awaitable]):
+        """
+        캐시 조회 (필요하면 loader로 다시 읽음)
+        
+        Args:
+            username: 사용자명
+            loader: 캐시가 없거나 오래됐을 때 호출할 조회 함수
+        """
+        self._views[username] += 1
+        entry = self._entries.get(username)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age <= self.ttl:
+                self.hits += 1
+                CACHE_LOOKUPS_TOTAL.labels(self.name, "hit").inc()
+                self._entries.move_to_end(username)
+                return entry[1]
+            if age <= self.ttl + self.stale:
+                self.stale_hits += 1
+                CACHE_LOOKUPS_TOTAL.labels(self.name, "stale").inc()
+                self._entries.move_to_end(username)
+                self.refresh(username, loader)
+                return entry[1]
+        
+        self.misses += 1
+        CACHE_LOOKUPS_TOTAL.labels(self.name, "miss").inc()
+        # 공유 작업이므로 이 호출자가 취소되어도 다른 대기자의 조회는 계속되도록 보호
+        return await asyncio.shield(self.refresh(username, loader))
+    
+    def refresh(self, username: str, loader: Callable[[str], Awaitable]) -> asyncio.Task:
+        """
+        백그라운드 갱신 시작 (이미 진행 중이면 그 작업을 반환)
+        - 반환된 작업은 여러 호출자가 공유하므로 기다릴 때는 asyncio.shield로 감싸야 합니다.
+        """
+        task = self._inflight.get(username)
+        if task is None:
+            task = asyncio.create_task(self._load(username, loader))
+            self._inflight[username] = task
+            task.add_done_callback(lambda done: self._refresh_done(username, done))
+        return task
+    
+    def _refresh_done(self, username: str, task: asyncio.Task):
+        self._inflight.pop(username, None)
+        # 백그라운드 갱신 실패는 기다리는 호출자가 없을 수 있으므로 여기서 기록 (기존 값 유지)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("크리에이터 캐시 갱신 실패 (%s, @%s): %s", self.name, username, task.exception())
+    
+    async def _load(self, username: str, loader: Callable[[str], Awaitable]):
+        try:
+            value = await loader(username)
+        except Exception:
+            self.refresh_errors += 1
+            raise
+        self._entries[username] = (time.monotonic(), value)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+    
+    def most_viewed(self, n: int) -> List[str]:
+        """조회수 상위 사용자명"""
+        return [username for username, _ in self._views.most_common(n)]
+    
+    def decay_views(self):
+        """조회수를 절반으로 줄여 최근 조회가 더 반영되도록 함 (예열 주기마다 호출)"""
+        self._views = Counter({
+            username: count // 2 for username, count in self._views.items() if count > 1
+        })
+    
+    def invalidate(self, username: Optional[str] = None):
+        if username is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(username, None)
+    
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "inflight": len(self._inflight),
+            "refresh_errors": self.refresh_errors
+        }
+
+
+# 워커 프로세스 단위로 공유 (AdvertisementService는 요청마다 생성됨)
+channel_volume_cache = CreatorDataCache("channel_volume", CHANNEL_VOLUME_TTL_SECONDS, CHANNEL_VOLUME_STALE_SECONDS)
+creator_tweets_cache = CreatorDataCache("creator_tweets", CREATOR_TWEETS_TTL_SECONDS, CREATOR_TWEETS_STALE_SECONDS)
+
+_cache_warmer_task: Optional[asyncio.Task] = None
+
+
+async def warm_creator_caches(
+    top_n: int = CHANNEL_CACHE_WARM_TOP_N,
+    horizon: float = CHANNEL_CACHE_WARM_INTERVAL_SECONDS
+) -> int:
+    """
+    조회수 상위 크리에이터 중 다음 예열 전에 만료될 캐시를 미리 갱신
+    
+    Returns:
+        갱신한 캐시 항목 수
+    """
+    service = AdvertisementService()
+    loaders = [
+        (channel_volume_cache, service.fetch_channel_volume),
+        (creator_tweets_cache, service.fetch_creator_tweets),
+    ]
+    semaphore = asyncio.Semaphore(CHANNEL_CACHE_WARM_CONCURRENCY)
+    
+    async def warm(cache: CreatorDataCache, username: str, loader) -> bool:
+        async with semaphore:
+            try:
+                await asyncio.shield(cache.refresh(username, loader))
+                return True
+            except Exception as e:
+                logger.warning("크리에이터 캐시 예열 실패 (%s, @%s): %s", cache.name, username, e)
+                return False
+    
+    jobs = []
+    for cache, loader in loaders:
+        for username in cache.most_viewed(top_n):
+            age = cache.age(username)
+            if age is None or age + horizon > cache.ttl:
+                jobs.append(warm(cache, username, loader))
+        cache.decay_views()
+    
+    results = await asyncio.gather(*jobs)
+    return sum(results)
+
+
+async def _run_cache_warmer(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await warm_creator_caches(horizon=interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("크리에이터 캐시 예열 중 오류: %s", e)
+
+
+def start_channel_cache_warmer(interval: float = CHANNEL_CACHE_WARM_INTERVAL_SECONDS):
+    """조회수 상위 크리에이터 캐시 예열 작업 시작 (서버 시작 시 호출)"""
+    global _cache_warmer_task
+    if not CHANNEL_CACHE_WARMER_ENABLED:
+        return
+    if _cache_warmer_task is None or _cache_warmer_task.done():
+        _cache_warmer_task = asyncio.create_task(_run_cache_warmer(interval))
+
+
+async def stop_channel_cache_warmer():
+    """캐시 예열 작업 중지 (서버 종료 시 호출)"""
+    global _cache_warmer_task
+    if _cache_warmer_task is not None:
+        _cache_warmer_task.cancel()
+        try:
+            await _cache_warmer_task
+        except asyncio.CancelledError:
+            pass
+        _cache_warmer_task = None
+
 
 class AdvertisementService:
     """
     광고 서비스
     - 사용자 채널 볼륨에 맞춰 광고 단가 측정 및 맞춤 광고 추천
+    - 채널 볼륨/최근 트윗은 워커 공용 캐시를 거쳐 조회합니다.
     """
     
     def __init__(self):
         self.social_service = SocialService()
+        self.channel_volume_cache = channel_volume_cache
+        self.creator_tweets_cache = creator_tweets_cache
     
     def calculate_ad_pricing(self, followers: int, engagement_rate: float) -> Dict[str, float]:
         """
@@ -41,14 +510,82 @@ class AdvertisementService:
             "total_price": round(total_price, 2)
         }
     
-    def get_recommended_advertisements(self, username: str, channel_volume: Dict) -> List[Dict]:
+    def calculate_ad_pricing_bulk(
+        self,
+        followers: Sequence[int],
+        engagement_rates: Sequence[float],
+        tier_multipliers: Optional[Dict[str, float]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        여러 채널의 광고 단가를 한 번에 계산 (NumPy 벡터 연산)
+        - calculate_ad_pricing과 같은 산식을 배열 전체에 한 번에 적용합니다.
+        - tier_multipliers가 있으면 채널 규모(small/medium/large)별 배율을 기본 단가에 곱합니다.
+        
+        Args:
+            followers: 팔로워 수 배열
+            engagement_rates: 참여율 (%) 배열 (followers와 같은 길이)
+            tier_multipliers: 채널 규모별 단가 배율 (예: {"large": 1.5}), 없는 규모는 1.0
+        
+        Returns:
+            {
+                "tier": 채널 규모 인덱스 배열 (CHANNEL_TIER_KEYS 기준),
+                "base_price": 기본 단가 배열,
+                "engagement_bonus": 참여율 보너스 배열,
+                "total_price": 총 단가 배열
+            }
+        """
+        followers_arr = np.asarray(followers, dtype=np.float64)
+        rates_arr = np.asarray(engagement_rates, dtype=np.float64)
+        
+        # 채널 규모 구간: 경계값 배열에 대한 이진 탐색
+        thresholds = np.array([threshold for threshold, _ in CHANNEL_TIERS], dtype=np.float64)
+        tiers = np.searchsorted(thresholds, followers_arr, side="right") - 1
+        np.clip(tiers, 0, len(CHANNEL_TIERS) - 1, out=tiers)
+        
+        # 기본 단가: 팔로워 1,000명당 1 토큰
+        base_price = followers_arr / 1000.0
+        if tier_multipliers:
+            multipliers = np.array(
+                [tier_multipliers.get(key, 1.0) for key in CHANNEL_TIER_KEYS],
+                dtype=np.float64
+            )
+            base_price *= multipliers[tiers]
+        
+        # 참여율 보너스: 참여율 1%당 10% 보너스 (최대 2배)
+        engagement_bonus = base_price * np.minimum(2.0, rates_arr / 10.0)
+        total_price = base_price + engagement_bonus
+        
+        return {
+            "tier": tiers,
+            "base_price": np.round(base_price, 2),
+            "engagement_bonus": np.round(engagement_bonus, 2),
+            "total_price": np.round(total_price, 2)
+        }
+    
+    async def get_recommended_advertisements(
+        self,
+        username: str,
+        channel_volume: Dict,
+        category: Optional[str] = None,
+        tweets: Optional[List[Dict]] = None
+    ) -> List[Dict]:
         """
         사용자에게 맞춤 광고 목록 제공
-        - 채널 볼륨에 맞는 광고를 추천합니다.
+        - 팔로워 수가 캠페인의 팔로워 구간에 포함되는 광고를 추천합니다.
+        - 구간 인덱스 조회(O(log n))이므로 활성 캠페인이 수천 개여도 빠르게 동작합니다.
+        - 3개 미만이면 구간 밖 캠페인을 관련도 순(트윗이 없으면 카탈로그 순)으로 채웁니다.
+        - 예전 suitable_for 문자열 필터와 결과가 다릅니다. 구간은 라벨 그대로(예: "소형~중형" = 0~20,000명)
+          해석하므로 소형 채널에는 중형 이상용 광고가 빠지고, 중형 채널에는 소형~중형 광고가 포함되며,
+          대형 채널은 구간에 맞는 광고부터 추천합니다. (예전에는 3개 미만이면 항상 목록 앞 3개로 대체)
+          기본 캠페인 기준: 소형 001/002/004/005, 중형 001/002/003/004, 대형 003/004 + 001
+        - tweets가 있으면 트윗 내용과 광고 문구의 관련도(코사인 유사도) 순으로 정렬합니다.
+          (전체 캠페인 점수를 희소 행렬-벡터 곱 한 번으로 계산)
         
         Args:
             username: 사용자명
             channel_volume: 채널 볼륨 정보 (followers, engagement_rate 등)
+            category: 특정 카테고리만 추천 (None이면 전체)
+            tweets: 크리에이터의 최근 트윗 목록 (관련도 정렬용, 선택사항)
         
         Returns:
             맞춤 광고 목록
@@ -59,76 +596,61 @@ class AdvertisementService:
         # 광고 단가 계산
         pricing = self.calculate_ad_pricing(followers, engagement_rate)
         
-        # Mock 광고 데이터 (실제로는 DB에서 가져옴)
-        mock_advertisements = [
-            {
-                "ad_id": "ad_001",
-                "title": "프리미엄 펫 사료 프로모션",
-                "ad_text": "🐾 최고급 펫 사료를 특가로 만나보세요! 지금 구매하면 20% 할인 + 무료배송! #펫사료 #반려동물",
-                "banner_image_url": "https://example.com/banners/pet_food_banner.jpg",
-                "pricing": pricing["total_price"],
-                "category": "펫 케어",
-                "suitable_for": "소형~중형 채널"
-            },
-            {
-                "ad_id": "ad_002",
-                "title": "반려동물 의류 신상품",
-                "ad_text": "✨ 귀여운 반려동물 의류 신상품 출시! 따뜻한 겨울을 위한 필수 아이템 🧥 #펫패션 #반려동물의류",
-                "banner_image_url": "https://example.com/banners/pet_clothing_banner.jpg",
-                "pricing": pricing["total_price"],
-                "category": "펫 패션",
-                "suitable_for": "소형~중형 채널"
-            },
-            {
-                "ad_id": "ad_003",
-                "title": "펫 호텔 예약 서비스",
-                "ad_text": "🏨 여행 가실 때 걱정 없이! 프리미엄 펫 호텔에서 반려동물을 안전하게 돌봐드립니다. 지금 예약하세요! #펫호텔 #펫케어",
-                "banner_image_url": "https://example.com/banners/pet_hotel_banner.jpg",
-                "pricing": pricing["total_price"],
-                "category": "펫 서비스",
-                "suitable_for": "중형~대형 채널"
-            },
-            {
-                "ad_id": "ad_004",
-                "title": "반려동물 건강검진 이벤트",
-                "ad_text": "🏥 반려동물 건강검진 특가 이벤트! 정기 검진으로 건강한 반려생활을 시작하세요 💚 #펫건강 #반려동물검진",
-                "banner_image_url": "https://example.com/banners/pet_checkup_banner.jpg",
-                "pricing": pricing["total_price"],
-                "category": "펫 케어",
-                "suitable_for": "모든 채널"
-            },
-            {
-                "ad_id": "ad_005",
-                "title": "펫 용품 할인 이벤트",
-                "ad_text": "🛍️ 반려동물 필수 용품 대할인! 장난감, 산책용품, 급여기 등 다양한 상품을 특가로! #펫용품 #반려동물용품",
-                "banner_image_url": "https://example.com/banners/pet_supplies_banner.jpg",
-                "pricing": pricing["total_price"],
-                "category": "펫 용품",
-                "suitable_for": "소형 채널"
-            }
+        catalog = await load_ad_catalog()
+        recommended = [
+            campaign for campaign in catalog.index.lookup(followers)
+            if category is None or campaign["category"] == category
         ]
         
-        # 채널 볼륨에 맞는 광고 필터링
-        # 팔로워 수에 따라 적합한 광고 추천
-        if followers < 5000:
-            # 소형 채널: 모든 광고 추천
-            recommended = mock_advertisements
-        elif followers < 20000:
-            # 중형 채널: 중형 이상 광고 추천
-            recommended = [ad for ad in mock_advertisements if "소형" not in ad["suitable_for"]]
-        else:
-            # 대형 채널: 대형 채널용 광고만 추천
-            recommended = [ad for ad in mock_advertisements if "대형" in ad["suitable_for"]]
+        # 콘텐츠 관련도 점수 (캠페인 카탈로그 순서)
+        scores = None
+        texts = [tweet.get("text", "") for tweet in tweets or [] if tweet.get("text")]
+        if texts:
+            scores = await asyncio.to_thread(catalog.relevance.score, texts)
+        
+        def relevance(campaign: Dict) -> float:
+            return float(scores[catalog.position[campaign["ad_id"]]]) if scores is not None else 0.0
         
-        # 최소 3개는 추천
-        if len(recommended) < 3:
-            recommended = mock_advertisements[:3]
+        if scores is not None:
+            recommended.sort(key=relevance, reverse=True)
         
-        return recommended
+        # 최소 3개는 추천 (구간이 맞지 않는 캠페인 중 관련도가 높은 순으로 채움)
+        if len(recommended) < MIN_RECOMMENDATIONS:
+            chosen = {campaign["ad_id"] for campaign in recommended}
+            candidates = catalog.campaigns
+            if scores is not None:
+                candidates = sorted(candidates, key=relevance, reverse=True)
+            for campaign in candidates:
+                if len(recommended) >= MIN_RECOMMENDATIONS:
+                    break
+                if campaign["ad_id"] in chosen:
+                    continue
+                if category is not None and campaign["category"] != category:
+                    continue
+                recommended.append(campaign)
+        
+        return [
+            {
+                "ad_id": campaign["ad_id"],
+                "title": campaign["title"],
+                "ad_text": campaign["ad_text"],
+                "banner_image_url": campaign["banner_image_url"],
+                "pricing": pricing["total_price"],
+                "category": campaign["category"],
+                "suitable_for": describe_follower_range(
+                    campaign["min_followers"], campaign["max_followers"]
+                ),
+                "min_followers": campaign["min_followers"],
+                "max_followers": campaign["max_followers"],
+                "keywords": campaign_keywords(campaign),
+                "relevance_score": round(relevance(campaign), 4) if scores is not None else None
+            }
+            for campaign in recommended
+        ]
     
     async def get_user_channel_volume(self, username: str) -> Dict:
         """
-        사용자 채널 볼륨 정보 조회
+        사용자 채널 볼륨 정보 조회 (캐시 사용)
         
         Args:
             username: 사용자명
@@ -136,6 +658,19 @@ class AdvertisementService:
         Returns:
             채널 볼륨 정보 (팔로워, 참여율 등)
         """
+        return await self.channel_volume_cache.get(username, self.fetch_channel_volume)
+    
+    async def get_creator_tweets(self, username: str) -> List[Dict]:
+        """추천 관련도 정렬에 쓸 최근 트윗 조회 (캐시 사용)"""
+        return await self.creator_tweets_cache.get(username, self.fetch_creator_tweets)
+    
+    async def fetch_creator_tweets(self, username: str) -> List[Dict]:
+        """최근 트윗을 X에서 직접 조회 (텍스트만 보관)"""
+        tweets = await self.social_service.get_user_tweets(username, max_results=RELEVANCE_TWEET_COUNT)
+        return [{"text": tweet.get("text", "")} for tweet in tweets]
+    
+    async def fetch_channel_volume(self, username: str) -> Dict:
+        """채널 볼륨 정보를 X에서 직접 조회"""
         stats = await self.social_service.get_user_data(username)
         
         return {
@@ -2,9 +2,13 @@ import os
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
+import logging
+from app.metrics import FALLBACKS_TOTAL, track_upstream
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class AIService:
     def __init__(self):
@@ -19,7 +23,7 @@ class AIService:
         
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel("gemini-2.0-flash-lite")
-        print("🤖 AIService 초기화 완료")
+        logger.debug("AIService 초기화 완료")
 
     async def evaluate_content_quality(self, username: str, stats: dict, tweets: list) -> dict:
         """
@@ -84,7 +88,8 @@ class AIService:
 """
 
         try:
-            response = self.model.generate_content(prompt)
+            with track_upstream("gemini", "generate_content"):
+                response = self.model.generate_content(prompt)
             response_text = response.text.strip()
             
             # JSON 파싱 시도 (마크다운 코드 블록 제거)
@@ -117,10 +122,12 @@ class AIService:
             }
             
         except json.JSONDecodeError as e:
-            print(f"❌ JSON 파싱 에러: {e}")
-            print(f"응답 내용: {response_text if 'response_text' in locals() else 'N/A'}")
+            logger.error(
+                "AI 응답 JSON 파싱 실패, Mock 점수 반환: %s", e,
+                extra={"response_text": response_text if 'response_text' in locals() else None}
+            )
+            FALLBACKS_TOTAL.labels("gemini_mock_score", "invalid_json").inc()
             # 데모용 Mock 데이터 반환
-            print("⚠️  Mock 데이터 반환: 기본값 사용")
             return {
                 "quality_score": 85,
                 "identity_score": 35,
@@ -133,12 +140,13 @@ class AIService:
             # API 제한(429), 타임아웃 등 모든 예외에 대해 Mock 데이터 반환
             error_msg = str(e)
             if "429" in error_msg or "quota" in error_msg.lower() or "timeout" in error_msg.lower():
-                print(f"⚠️  API 제한/타임아웃 감지: {error_msg}")
+                logger.warning("AI API 제한/타임아웃, Mock 점수 반환: %s", error_msg)
+                FALLBACKS_TOTAL.labels("gemini_mock_score", "rate_limit").inc()
             else:
-                print(f"❌ AI 평가 에러: {error_msg}")
+                logger.error("AI 평가 실패, Mock 점수 반환: %s", error_msg, exc_info=True)
+                FALLBACKS_TOTAL.labels("gemini_mock_score", "error").inc()
             
             # 데모가 멈추지 않도록 무조건 성공 데이터 반환
-            print("⚠️  Mock 데이터 반환: 기본값 사용")
             return {
                 "quality_score": 85,
                 "identity_score": 35,
@@ -2,9 +2,24 @@
 Coin Service for fetching real-time Solana meme coin prices from DexScreener API
 """
 import aiohttp
-from typing import List, Dict, Optional
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Optional, Tuple
 import logging
 
+from app import async_db
+from app.db import seed_coins
+from app.metrics import (
+    FALLBACKS_TOTAL,
+    UPSTREAM_CONNECT_SECONDS,
+    UPSTREAM_CONNECTIONS_TOTAL,
+    UPSTREAM_DNS_LOOKUPS_TOTAL,
+    track_upstream,
+)
+from app.services.price_history import price_history
+from app.services.dexscreener_parser import BestPairSelector, StreamingPairsParser
+
 logger = logging.getLogger(__name__)
 
 # Popular Solana Meme Coin Contract Addresses
@@ -15,151 +30,363 @@ SOLANA_MEME_COINS = {
     "POPCAT": "7GCihgDB8fe6KNjn2MYtkzZcRjQy3t9GHdC8uHYmW2hr",  # POPCAT on Solana
 }
 
+# Seed entries for the coin registry table (see app.db)
+DEFAULT_COIN_REGISTRY = [
+    {"symbol": "BONK", "name": "Bonk", "address": SOLANA_MEME_COINS["BONK"]},
+    {"symbol": "WIF", "name": "dogwifhat", "address": SOLANA_MEME_COINS["WIF"]},
+    {"symbol": "POPCAT", "name": "Popcat", "address": SOLANA_MEME_COINS["POPCAT"]},
+]
+
+# DexScreener accepts at most 30 comma-separated addresses per /tokens request
+DEXSCREENER_MAX_ADDRESSES = 30
+# Upper bound on chunk requests in flight at once for a single listing
+DEXSCREENER_MAX_CONCURRENCY = 8
+# Read size for streaming DexScreener response bodies
+DEXSCREENER_STREAM_CHUNK_SIZE = 64 * 1024
+
+# How long a worker trusts its in-memory copy of the coin registry
+COIN_REGISTRY_TTL_SECONDS = 60.0
+
+# Shared HTTP session tuning
+# Connect and read timeouts are separate so a slow handshake fails fast
+# while a large response body still has time to stream in. The total cap
+# bounds a request whose upstream keeps trickling bytes under the read timeout.
+HTTP_CONNECT_TIMEOUT = 3.0
+HTTP_READ_TIMEOUT = 10.0
+HTTP_TOTAL_TIMEOUT = 30.0
+HTTP_POOL_LIMIT = 100
+HTTP_POOL_LIMIT_PER_HOST = 20
+HTTP_KEEPALIVE_TIMEOUT = 60.0
+HTTP_DNS_CACHE_TTL = 300
+
+
+_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def _build_trace_config(upstream: str = "dexscreener") -> aiohttp.TraceConfig:
+    """
+    Attach connection-level metrics to the shared session
+    
+    Request latency and errors are recorded by track_upstream around each
+    call; these hooks add what only the session sees: new vs reused
+    connections, handshake time and DNS cache hits.
+    """
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(
+        start=0.0, connect_start=0.0, reused=False
+    ))
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        UPSTREAM_CONNECTIONS_TOTAL.labels(upstream, "new").inc()
+        UPSTREAM_CONNECT_SECONDS.labels(upstream).observe(time.perf_counter() - ctx.connect_start)
+
+    async def on_connection_reuseconn(session, ctx, params):
+        ctx.reused = True
+        UPSTREAM_CONNECTIONS_TOTAL.labels(upstream, "reused").inc()
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        UPSTREAM_DNS_LOOKUPS_TOTAL.labels(upstream, "resolved").inc()
+
+    async def on_dns_cache_hit(session, ctx, params):
+        UPSTREAM_DNS_LOOKUPS_TOTAL.labels(upstream, "cache_hit").inc()
+
+    async def on_request_end(session, ctx, params):
+        elapsed_ms = (time.perf_counter() - ctx.start) * 1000
+        logger.debug(
+            "DexScreener request %s %s took %.1fms (%s connection)",
+            params.method, params.url.host, elapsed_ms, "reused" if ctx.reused else "new"
+        )
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Return the process-wide HTTP session, creating it on first use.
+    The session keeps connections to DexScreener alive between calls, so
+    only the first request pays for the TCP + TLS handshake.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=HTTP_TOTAL_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            sock_connect=HTTP_CONNECT_TIMEOUT,
+            sock_read=HTTP_READ_TIMEOUT,
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[_build_trace_config()],
+        )
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared HTTP session (called on application shutdown)"""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+# Most recent successful price refresh, shared by every CoinService in this process
+_price_snapshot: Optional[List[Dict]] = None
+_price_snapshot_at = 0.0
+
+
+def get_price_snapshot(max_age: Optional[float] = None) -> Optional[List[Dict]]:
+    """
+    Return the latest refreshed coin list, or None if there is none
+    (or it is older than max_age seconds)
+    """
+    if _price_snapshot is None:
+        return None
+    if max_age is not None and time.monotonic() - _price_snapshot_at > max_age:
+        return None
+    return _price_snapshot
+
+
+def set_price_snapshot(coins: List[Dict]):
+    """Replace the latest refreshed coin list (also used for lists fetched by another worker)"""
+    global _price_snapshot, _price_snapshot_at
+    _price_snapshot = coins
+    _price_snapshot_at = time.monotonic()
+
+
+_registry_cache: Optional[List[Dict]] = None
+_registry_loaded_at = 0.0
+
+
+def seed_coin_registry() -> int:
+    """Register the default coins if they are missing (called on startup)"""
+    added = seed_coins(DEFAULT_COIN_REGISTRY)
+    invalidate_coin_registry()
+    return added
+
+
+async def load_coin_registry() -> List[Dict]:
+    """
+    Return the active coins from the registry table.
+    The list is cached in memory for COIN_REGISTRY_TTL_SECONDS so a listing
+    request does not hit SQLite; admin changes call invalidate_coin_registry().
+    """
+    global _registry_cache, _registry_loaded_at
+    now = time.monotonic()
+    if _registry_cache is None or now - _registry_loaded_at > COIN_REGISTRY_TTL_SECONDS:
+        try:
+            _registry_cache = await async_db.get_registered_coins(active_only=True)
+        except Exception as e:
+            logger.error("Failed to load coin registry, using defaults: %s", e)
+            return [dict(coin, image_url="") for coin in DEFAULT_COIN_REGISTRY]
+        _registry_loaded_at = now
+    return _registry_cache
+
+
+def invalidate_coin_registry():
+    """Drop the cached registry so the next listing reloads it"""
+    global _registry_cache
+    _registry_cache = None
+
+
+def chunk_addresses(addresses: List[str], size: int = DEXSCREENER_MAX_ADDRESSES) -> List[List[str]]:
+    """Split addresses into chunks that fit a single DexScreener request"""
+    return [addresses[i:i + size] for i in range(0, len(addresses), size)]
+
 
 class CoinService:
     """Service for fetching real-time coin market data from DexScreener"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        coins: Optional[List[Dict]] = None
+    ):
         self.base_url = "https://api.dexscreener.com/latest/dex/tokens"
-        self.coin_addresses = list(SOLANA_MEME_COINS.values())
+        self._coins = coins
+        self._session = session
+    
+    async def get_registered_coins(self) -> List[Dict]:
+        """Coins to price: the injected list if any, otherwise the cached registry"""
+        if self._coins is not None:
+            return self._coins
+        return await load_coin_registry()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Use the injected session if any, otherwise the shared pooled one"""
+        if self._session is not None:
+            return self._session
+        return await get_http_session()
     
     async def get_coin_list(self) -> List[Dict]:
         """
-        Fetch real-time prices for Solana meme coins from DexScreener API
+        Fetch real-time prices for the registered meme coins from DexScreener API
         
         Returns:
             List[Dict]: List of coin data with name, symbol, priceUsd, priceChange24h, imageUrl
+                (placeholder values if DexScreener failed, see fetch_coin_list)
         """
+        coins, _ = await self.fetch_coin_list()
+        return coins
+    
+    async def fetch_coin_list(self) -> Tuple[List[Dict], bool]:
+        """
+        Fetch real-time prices and report whether they are real
+        
+        Addresses are split into chunks of DEXSCREENER_MAX_ADDRESSES and the chunks
+        are fetched concurrently (at most DEXSCREENER_MAX_CONCURRENCY at a time).
+        The highest-liquidity pair is kept per token across all chunks.
+        
+        Returns:
+            Tuple[List[Dict], bool]: Coin data, and True if it is placeholder data
+                from _get_fallback_data because DexScreener failed
+        """
+        coins = await self.get_registered_coins()
+        coin_addresses = [coin["address"] for coin in coins]
+        if not coin_addresses:
+            return [], False
+        
         try:
-            # Build URL with comma-separated addresses
-            addresses_str = ",".join(self.coin_addresses)
-            url = f"{self.base_url}/{addresses_str}"
+            session = await self._get_session()
+            semaphore = asyncio.Semaphore(DEXSCREENER_MAX_CONCURRENCY)
+            chunk_results = await asyncio.gather(*[
+                self._fetch_chunk(session, chunk, semaphore)
+                for chunk in chunk_addresses(coin_addresses)
+            ])
+        except Exception as e:
+            logger.error("Error fetching coin data: %s", e)
+            return self._get_fallback_data(coins, "error"), True
+        
+        # Merge chunk results, keeping the best pair per token
+        coin_map = {}
+        for chunk_map in chunk_results:
+            for address_upper, coin_data in chunk_map.items():
+                current = coin_map.get(address_upper)
+                if current is None or coin_data["liquidity"] > current["liquidity"]:
+                    coin_map[address_upper] = coin_data
+        
+        if not coin_map:
+            logger.warning("No pairs found in DexScreener response")
+            return self._get_fallback_data(coins, "no_pairs"), True
+        
+        image_map = {coin["address"].upper(): coin.get("image_url", "") for coin in coins}
+        
+        # Build result list
+        result = []
+        for address_upper, coin_data in coin_map.items():
+            pair = coin_data["pair"]
+            base_token = pair.get("baseToken", {})
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status != 200:
-                        logger.error(f"DexScreener API error: {response.status}")
-                        return self._get_fallback_data()
-                    
-                    # Safe JSON parsing
-                    try:
-                        data = await response.json()
-                    except aiohttp.ContentTypeError as e:
-                        logger.error(f"Invalid JSON response from DexScreener: {e}")
-                        return self._get_fallback_data()
-                    except Exception as e:
-                        logger.error(f"Error parsing JSON: {e}")
-                        return self._get_fallback_data()
-                    
-                    # Parse DexScreener response
-                    pairs = data.get("pairs", [])
-                    if not pairs:
-                        logger.warning("No pairs found in DexScreener response")
-                        return self._get_fallback_data()
-                    
-                    # Group by token address and get the best pair (highest liquidity)
-                    # Create a case-insensitive mapping of addresses
-                    address_map = {addr.upper(): addr for addr in self.coin_addresses}
-                    coin_map = {}
-                    
-                    for pair in pairs:
-                        base_token = pair.get("baseToken", {})
-                        token_address = base_token.get("address", "")
-                        token_address_upper = token_address.upper()
-                        
-                        # Check if this token address matches any of our target addresses (case-insensitive)
-                        if token_address_upper in address_map:
-                            # Use the pair with highest liquidity (safer nested access)
-                            liquidity_data = pair.get("liquidity") or {}
-                            liquidity_usd = float(liquidity_data.get("usd", 0) or 0)
-                            
-                            # Use uppercase address as key for consistency
-                            if token_address_upper not in coin_map:
-                                coin_map[token_address_upper] = {
-                                    "liquidity": liquidity_usd,
-                                    "pair": pair,
-                                    "original_address": token_address
-                                }
-                            elif liquidity_usd > coin_map[token_address_upper]["liquidity"]:
-                                coin_map[token_address_upper] = {
-                                    "liquidity": liquidity_usd,
-                                    "pair": pair,
-                                    "original_address": token_address
-                                }
-                    
-                    # Build result list
-                    result = []
-                    for address_upper, coin_data in coin_map.items():
-                        pair = coin_data["pair"]
-                        base_token = pair.get("baseToken", {})
-                        
-                        # Safer nested dict access
-                        price_change_data = pair.get("priceChange") or {}
-                        volume_data = pair.get("volume") or {}
+            # Safer nested dict access
+            price_change_data = pair.get("priceChange") or {}
+            volume_data = pair.get("volume") or {}
+            
+            coin_info = {
+                "name": base_token.get("name", "Unknown"),
+                "symbol": base_token.get("symbol", "UNKNOWN"),
+                "priceUsd": pair.get("priceUsd", "0"),
+                "priceChange24h": price_change_data.get("h24", 0) or 0,
+                "imageUrl": base_token.get("logoURI") or image_map.get(address_upper, ""),
+                "address": coin_data.get("original_address", address_upper),
+                "volume24h": volume_data.get("h24", 0) or 0,
+                "liquidity": coin_data["liquidity"]
+            }
+            result.append(coin_info)
+        
+        # Sort by symbol for consistent ordering
+        result.sort(key=lambda x: x["symbol"])
+        
+        set_price_snapshot(result)
+        
+        # Record this refresh in the price time-series store (file I/O off the event loop)
+        try:
+            await asyncio.to_thread(price_history.record_prices, result)
+        except Exception as e:
+            logger.error("Failed to record price history: %s", e)
+        
+        return result, False
+    
+    async def _fetch_chunk(
+        self,
+        session: aiohttp.ClientSession,
+        addresses: List[str],
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Dict]:
+        """
+        Fetch one chunk of addresses and select the best pair per token
+        
+        Returns:
+            Dict[str, Dict]: Uppercase address -> {"liquidity", "pair", "original_address"}.
+            Empty if the request failed, so one bad chunk does not fail the whole listing.
+        """
+        url = f"{self.base_url}/{','.join(addresses)}"
+        selector = BestPairSelector(addresses)
+        
+        try:
+            async with semaphore:
+                with track_upstream("dexscreener", "tokens") as call:
+                    async with session.get(url) as response:
+                        if response.status != 200:
+                            call.mark_error()
+                            logger.error("DexScreener API error: %s", response.status)
+                            return {}
                         
-                        coin_info = {
-                            "name": base_token.get("name", "Unknown"),
-                            "symbol": base_token.get("symbol", "UNKNOWN"),
-                            "priceUsd": pair.get("priceUsd", "0"),
-                            "priceChange24h": price_change_data.get("h24", 0) or 0,
-                            "imageUrl": base_token.get("logoURI", ""),
-                            "address": coin_data.get("original_address", address_upper),
-                            "volume24h": volume_data.get("h24", 0) or 0,
-                            "liquidity": coin_data["liquidity"]
-                        }
-                        result.append(coin_info)
-                    
-                    # Sort by symbol for consistent ordering
-                    result.sort(key=lambda x: x["symbol"])
-                    
-                    if not result:
-                        return self._get_fallback_data()
-                    
-                    return result
-                    
+                        # Stream the body through the pair parser instead of response.json(),
+                        # keeping only the best pair per token while reading
+                        parser = StreamingPairsParser(selector.offer)
+                        try:
+                            async for chunk in response.content.iter_chunked(DEXSCREENER_STREAM_CHUNK_SIZE):
+                                parser.feed(chunk)
+                            parser.close()
+                        except ValueError as e:
+                            call.mark_error()
+                            logger.error("Invalid JSON response from DexScreener: %s", e)
+                            return {}
         except aiohttp.ClientError as e:
-            logger.error(f"Network error fetching coin data: {str(e)}")
-            return self._get_fallback_data()
-        except Exception as e:
-            logger.error(f"Error fetching coin data: {str(e)}")
-            return self._get_fallback_data()
+            logger.error("Network error fetching coin data: %s", e)
+            return {}
+        except asyncio.TimeoutError:
+            logger.error("Timeout fetching coin data for %d addresses", len(addresses))
+            return {}
+        
+        return selector.best
     
-    def _get_fallback_data(self) -> List[Dict]:
+    def _get_fallback_data(self, coins: List[Dict], reason: str = "error") -> List[Dict]:
         """
         Fallback data in case API fails (still real structure, but with placeholder values)
         This should rarely be used, but provides graceful degradation
         """
         logger.warning("Using fallback coin data")
+        FALLBACKS_TOTAL.labels("dexscreener_coin_list", reason).inc()
         return [
             {
-                "name": "Bonk",
-                "symbol": "BONK",
+                "name": coin["name"],
+                "symbol": coin["symbol"],
                 "priceUsd": "0",
                 "priceChange24h": 0,
-                "imageUrl": "",
-                "address": SOLANA_MEME_COINS["BONK"],
-                "volume24h": 0,
-                "liquidity": 0
-            },
-            {
-                "name": "dogwifhat",
-                "symbol": "WIF",
-                "priceUsd": "0",
-                "priceChange24h": 0,
-                "imageUrl": "",
-                "address": SOLANA_MEME_COINS["WIF"],
-                "volume24h": 0,
-                "liquidity": 0
-            },
-            {
-                "name": "Popcat",
-                "symbol": "POPCAT",
-                "priceUsd": "0",
-                "priceChange24h": 0,
-                "imageUrl": "",
-                "address": SOLANA_MEME_COINS["POPCAT"],
+                "imageUrl": coin.get("image_url", ""),
+                "address": coin["address"],
                 "volume24h": 0,
                 "liquidity": 0
             }
+            for coin in coins
         ]
-
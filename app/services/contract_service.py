@@ -1,6 +1,245 @@
+import asyncio
 import hashlib
+import logging
+import os
 import random
-from typing import Dict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app import async_db
+from app.services.local_chain import InMemoryChain
+from app.services.tx_pipeline import HttpJsonRpcClient, LocalJsonRpcNode, TxPipeline
+
+logger = logging.getLogger(__name__)
+
+# 보상 정산 방식
+# - mock: 지갑마다 가짜 트랜잭션 해시 반환 (기본값)
+# - batched: 보상을 모아 다중 수신자 트랜잭션 한 건으로 정산 (현재는 로컬 체인 대역 사용)
+# - pipeline: 보상마다 전송 트랜잭션을 보내되 논스 관리 파이프라인으로 동시에 전송
+REWARD_SETTLEMENT_MODE = os.getenv("REWARD_SETTLEMENT_MODE", "mock")
+
+# 배치 정산: 이 개수가 모이거나, 첫 보상이 대기한 지 이 시간이 지나면 전송
+REWARD_BATCH_MAX_SIZE = int(os.getenv("REWARD_BATCH_MAX_SIZE", "200"))
+REWARD_BATCH_MAX_DELAY_SECONDS = float(os.getenv("REWARD_BATCH_MAX_DELAY_SECONDS", "2.0"))
+
+# 로컬 체인 대역의 블록 시간 (초)
+LOCAL_CHAIN_BLOCK_TIME_SECONDS = float(os.getenv("LOCAL_CHAIN_BLOCK_TIME_SECONDS", "0"))
+
+# pipeline 모드: 노드 JSON-RPC 주소 (비어 있으면 로컬 JSON-RPC 노드 대역 사용)
+REWARD_RPC_URL = os.getenv("REWARD_RPC_URL", "")
+# 보상 지갑(핫 월렛) 주소 (노드에서 서명 가능한 계정)
+REWARD_SENDER_ADDRESS = os.getenv("REWARD_SENDER_ADDRESS", "0x0000000000000000000000000000000000000001")
+# 동시에 블록 포함을 기다릴 최대 보상 트랜잭션 수
+REWARD_TX_MAX_IN_FLIGHT = int(os.getenv("REWARD_TX_MAX_IN_FLIGHT", "16"))
+# 이 시간 동안 포함되지 않은 트랜잭션은 수수료를 올려 재전송 (초)
+REWARD_TX_STUCK_SECONDS = float(os.getenv("REWARD_TX_STUCK_SECONDS", "30"))
+
+# 보상 토큰 범위 (score * 10, 최소/최대)
+MIN_REWARD_AMOUNT = 100
+MAX_REWARD_AMOUNT = 10000
+
+
+class RewardSettlementBatcher:
+    """
+    보상 배치 정산기
+    - submit()으로 들어온 보상을 모아 다중 수신자 트랜잭션 한 건으로 전송합니다.
+    - max_size개가 모이면 즉시, 아니면 첫 보상이 들어온 뒤 max_delay초 후에 전송합니다.
+    - 각 호출자는 트랜잭션이 블록에 포함된 뒤 자신의 배치 내 위치(batch_index)를 받습니다.
+    - 참조 ID(보상 ID)가 같은 보상은 한 번만 지급하고, 다시 들어오면 처음 지급된 위치를 반환합니다.
+    - journal이 있으면 배치를 전송하기 전에 보상별 배치 트랜잭션 해시와 위치를 기록합니다.
+      재시작이나 다른 워커가 같은 보상을 다시 보내면 submit(previous=...)로 받은 이 기록을
+      체인 영수증과 대조하므로, 이 프로세스의 메모리가 없어도 다시 지급하지 않습니다.
+    """
+    
+    def __init__(
+        self,
+        chain: InMemoryChain,
+        max_size: int = REWARD_BATCH_MAX_SIZE,
+        max_delay: float = REWARD_BATCH_MAX_DELAY_SECONDS,
+        journal: Optional[Callable[[List[Dict]], Awaitable[None]]] = None
+    ):
+        """
+        Args:
+            journal: 전송 직전 [{"evaluation_id", "tx_hash", "batch_index"}]를 기록하는 함수
+                (기록이 실패하면 배치를 보내지 않음)
+        """
+        self.chain = chain
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.journal = journal
+        self._pending: List[Tuple[str, int, Optional[str], asyncio.Future]] = []
+        self._by_reference: Dict[str, asyncio.Future] = {}  # 정산 대기 중인 참조 ID
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._settling: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.settled = 0
+        self.failed = 0
+    
+    async def submit(
+        self,
+        wallet_address: str,
+        amount: int,
+        reference: Optional[str] = None,
+        previous: Optional[Dict] = None
+    ) -> Dict:
+        """
+        보상 1건을 다음 배치에 추가하고 정산될 때까지 대기
+        
+        Args:
+            reference: 중복 지급 방지용 참조 ID (보상 아웃박스의 evaluation_id)
+            previous: 이전 시도가 journal에 기록한 {"tx_hash", "batch_index"} (없으면 None)
+        
+        Returns:
+            {"tx_hash", "batch_index", "batch_size", "block_number", "wallet_address", "rewarded_amount"}
+        
+        Raises:
+            배치 트랜잭션이 실패하면 그 예외 (배치 내 모든 호출자에게 전달)
+        """
+        if reference is not None:
+            paid = self._recorded_payment(reference, previous) or self.chain.find_reference(reference)
+            if paid is not None:
+                # 이미 지급된 보상 (재시도/임대 만료 후 재전송): 다시 보내지 않고 처음 지급 결과 반환
+                return self._paid_result(*paid)
+            if reference in self._by_reference:
+                return await asyncio.shield(self._by_reference[reference])
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((wallet_address, amount, reference, future))
+        if reference is not None:
+            self._by_reference[reference] = future
+            future.add_done_callback(lambda _: self._by_reference.pop(reference, None))
+        
+        if len(self._pending) >= self.max_size:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_pending)
+        
+        return await future
+    
+    def _recorded_payment(self, reference: str, previous: Optional[Dict]) -> Optional[Tuple[str, int]]:
+        """이전 시도가 기록한 배치 트랜잭션이 체인에 포함됐으면 이 보상이 지급된 (tx_hash, 위치)"""
+        if not previous or not previous.get("tx_hash") or previous.get("batch_index") is None:
+            return None
+        receipt = self.chain.get_receipt(previous["tx_hash"])
+        index = previous["batch_index"]
+        if receipt is None or not 0 <= index < len(receipt["transfers"]):
+            # 포함되지 않음: 전송 전에 실패한 배치이므로 새 배치로 다시 보냄
+            return None
+        transfer = receipt["transfers"][index]
+        if transfer["reference"] != reference:
+            return None
+        if transfer["duplicate"]:
+            return self.chain.find_reference(reference)
+        return previous["tx_hash"], index
+    
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._settle(batch))
+            self._settling.add(task)
+            task.add_done_callback(self._settling.discard)
+    
+    async def _settle(self, batch: List[Tuple[str, int, Optional[str], asyncio.Future]]):
+        references = [reference for _, _, reference, _ in batch]
+        try:
+            tx = self.chain.prepare_multi_transfer([(wallet, amount) for wallet, amount, _, _ in batch], references)
+            if self.journal is not None:
+                await self.journal([
+                    {"evaluation_id": reference, "tx_hash": tx["tx_hash"], "batch_index": index}
+                    for index, reference in enumerate(references)
+                    if reference is not None
+                ])
+            receipt = await self.chain.send_prepared(tx)
+        except Exception as e:
+            logger.error("보상 배치 정산 실패 (%d건): %s", len(batch), e)
+            self.failed += len(batch)
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        self.batches += 1
+        self.settled += len(batch)
+        logger.info("보상 배치 정산", extra={
+            "batch_size": len(batch),
+            "tx_hash": receipt["tx_hash"],
+            "block_number": receipt["block_number"]
+        })
+        for index, (wallet, amount, reference, future) in enumerate(batch):
+            if future.done():
+                continue
+            if receipt["transfers"][index]["duplicate"]:
+                # 체인이 이미 지급된 참조 ID로 건너뜀: 처음 지급된 위치를 반환
+                future.set_result(self._paid_result(*self.chain.find_reference(reference)))
+                continue
+            future.set_result({
+                "tx_hash": receipt["tx_hash"],
+                "batch_index": index,
+                "batch_size": len(batch),
+                "block_number": receipt["block_number"],
+                "wallet_address": wallet,
+                "rewarded_amount": amount
+            })
+    
+    def _paid_result(self, tx_hash: str, index: int) -> Dict:
+        receipt = self.chain.get_receipt(tx_hash)
+        transfer = receipt["transfers"][index]
+        return {
+            "tx_hash": tx_hash,
+            "batch_index": index,
+            "batch_size": len(receipt["transfers"]),
+            "block_number": receipt["block_number"],
+            "wallet_address": transfer["to"],
+            "rewarded_amount": transfer["amount"]
+        }
+    
+    async def flush(self):
+        """대기 중인 보상을 바로 전송하고 진행 중인 정산이 끝날 때까지 대기 (종료 시 호출)"""
+        self._flush_pending()
+        if self._settling:
+            await asyncio.gather(*self._settling, return_exceptions=True)
+    
+    def stats(self) -> Dict:
+        return {
+            "pending": len(self._pending),
+            "settling": len(self._settling),
+            "batches": self.batches,
+            "settled": self.settled,
+            "failed": self.failed
+        }
+
+
+# 워커 프로세스 단위로 공유 (ContractService는 요청마다 생성됨)
+local_chain = InMemoryChain(block_time=LOCAL_CHAIN_BLOCK_TIME_SECONDS)
+reward_batcher = RewardSettlementBatcher(local_chain, journal=async_db.record_reward_sends)
+# pipeline 모드의 전송 파이프라인 (첫 전송 때 생성)
+_reward_pipeline: Optional[TxPipeline] = None
+
+
+async def get_reward_pipeline() -> TxPipeline:
+    """보상 전송 파이프라인 반환 (없으면 생성하고 모니터 시작)"""
+    global _reward_pipeline
+    if _reward_pipeline is None:
+        rpc = HttpJsonRpcClient(REWARD_RPC_URL) if REWARD_RPC_URL else LocalJsonRpcNode(block_time=LOCAL_CHAIN_BLOCK_TIME_SECONDS)
+        _reward_pipeline = TxPipeline(
+            rpc,
+            REWARD_SENDER_ADDRESS,
+            max_in_flight=REWARD_TX_MAX_IN_FLIGHT,
+            stuck_after=REWARD_TX_STUCK_SECONDS,
+            journal=async_db.record_reward_sends
+        )
+        await _reward_pipeline.start()
+    return _reward_pipeline
+
+
+async def flush_reward_settlements():
+    """대기 중인 배치 보상 정산, 전송 파이프라인 모니터 중지 (서버 종료 시 호출)"""
+    await reward_batcher.flush()
+    if _reward_pipeline is not None:
+        await _reward_pipeline.stop()
 
 
 class ContractService:
@@ -8,16 +247,29 @@ class ContractService:
     스마트 컨트랙트 서비스
     - 블록체인과의 통신을 담당합니다.
     - 현재는 Mock 구현으로 시뮬레이션합니다.
+    - REWARD_SETTLEMENT_MODE=batched 이면 보상을 모아 한 트랜잭션으로 정산합니다.
+    - REWARD_SETTLEMENT_MODE=pipeline 이면 보상마다 트랜잭션을 보내되 여러 건을 동시에 전송합니다.
     """
     
-    def __init__(self):
+    def __init__(self, settlement_mode: str = REWARD_SETTLEMENT_MODE, batcher: RewardSettlementBatcher = None):
         """ContractService 초기화"""
-        print("📝 ContractService 초기화 완료 (Mock 모드)")
+        self.settlement_mode = settlement_mode
+        self.batcher = batcher or reward_batcher
+        mode_name = {"batched": "배치 정산", "pipeline": "동시 전송"}.get(settlement_mode, "Mock")
+        logger.debug("ContractService 초기화 완료 (%s 모드)", mode_name)
+    
+    @staticmethod
+    def calculate_reward_amount(score: int) -> int:
+        """점수에 따른 토큰 양 계산 (score * 10, 최소 100 토큰, 최대 10,000 토큰)"""
+        return max(MIN_REWARD_AMOUNT, min(MAX_REWARD_AMOUNT, score * 10))
     
     async def execute_reward_transaction(self, wallet_address: str, score: int) -> Dict[str, any]:
         """
-        보상 트랜잭션 실행 (Mock)
-        - 입력받은 score에 따라 토큰 양을 계산하고 가짜 tx_hash를 반환합니다.
+        보상 트랜잭션 실행
+        - 입력받은 score에 따라 토큰 양을 계산하고 트랜잭션 해시를 반환합니다.
+        - Mock 모드: 가짜 tx_hash를 바로 반환합니다.
+        - 배치 정산 모드: 다음 배치 트랜잭션이 블록에 포함될 때까지 기다린 뒤
+          배치 트랜잭션 해시와 그 안에서의 위치(batch_index)를 반환합니다.
         
         Args:
             wallet_address: 보상을 받을 지갑 주소
@@ -25,29 +277,75 @@ class ContractService:
         
         Returns:
             {
-                "tx_hash": "가짜 트랜잭션 해시",
+                "tx_hash": "트랜잭션 해시",
                 "rewarded_amount": 계산된 토큰 양,
-                "wallet_address": 지갑 주소
+                "wallet_address": 지갑 주소,
+                "batch_index": 배치 내 위치 (배치 정산 모드만),
+                "batch_size": 배치 크기 (배치 정산 모드만)
             }
         """
-        # 점수에 따른 토큰 양 계산 (예: score * 10)
-        # 최소 100 토큰, 최대 10,000 토큰
-        rewarded_amount = max(100, min(10000, score * 10))
+        return await self.send_reward(wallet_address, self.calculate_reward_amount(score))
+    
+    async def send_reward(
+        self,
+        wallet_address: str,
+        rewarded_amount: int,
+        reward_id: Optional[str] = None,
+        previous: Optional[Dict] = None
+    ) -> Dict[str, any]:
+        """
+        금액이 정해진 보상을 체인에 전송 (보상 아웃박스 디스패처가 호출)
+        
+        Args:
+            reward_id: 중복 지급 방지용 참조 ID (evaluation_id).
+                같은 reward_id로 다시 보내면 새로 지급하지 않고 처음 전송 결과를 반환합니다.
+                (디스패처가 전송 직후 죽거나 임대가 만료되어 다시 전송하는 경우)
+            previous: 이전 시도가 전송 직전에 아웃박스에 기록한 전송 정보 (임대한 행 그대로).
+                재시작 후나 다른 워커에서도 이 기록으로 체인에서 지급 여부를 확인합니다.
+        
+        Returns:
+            execute_reward_transaction과 같은 형식
+        """
+        if self.settlement_mode == "batched":
+            return await self.batcher.submit(wallet_address, rewarded_amount, reward_id, previous)
+        if self.settlement_mode == "pipeline":
+            pipeline = await get_reward_pipeline()
+            receipt = await pipeline.submit(wallet_address, rewarded_amount, reference=reward_id, previous=previous)
+            return {
+                "tx_hash": receipt["tx_hash"],
+                "block_number": receipt["block_number"],
+                "rewarded_amount": rewarded_amount,
+                "wallet_address": wallet_address
+            }
         
-        # 가짜 트랜잭션 해시 생성 (데모용)
+        # 가짜 트랜잭션 해시 생성 (데모용, reward_id가 있으면 재전송해도 같은 해시)
         # 실제로는 블록체인에 트랜잭션을 전송하고 반환된 해시를 사용합니다.
-        hash_input = f"{wallet_address}_{score}_{random.randint(1000, 9999)}"
+        hash_input = f"{wallet_address}_{rewarded_amount}_{reward_id or random.randint(1000, 9999)}"
         fake_tx_hash = "0x" + hashlib.sha256(hash_input.encode()).hexdigest()[:64]
         
-        print(f"💰 보상 트랜잭션 시뮬레이션:")
-        print(f"   - 지갑 주소: {wallet_address}")
-        print(f"   - 점수: {score}")
-        print(f"   - 보상 금액: {rewarded_amount} 토큰")
-        print(f"   - 트랜잭션 해시: {fake_tx_hash}")
+        logger.info("보상 트랜잭션 시뮬레이션", extra={
+            "wallet_address": wallet_address,
+            "rewarded_amount": rewarded_amount,
+            "tx_hash": fake_tx_hash
+        })
         
         return {
             "tx_hash": fake_tx_hash,
             "rewarded_amount": rewarded_amount,
             "wallet_address": wallet_address
         }
-
+    
+    async def get_confirmations(self, tx_hash: str) -> Optional[int]:
+        """
+        트랜잭션 확인 블록 수 조회
+        - 배치 정산 모드: 로컬 체인의 포함 블록 이후 블록 수
+        - 동시 전송 모드: 노드의 포함 블록 이후 블록 수 (아직 대기 중이면 0)
+        - Mock 모드: 전송 즉시 확정된 것으로 보고 1을 반환
+        - 체인이 모르는 트랜잭션이면 None (재시작 전 다른 체인 대역에 보낸 경우 등)
+        """
+        if self.settlement_mode == "batched":
+            return self.batcher.chain.get_confirmations(tx_hash)
+        if self.settlement_mode == "pipeline":
+            pipeline = await get_reward_pipeline()
+            return await pipeline.get_confirmations(tx_hash)
+        return 1
@@ -0,0 +1,165 @@
+"""
+Streaming parser for DexScreener /tokens responses
+
+The /tokens endpoint returns {"schemaVersion": ..., "pairs": [...]} and for
+popular tokens the pairs array can be very large. Instead of loading the whole
+body with response.json(), the parser is fed raw chunks as they arrive, decodes
+one pair object at a time and hands it to a BestPairSelector, which keeps only
+the running highest-liquidity pair per tracked token. Every other pair is
+discarded as soon as it has been looked at, so memory stays bounded by the
+chunk size plus one pair per token.
+"""
+import codecs
+import json
+import re
+from typing import Callable, Dict, List
+
+_PAIRS_KEY = re.compile(r'"pairs"\s*:\s*')
+_SKIP_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class BestPairSelector:
+    """Keep the highest-liquidity pair per tracked token address"""
+    
+    def __init__(self, addresses: List[str]):
+        # Create a case-insensitive mapping of addresses
+        self.address_map = {addr.upper(): addr for addr in addresses}
+        self.best: Dict[str, Dict] = {}
+    
+    def offer(self, pair: Dict):
+        base_token = pair.get("baseToken") or {}
+        token_address = base_token.get("address", "")
+        token_address_upper = token_address.upper()
+        
+        # Check if this token address matches any of our target addresses (case-insensitive)
+        if token_address_upper not in self.address_map:
+            return
+        
+        # Use the pair with highest liquidity (safer nested access)
+        liquidity_data = pair.get("liquidity") or {}
+        liquidity_usd = float(liquidity_data.get("usd", 0) or 0)
+        
+        # Use uppercase address as key for consistency
+        current = self.best.get(token_address_upper)
+        if current is None or liquidity_usd > current["liquidity"]:
+            self.best[token_address_upper] = {
+                "liquidity": liquidity_usd,
+                "pair": pair,
+                "original_address": token_address
+            }
+
+
+class StreamingPairsParser:
+    """
+    Incremental parser that emits each element of the top-level "pairs" array
+    
+    Usage:
+        parser = StreamingPairsParser(selector.offer)
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.close()
+    """
+    
+    def __init__(self, on_pair: Callable[[Dict], None]):
+        self.on_pair = on_pair
+        self.pairs_seen = 0
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._pos = 0
+        self._state = "seek"  # seek -> array -> done
+    
+    def feed(self, chunk: bytes):
+        """Consume the next chunk of the response body"""
+        if self._state == "done":
+            return
+        # Drop everything already consumed before appending new data
+        self._text = self._text[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        self._advance()
+    
+    def close(self):
+        """
+        Finish parsing
+        
+        Raises:
+            ValueError: If the body ended inside the pairs array or is not valid JSON
+        """
+        self._text = self._text[self._pos:] + self._utf8.decode(b"", final=True)
+        self._pos = 0
+        self._advance()
+        
+        if self._state == "seek":
+            # No "pairs" key found while streaming: parse the (small) remainder as a whole
+            data = json.loads(self._text) if self._text.strip() else {}
+            for pair in (data or {}).get("pairs") or []:
+                self._emit(pair)
+        elif self._state == "array":
+            raise ValueError("Unexpected end of DexScreener response inside pairs array")
+        
+        self._state = "done"
+        self._text = ""
+    
+    def _emit(self, pair):
+        if isinstance(pair, dict):
+            self.pairs_seen += 1
+            self.on_pair(pair)
+    
+    def _advance(self):
+        if self._state == "seek" and not self._seek_array():
+            return
+        if self._state == "array":
+            self._read_pairs()
+    
+    def _seek_array(self) -> bool:
+        match = _PAIRS_KEY.search(self._text, self._pos)
+        if match is None or match.end() >= len(self._text):
+            return False
+        
+        value_start = match.end()
+        if self._text[value_start] == "[":
+            self._pos = value_start + 1
+            self._state = "array"
+            return True
+        if self._text.startswith("null", value_start):
+            self._state = "done"
+            return False
+        raise ValueError("Unexpected value for pairs in DexScreener response")
+    
+    def _read_pairs(self):
+        text = self._text
+        decode = self._decoder.raw_decode
+        pos = self._pos
+        
+        while True:
+            pos = _SKIP_SEPARATORS.match(text, pos).end()
+            if pos >= len(text):
+                break
+            if text[pos] == "]":
+                self._state = "done"
+                pos += 1
+                break
+            try:
+                pair, end = decode(text, pos)
+            except json.JSONDecodeError:
+                # Incomplete object at the end of the buffer: wait for more data
+                break
+            self._emit(pair)
+            pos = end
+        
+        self._pos = pos
+
+
+def select_best_pairs(chunks, addresses: List[str]) -> Dict[str, Dict]:
+    """
+    Run the streaming parser over an iterable of byte chunks
+    
+    Returns:
+        Dict[str, Dict]: Uppercase address -> {"liquidity", "pair", "original_address"}
+    """
+    selector = BestPairSelector(addresses)
+    parser = StreamingPairsParser(selector.offer)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return selector.best
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import random
+from typing import Dict, List, Optional, Tuple
+
+
+class LocalChainError(Exception):
+    """로컬 체인 대역에서 트랜잭션이 거부된 경우 (failure_rate로 주입한 실패 포함)"""
+
+
+class InMemoryChain:
+    """
+    네트워크 없이 동작하는 로컬 체인 대역 (테스트/벤치마크용)
+    - 보상 토큰 전송만 지원하며 잔액은 메모리에만 보관합니다.
+    - 트랜잭션은 nonce 순서대로 한 건씩 블록에 포함됩니다. (트랜잭션마다 block_time 대기)
+      그래서 트랜잭션 수가 곧 순차 확인 시간이 됩니다.
+    - 가스는 기본 비용 + 수신자별 전송 비용의 근사값입니다.
+    - 전송마다 참조 ID(보상 ID 등)를 붙일 수 있고, 이미 지급된 참조 ID의 전송은
+      다시 지급하지 않습니다. (보상 컨트랙트의 중복 지급 방지 역할)
+    - 실제 체인처럼 서명(prepare_multi_transfer) 시점에 트랜잭션 해시가 정해지므로
+      전송 전에 해시를 기록해 두었다가 나중에 영수증으로 포함 여부를 확인할 수 있습니다.
+    """
+    
+    # 트랜잭션 기본 가스 (서명 검증, nonce 처리 등)
+    TX_BASE_GAS = 21000
+    # 수신자 1명당 토큰 전송 가스 (잔액 슬롯 쓰기 + Transfer 이벤트, 근사값)
+    TRANSFER_GAS = 30000
+    
+    def __init__(self, block_time: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        """
+        Args:
+            block_time: 트랜잭션 1건이 블록에 포함될 때까지의 시간 (초)
+            failure_rate: 트랜잭션을 임의로 거부할 확률 (재시도 테스트용)
+            seed: failure_rate 난수 시드
+        """
+        self.block_time = block_time
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = asyncio.Lock()
+        self.balances: Dict[str, int] = {}
+        self.receipts: Dict[str, Dict] = {}
+        self.references: Dict[str, Tuple[str, int]] = {}  # 참조 ID -> (tx_hash, 영수증 내 위치)
+        self.block_number = 0
+        self.nonce = 0
+        self.gas_used = 0
+        self.transaction_count = 0
+        self.transfer_count = 0
+    
+    async def send_transfer(self, to: str, amount: int, reference: Optional[str] = None) -> Dict:
+        """토큰 1건 전송 트랜잭션"""
+        return await self.send_multi_transfer([(to, amount)], [reference])
+    
+    async def send_multi_transfer(
+        self,
+        transfers: List[Tuple[str, int]],
+        references: Optional[List[Optional[str]]] = None
+    ) -> Dict:
+        """
+        여러 수신자에게 한 트랜잭션으로 토큰 전송 (multisend)
+        
+        Args:
+            transfers: [(지갑 주소, 토큰 양)], 영수증의 transfers도 같은 순서
+            references: 전송별 참조 ID (None이면 참조 없음).
+                이미 지급된 참조 ID의 전송은 지급하지 않고 duplicate로 표시합니다.
+        
+        Returns:
+            {"tx_hash", "block_number", "nonce", "gas_used",
+             "transfers": [{"index", "to", "amount", "reference", "duplicate"}]}
+        
+        Raises:
+            LocalChainError: 전송 목록이 비었거나 트랜잭션이 거부된 경우
+        """
+        return await self.send_prepared(self.prepare_multi_transfer(transfers, references))
+    
+    def prepare_multi_transfer(
+        self,
+        transfers: List[Tuple[str, int]],
+        references: Optional[List[Optional[str]]] = None
+    ) -> Dict:
+        """
+        다중 전송 트랜잭션 서명 (nonce 배정, 해시 계산만 하고 전송하지 않음)
+        
+        Returns:
+            {"tx_hash", "nonce", "transfers", "references"} (send_prepared에 그대로 전달)
+        
+        Raises:
+            LocalChainError: 전송 목록이 빈 경우
+        """
+        if not transfers:
+            raise LocalChainError("전송 목록이 비어 있습니다.")
+        
+        nonce = self.nonce
+        self.nonce += 1
+        payload = f"{nonce}:" + ",".join(f"{to}={amount}" for to, amount in transfers)
+        return {
+            "tx_hash": "0x" + hashlib.sha256(payload.encode()).hexdigest(),
+            "nonce": nonce,
+            "transfers": list(transfers),
+            "references": list(references or [None] * len(transfers))
+        }
+    
+    async def send_prepared(self, tx: Dict) -> Dict:
+        """
+        서명된 트랜잭션 전송 (이미 포함된 트랜잭션이면 다시 지급하지 않고 기존 영수증 반환)
+        
+        Returns:
+            send_multi_transfer와 같은 영수증
+        
+        Raises:
+            LocalChainError: 트랜잭션이 거부된 경우
+        """
+        async with self._lock:
+            tx_hash = tx["tx_hash"]
+            if tx_hash in self.receipts:
+                return self.receipts[tx_hash]
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                raise LocalChainError("트랜잭션이 거부되었습니다. (로컬 체인 실패 주입)")
+            if self.block_time:
+                await asyncio.sleep(self.block_time)
+            
+            nonce = tx["nonce"]
+            transfers = tx["transfers"]
+            references = tx["references"]
+            self.block_number += 1
+            gas_used = self.TX_BASE_GAS + self.TRANSFER_GAS * len(transfers)
+            
+            receipt_transfers = []
+            for index, ((to, amount), reference) in enumerate(zip(transfers, references)):
+                duplicate = reference is not None and reference in self.references
+                if not duplicate:
+                    self.balances[to] = self.balances.get(to, 0) + amount
+                    if reference is not None:
+                        self.references[reference] = (tx_hash, index)
+                receipt_transfers.append({
+                    "index": index,
+                    "to": to,
+                    "amount": amount,
+                    "reference": reference,
+                    "duplicate": duplicate
+                })
+            self.gas_used += gas_used
+            self.transaction_count += 1
+            self.transfer_count += len(transfers)
+            
+            receipt = {
+                "tx_hash": tx_hash,
+                "block_number": self.block_number,
+                "nonce": nonce,
+                "gas_used": gas_used,
+                "transfers": receipt_transfers
+            }
+            self.receipts[tx_hash] = receipt
+            return receipt
+    
+    def get_receipt(self, tx_hash: str) -> Optional[Dict]:
+        """트랜잭션 영수증 조회 (없으면 None)"""
+        return self.receipts.get(tx_hash)
+    
+    def find_reference(self, reference: str) -> Optional[Tuple[str, int]]:
+        """참조 ID로 지급된 전송 조회 (없으면 None)"""
+        return self.references.get(reference)
+    
+    def get_confirmations(self, tx_hash: str) -> Optional[int]:
+        """트랜잭션이 포함된 블록 이후 쌓인 블록 수 (포함 블록 포함, 체인에 없는 트랜잭션이면 None)"""
+        receipt = self.receipts.get(tx_hash)
+        if receipt is None:
+            return None
+        return self.block_number - receipt["block_number"] + 1
+    
+    def balance_of(self, address: str) -> int:
+        return self.balances.get(address, 0)
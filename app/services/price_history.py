@@ -0,0 +1,214 @@
+"""
+Compact price time-series store for registered meme coins
+
+Every price refresh is appended to fixed-width binary segments per token
+(one segment file per UTC day), instead of one SQLite row per point.
+OHLC rollups for each chart resolution are maintained incrementally on
+append, so chart requests read precomputed candles with a binary search
+over a memory-mapped file and never scan raw points.
+
+Layout:
+    <PRICE_HISTORY_DIR>/<token address>/raw-YYYYMMDD.bin   raw points (append-only)
+    <PRICE_HISTORY_DIR>/<token address>/ohlc-<res>.bin     rollup candles
+    <PRICE_HISTORY_DIR>/<token address>/.lock              writer lock
+
+Writes normally come from the one worker elected to poll prices (see
+app.services.price_stream), but a request-triggered refresh or a poller
+takeover can write from another process at the same time. A writer holds the token's .lock while appending and reads
+the newest raw point and candles from disk under it; a point that is not
+newer than the last one recorded (by any worker) is skipped.
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+import numpy as np
+import logging
+
+from app import file_lock
+
+logger = logging.getLogger(__name__)
+
+PRICE_HISTORY_DIR = os.getenv(
+    "PRICE_HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "prices")
+)
+
+# Supported chart resolutions (label -> bucket size in seconds)
+RESOLUTIONS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+}
+
+RAW_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("price", "<f8"),
+    ("volume24h", "<f8"),
+    ("liquidity", "<f8"),
+])
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("count", "<i8"),
+])
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class PriceHistoryStore:
+    """
+    Append-only price history with incrementally maintained OHLC rollups.
+    Only the newest candle of each rollup file is ever rewritten in place;
+    everything else is appended.
+    """
+    
+    def __init__(self, base_dir: str = PRICE_HISTORY_DIR):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+    
+    def _token_dir(self, address: str) -> str:
+        return os.path.join(self.base_dir, _SAFE_NAME.sub("_", address))
+    
+    def _rollup_path(self, address: str, resolution: str) -> str:
+        return os.path.join(self._token_dir(address), f"ohlc-{resolution}.bin")
+    
+    def record_prices(self, coins: List[Dict], ts: Optional[int] = None):
+        """
+        Record one price refresh for a list of coins
+        
+        Args:
+            coins: Coin data as returned by CoinService.get_coin_list
+            ts: Unix timestamp of the refresh (defaults to now)
+        """
+        ts = int(ts if ts is not None else time.time())
+        with self._lock:
+            for coin in coins:
+                try:
+                    price = float(coin.get("priceUsd") or 0)
+                except (TypeError, ValueError):
+                    continue
+                if price <= 0 or not coin.get("address"):
+                    continue
+                try:
+                    self._append(
+                        coin["address"], ts, price,
+                        float(coin.get("volume24h") or 0),
+                        float(coin.get("liquidity") or 0)
+                    )
+                except (OSError, TypeError, ValueError) as e:
+                    logger.error("Failed to record price for %s: %s", coin["address"], e)
+    
+    def _append(self, address: str, ts: int, price: float, volume24h: float, liquidity: float):
+        token_dir = self._token_dir(address)
+        os.makedirs(token_dir, exist_ok=True)
+        
+        with file_lock.locked(os.path.join(token_dir, ".lock")):
+            day = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m%d")
+            raw_path = os.path.join(token_dir, f"raw-{day}.bin")
+            last = _read_last_record(raw_path, RAW_DTYPE)
+            if last is not None and ts <= int(last["ts"][0]):
+                # Another worker's poller already recorded this refresh (or a newer one)
+                return
+            
+            point = np.array([(ts, price, volume24h, liquidity)], dtype=RAW_DTYPE)
+            with open(raw_path, "ab") as f:
+                f.write(point.tobytes())
+            
+            for resolution, seconds in RESOLUTIONS.items():
+                self._update_rollup(address, resolution, ts - ts % seconds, price)
+    
+    def _load_last_candle(self, address: str, resolution: str) -> Optional[np.ndarray]:
+        # Always read from disk: another worker may have updated the candle since our last write
+        return _read_last_record(self._rollup_path(address, resolution), CANDLE_DTYPE)
+    
+    def _update_rollup(self, address: str, resolution: str, bucket: int, price: float):
+        path = self._rollup_path(address, resolution)
+        last = self._load_last_candle(address, resolution)
+        
+        if last is not None and int(last["ts"][0]) == bucket:
+            # Same bucket: rewrite the newest candle in place
+            last["high"][0] = max(float(last["high"][0]), price)
+            last["low"][0] = min(float(last["low"][0]), price)
+            last["close"][0] = price
+            last["count"][0] += 1
+            with open(path, "r+b") as f:
+                f.seek(-CANDLE_DTYPE.itemsize, os.SEEK_END)
+                f.write(last.tobytes())
+        elif last is None or bucket > int(last["ts"][0]):
+            candle = np.array([(bucket, price, price, price, price, 1)], dtype=CANDLE_DTYPE)
+            with open(path, "ab") as f:
+                f.write(candle.tobytes())
+        else:
+            logger.warning("Ignoring out-of-order price point for %s (%s)", address, resolution)
+    
+    def get_candles(
+        self,
+        address: str,
+        resolution: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        limit: int = 300
+    ) -> List[Dict]:
+        """
+        Get OHLC candles from the precomputed rollup
+        
+        Args:
+            address: Token contract address
+            resolution: One of RESOLUTIONS
+            start_ts: Inclusive lower bound (Unix seconds)
+            end_ts: Inclusive upper bound (Unix seconds)
+            limit: Maximum number of candles (the most recent ones in range)
+        
+        Returns:
+            List[Dict]: Candles ordered by time with time, open, high, low, close
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+        
+        path = self._rollup_path(address, resolution)
+        if not os.path.exists(path) or os.path.getsize(path) < CANDLE_DTYPE.itemsize:
+            return []
+        
+        count = os.path.getsize(path) // CANDLE_DTYPE.itemsize
+        candles = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(count,))
+        ts = candles["ts"]
+        lo = int(np.searchsorted(ts, start_ts, side="left")) if start_ts is not None else 0
+        hi = int(np.searchsorted(ts, end_ts, side="right")) if end_ts is not None else count
+        lo = max(lo, hi - limit)
+        window = np.array(candles[lo:hi])
+        del candles
+        
+        return [
+            {
+                "time": int(row["ts"]),
+                "open": float(row["open"]),
+                "high": float(row["high"]),
+                "low": float(row["low"]),
+                "close": float(row["close"]),
+            }
+            for row in window
+        ]
+
+
+def _read_last_record(path: str, dtype: np.dtype) -> Optional[np.ndarray]:
+    """Last complete fixed-width record of a file, or None if it has none"""
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size < dtype.itemsize:
+        return None
+    with open(path, "rb") as f:
+        f.seek(size - size % dtype.itemsize - dtype.itemsize)
+        return np.frombuffer(f.read(dtype.itemsize), dtype=dtype).copy()
+
+
+price_history = PriceHistoryStore()
@@ -0,0 +1,238 @@
+"""
+Live price stream for the coin list
+
+A single background poller refreshes prices from DexScreener and hands each
+update to a broadcast hub. The hub serializes the update once into an SSE
+frame and fans the same bytes out to every subscriber. Subscriber queues are
+bounded: when a client falls behind, its oldest pending frame is dropped in
+favour of the newest one (every frame is a full snapshot, so nothing is lost),
+and clients that never drain are disconnected.
+
+With several worker processes only one of them polls DexScreener: the one
+holding the lock on PRICE_SNAPSHOT_PATH + ".lock". It writes each refresh to
+PRICE_SNAPSHOT_PATH, and the other workers publish from that file whenever
+it changes. The lock is released when its holder exits, and the remaining
+workers retry it every interval, so another one takes over.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import List, Dict, Optional, Set
+import logging
+
+from app import file_lock
+from app.metrics import PRICE_STREAM_EVENTS_TOTAL, PRICE_STREAM_SUBSCRIBERS
+from app.services.coin_service import CoinService, set_price_snapshot
+
+logger = logging.getLogger(__name__)
+
+PRICE_POLL_INTERVAL_SECONDS = float(os.getenv("PRICE_POLL_INTERVAL_SECONDS", "5"))
+PRICE_POLLER_ENABLED = os.getenv("PRICE_POLLER_ENABLED", "1") == "1"
+# Latest refresh, shared between worker processes
+PRICE_SNAPSHOT_PATH = os.getenv(
+    "PRICE_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "price_snapshot.json")
+)
+
+# Pending frames kept per subscriber before coalescing
+SUBSCRIBER_QUEUE_SIZE = 4
+# A subscriber that overflows on this many consecutive publishes is dropped
+MAX_CONSECUTIVE_OVERFLOWS = 12
+
+
+class PriceSubscriber:
+    """One connected stream client"""
+    
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflows = 0
+        self.closed = asyncio.Event()
+    
+    def offer(self, frame: bytes) -> bool:
+        """
+        Enqueue a frame, coalescing with the backlog if the queue is full
+        
+        Returns:
+            bool: False if the subscriber is hopelessly behind and should be dropped
+        """
+        if self.queue.full():
+            self.overflows += 1
+            if self.overflows >= MAX_CONSECUTIVE_OVERFLOWS:
+                return False
+            self.queue.get_nowait()
+        else:
+            self.overflows = 0
+        self.queue.put_nowait(frame)
+        return True
+
+
+class PriceBroadcastHub:
+    """Fan-out of serialized price updates to stream subscribers"""
+    
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[PriceSubscriber] = set()
+        self._latest_frame: Optional[bytes] = None
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+    
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+    
+    def subscribe(self) -> PriceSubscriber:
+        """Register a subscriber; it immediately receives the latest snapshot"""
+        subscriber = PriceSubscriber(self.queue_size)
+        if self._latest_frame is not None:
+            subscriber.offer(self._latest_frame)
+        self._subscribers.add(subscriber)
+        PRICE_STREAM_SUBSCRIBERS.inc()
+        return subscriber
+    
+    def unsubscribe(self, subscriber: PriceSubscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            PRICE_STREAM_SUBSCRIBERS.dec()
+        subscriber.closed.set()
+    
+    def publish(self, coins: List[Dict]):
+        """Serialize one update and push it to every subscriber"""
+        payload = json.dumps(
+            {"type": "prices", "timestamp": int(time.time()), "coins": coins},
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        frame = f"event: prices\ndata: {payload}\n\n".encode("utf-8")
+        self._latest_frame = frame
+        self.published += 1
+        PRICE_STREAM_EVENTS_TOTAL.labels("published").inc()
+        
+        for subscriber in list(self._subscribers):
+            was_full = subscriber.queue.full()
+            if not subscriber.offer(frame):
+                self.dropped += 1
+                PRICE_STREAM_EVENTS_TOTAL.labels("dropped").inc()
+                logger.warning("Dropping price stream subscriber that stopped reading")
+                self.unsubscribe(subscriber)
+            elif was_full:
+                self.coalesced += 1
+                PRICE_STREAM_EVENTS_TOTAL.labels("coalesced").inc()
+    
+    def stats(self) -> Dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+
+price_hub = PriceBroadcastHub()
+
+_poller_task: Optional[asyncio.Task] = None
+
+
+def _try_acquire_poller_lock(path: str) -> Optional[int]:
+    """Take the poller lock without waiting; returns its descriptor, or None if another worker has it"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    if file_lock.try_lock(fd):
+        return fd
+    os.close(fd)
+    return None
+
+
+def _write_shared_snapshot(path: str, coins: List[Dict]):
+    """Atomically replace the shared snapshot file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": time.time(), "coins": coins}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _read_shared_snapshot(path: str, seen_mtime: Optional[int], max_age: float) -> tuple:
+    """
+    Read the shared snapshot if it changed since seen_mtime
+    
+    Returns:
+        tuple: (coins, or None if unchanged, missing or older than max_age seconds; mtime)
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None, seen_mtime
+    if mtime == seen_mtime:
+        return None, seen_mtime
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if time.time() - snapshot["timestamp"] > max_age:
+        # Left over from a poller that stopped (e.g. the previous deployment)
+        return None, mtime
+    return snapshot["coins"], mtime
+
+
+async def _poll_prices(interval: float, snapshot_path: str = PRICE_SNAPSHOT_PATH):
+    """
+    Refresh prices once per interval and publish them to the hub
+    
+    The worker holding the poller lock fetches from DexScreener and shares the
+    result; the others only follow the shared snapshot file.
+    """
+    lock_fd: Optional[int] = None
+    seen_mtime: Optional[int] = None
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                if lock_fd is None:
+                    lock_fd = await asyncio.to_thread(_try_acquire_poller_lock, snapshot_path)
+                    if lock_fd is not None:
+                        logger.info("Price poller lock acquired, this worker fetches prices")
+                
+                if lock_fd is not None:
+                    coins, fallback = await CoinService().fetch_coin_list()
+                    if fallback:
+                        # Keep the last real snapshot instead of pushing zero prices to every client
+                        logger.warning("Price poller got fallback data, skipping publish")
+                    else:
+                        price_hub.publish(coins)
+                        await asyncio.to_thread(_write_shared_snapshot, snapshot_path, coins)
+                else:
+                    coins, seen_mtime = await asyncio.to_thread(
+                        _read_shared_snapshot, snapshot_path, seen_mtime, interval * 2
+                    )
+                    if coins is not None:
+                        set_price_snapshot(coins)
+                        price_hub.publish(coins)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Price poller refresh failed: %s", e)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        if lock_fd is not None:
+            os.close(lock_fd)
+
+
+def start_price_poller(interval: float = PRICE_POLL_INTERVAL_SECONDS):
+    """Start the background price poller (called on application startup)"""
+    global _poller_task
+    if not PRICE_POLLER_ENABLED:
+        logger.info("Price poller disabled (PRICE_POLLER_ENABLED=0)")
+        return
+    if _poller_task is None or _poller_task.done():
+        _poller_task = asyncio.create_task(_poll_prices(interval))
+
+
+async def stop_price_poller():
+    """Stop the background price poller (called on application shutdown)"""
+    global _poller_task
+    if _poller_task is not None:
+        _poller_task.cancel()
+        try:
+            await _poller_task
+        except asyncio.CancelledError:
+            pass
+        _poller_task = None
@@ -0,0 +1,225 @@
+"""
+보상 아웃박스 디스패처
+- 평가 API는 점수와 보상을 reward_outbox에 기록만 하고 바로 응답합니다.
+- 이 디스패처가 백그라운드에서 대기 중인 보상을 체인에 전송하고,
+  실패하면 지수 백오프로 재시도하며, 전송된 보상의 확인 블록 수를 추적합니다.
+- 보상 임대(lease)는 DB에서 원자적으로 잡으므로 여러 워커가 같은 보상을 동시에 전송하지 않습니다.
+- 전송 직전에 보상별 전송 정보(배치 트랜잭션 해시와 위치, 또는 트랜잭션 논스)를 아웃박스에 기록하고,
+  evaluation_id를 중복 지급 방지 키로 함께 보냅니다. 전송 직후 죽거나 임대가 만료되어
+  재시작한 프로세스나 다른 워커가 같은 보상을 다시 임대해도, 이 기록으로 체인에서
+  지급 여부를 확인하므로 다시 지급하지 않습니다.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from app import async_db
+from app.services.contract_service import ContractService
+
+logger = logging.getLogger(__name__)
+
+REWARD_DISPATCHER_ENABLED = os.getenv("REWARD_DISPATCHER_ENABLED", "1") == "1"
+# 새 보상이 없을 때의 확인 주기 (새 보상은 기록 직후 바로 깨움)
+REWARD_DISPATCH_INTERVAL_SECONDS = float(os.getenv("REWARD_DISPATCH_INTERVAL_SECONDS", "1.0"))
+# 한 번에 임대해 전송할 최대 보상 수
+REWARD_DISPATCH_BATCH_SIZE = int(os.getenv("REWARD_DISPATCH_BATCH_SIZE", "200"))
+# 임대 유지 시간 (디스패처가 죽으면 이 시간 뒤 다른 디스패처가 다시 가져감)
+REWARD_DISPATCH_LEASE_SECONDS = float(os.getenv("REWARD_DISPATCH_LEASE_SECONDS", "120"))
+# 재시도 정책: base * 2^(시도 횟수 - 1), 최대 max, 이 횟수를 넘으면 failed
+REWARD_MAX_ATTEMPTS = int(os.getenv("REWARD_MAX_ATTEMPTS", "8"))
+REWARD_RETRY_BASE_SECONDS = float(os.getenv("REWARD_RETRY_BASE_SECONDS", "2.0"))
+REWARD_RETRY_MAX_SECONDS = float(os.getenv("REWARD_RETRY_MAX_SECONDS", "300"))
+# 이 확인 블록 수에 도달하면 confirmed
+REWARD_REQUIRED_CONFIRMATIONS = int(os.getenv("REWARD_REQUIRED_CONFIRMATIONS", "1"))
+# 체인이 트랜잭션을 모르는 확인이 이 횟수만큼 이어지면 failed (운영자 확인 필요)
+REWARD_MAX_UNKNOWN_CHECKS = int(os.getenv("REWARD_MAX_UNKNOWN_CHECKS", "30"))
+
+
+def retry_delay(attempts: int) -> float:
+    """attempts번째 실패 후 다음 시도까지의 대기 시간 (초, ±20% 지터)"""
+    delay = min(REWARD_RETRY_MAX_SECONDS, REWARD_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class RewardDispatcher:
+    """reward_outbox의 대기 보상을 전송하고 확인 블록 수를 갱신하는 백그라운드 작업"""
+    
+    def __init__(self, contract_service: Optional[ContractService] = None):
+        self._contract_service = contract_service
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.submitted = 0
+        self.retried = 0
+        self.failed = 0
+        self.confirmed = 0
+        self.lost = 0
+    
+    @property
+    def contract_service(self) -> ContractService:
+        if self._contract_service is None:
+            self._contract_service = ContractService()
+        return self._contract_service
+    
+    def notify(self):
+        """새 보상이 기록되었음을 알림 (다음 주기를 기다리지 않고 전송)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def dispatch_once(self) -> int:
+        """
+        전송 시기가 된 보상을 임대해 한 번에 전송하고 결과를 기록
+        
+        Returns:
+            처리한 보상 수
+        """
+        claimed = await async_db.claim_pending_rewards(REWARD_DISPATCH_BATCH_SIZE, REWARD_DISPATCH_LEASE_SECONDS)
+        if not claimed:
+            return 0
+        
+        # 배치 정산 모드에서는 동시에 전송한 보상들이 같은 배치 트랜잭션으로 묶이고,
+        # 동시 전송 모드에서는 논스 관리 파이프라인으로 함께 블록 포함을 기다립니다
+        results = await asyncio.gather(
+            *[
+                self.contract_service.send_reward(
+                    row["wallet_address"], row["amount"], row["evaluation_id"], previous=row
+                )
+                for row in claimed
+            ],
+            return_exceptions=True
+        )
+        
+        submitted: List[Dict] = []
+        failed: List[Dict] = []
+        for row, result in zip(claimed, results):
+            if isinstance(result, BaseException):
+                give_up = row["attempts"] >= REWARD_MAX_ATTEMPTS
+                failed.append({
+                    "evaluation_id": row["evaluation_id"],
+                    "error": str(result) or type(result).__name__,
+                    "next_attempt_ts": None if give_up else time.time() + retry_delay(row["attempts"])
+                })
+                if give_up:
+                    self.failed += 1
+                    logger.error(
+                        "보상 전송 최종 실패: %s", result,
+                        extra={"evaluation_id": row["evaluation_id"], "attempts": row["attempts"]}
+                    )
+                else:
+                    self.retried += 1
+            else:
+                submitted.append({
+                    "evaluation_id": row["evaluation_id"],
+                    "tx_hash": result["tx_hash"],
+                    "batch_index": result.get("batch_index"),
+                    "block_number": result.get("block_number")
+                })
+        
+        await async_db.complete_reward_submissions(submitted, failed)
+        self.submitted += len(submitted)
+        if failed:
+            logger.warning("보상 전송 실패 %d건 (재시도 예약)", len(failed))
+        return len(claimed)
+    
+    async def confirm_once(self) -> int:
+        """
+        전송된 보상의 확인 블록 수를 갱신 (가장 오래전에 확인한 보상부터)
+        - 확인할 때마다 확인 시각을 기록하므로 확인 블록 수가 변하지 않는 보상이
+          앞자리를 계속 차지하지 않습니다.
+        - 체인이 모르는 트랜잭션(재시작 전 다른 체인 대역에 보낸 경우 등)은
+          REWARD_MAX_UNKNOWN_CHECKS번 연속이면 failed로 표시합니다.
+        
+        Returns:
+            새로 confirmed가 된 보상 수
+        """
+        rows = await async_db.get_submitted_rewards(REWARD_DISPATCH_BATCH_SIZE)
+        if not rows:
+            return 0
+        
+        confirmations_by_tx: Dict[str, Optional[int]] = {}
+        checks = []
+        for row in rows:
+            tx_hash = row["tx_hash"]
+            if tx_hash not in confirmations_by_tx:
+                confirmations_by_tx[tx_hash] = await self.contract_service.get_confirmations(tx_hash)
+            checks.append((row["evaluation_id"], confirmations_by_tx[tx_hash]))
+        
+        await async_db.record_reward_checks(checks, REWARD_REQUIRED_CONFIRMATIONS, REWARD_MAX_UNKNOWN_CHECKS)
+        
+        newly_confirmed = 0
+        for row, (_, confirmations) in zip(rows, checks):
+            if confirmations is None:
+                if row["unknown_checks"] + 1 >= REWARD_MAX_UNKNOWN_CHECKS:
+                    self.lost += 1
+                    logger.error(
+                        "체인에서 보상 트랜잭션을 찾을 수 없어 failed로 표시",
+                        extra={"evaluation_id": row["evaluation_id"], "tx_hash": row["tx_hash"]}
+                    )
+            elif confirmations >= REWARD_REQUIRED_CONFIRMATIONS:
+                newly_confirmed += 1
+        self.confirmed += newly_confirmed
+        return newly_confirmed
+    
+    async def _run(self, interval: float):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            try:
+                # 한 번에 다 못 가져간 보상이 남아 있으면 바로 다음 배치를 처리
+                while await self.dispatch_once() >= REWARD_DISPATCH_BATCH_SIZE and not self._stopping:
+                    pass
+                await self.confirm_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("보상 디스패처 오류: %s", e)
+    
+    def start(self, interval: float = REWARD_DISPATCH_INTERVAL_SECONDS):
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(interval))
+    
+    async def stop(self):
+        """진행 중인 전송 라운드를 마친 뒤 중지 (전송 도중 끊어 결과를 잃지 않도록)"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    def stats(self) -> Dict:
+        return {
+            "submitted": self.submitted,
+            "retried": self.retried,
+            "failed": self.failed,
+            "confirmed": self.confirmed,
+            "lost": self.lost
+        }
+
+
+reward_dispatcher = RewardDispatcher()
+
+
+def start_reward_dispatcher():
+    """보상 디스패처 시작 (서버 시작 시 호출)"""
+    if not REWARD_DISPATCHER_ENABLED:
+        logger.info("보상 디스패처 비활성화 (REWARD_DISPATCHER_ENABLED=0)")
+        return
+    reward_dispatcher.start()
+
+
+async def stop_reward_dispatcher():
+    """보상 디스패처 중지 (서버 종료 시 호출)"""
+    await reward_dispatcher.stop()
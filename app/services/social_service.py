@@ -1,5 +1,9 @@
+from typing import Optional
+import logging
 from app.services.twitter_client import TwitterClient
 
+logger = logging.getLogger(__name__)
+
 
 class SocialService:
     """
@@ -28,7 +32,7 @@ class SocialService:
         
         # ===== Mock 모드: API 호출 없이 즉시 반환 =====
         # 데모 시연을 위해 어떤 아이디를 넣어도 항상 성공하는 Mock 데이터 반환
-        print(f"📊 [Mock] 사용자 데이터 조회: @{username} (Mock 데이터 반환)")
+        logger.debug("[Mock] 사용자 데이터 조회 (Mock 데이터 반환)", extra={"username": username})
         
         return {
             "username": username,
@@ -136,7 +140,7 @@ class SocialService:
         
         # ===== Mock 모드: API 호출 없이 즉시 반환 =====
         # 데모 시연을 위해 어떤 아이디를 넣어도 항상 성공하는 Mock 트윗 데이터 반환
-        print(f"📝 [Mock] 트윗 목록 조회: @{username} (Mock 데이터 반환)")
+        logger.debug("[Mock] 트윗 목록 조회 (Mock 데이터 반환)", extra={"username": username})
         
         # Mock 트윗 데이터 생성 (광고 키워드 포함)
         mock_tweets = [
@@ -189,12 +193,15 @@ class SocialService:
         # 대소문자 구분 없이 검색
         return required_keyword.lower() in tweet_text.lower()
     
-    def verify_banner_image(self) -> bool:
+    def verify_banner_image(self, banner_image_url: Optional[str] = None) -> bool:
         """
         배너 이미지 검증 메서드 (Mock)
         - 데모용으로 항상 True를 반환합니다.
         - 실제 구현 시에는 트윗의 미디어 첨부 여부를 확인합니다.
         
+        Args:
+            banner_image_url: 선택한 광고의 배너 이미지 URL (실제 구현 시 첨부 이미지와 비교)
+        
         Returns:
             배너 이미지 포함 여부 (항상 True)
         """
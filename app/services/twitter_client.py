@@ -1,9 +1,13 @@
 import tweepy
+import logging
 import os
 from dotenv import load_dotenv
+from app.metrics import track_upstream
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class TwitterClient:
     def __init__(self):
         # 1. 환경변수(.env)에서 키 가져오기
@@ -22,9 +26,9 @@ class TwitterClient:
                 access_token=self.access_token,
                 access_token_secret=self.access_secret
             )
-            print("🐦 X(Twitter) Client 연결 시도...")
+            logger.debug("X(Twitter) Client 연결 시도")
         except Exception as e:
-            print(f"❌ X 연결 실패: {e}")
+            logger.error("X 연결 실패: %s", e)
             self.client = None
 
     async def get_my_info(self):
@@ -37,7 +41,8 @@ class TwitterClient:
             
         try:
             # 내 정보(아이디, 이름, 프로필사진) 가져오기
-            response = self.client.get_me(user_fields=["profile_image_url"])
+            with track_upstream("x", "get_me"):
+                response = self.client.get_me(user_fields=["profile_image_url"])
             if response.data:
                 user = response.data
                 return {
@@ -47,7 +52,7 @@ class TwitterClient:
                 }
             return None
         except Exception as e:
-            print(f"❌ 내 정보 조회 에러: {e}")
+            logger.error("내 정보 조회 실패: %s", e)
             return None
 
     async def get_user_by_username(self, username: str):
@@ -65,10 +70,11 @@ class TwitterClient:
         
         try:
             # 사용자명으로 사용자 정보 가져오기
-            response = self.client.get_user(
-                username=username,
-                user_fields=["public_metrics", "description", "profile_image_url"]
-            )
+            with track_upstream("x", "get_user"):
+                response = self.client.get_user(
+                    username=username,
+                    user_fields=["public_metrics", "description", "profile_image_url"]
+                )
             if response.data:
                 user = response.data
                 metrics = user.public_metrics if hasattr(user, 'public_metrics') else {}
@@ -83,7 +89,7 @@ class TwitterClient:
                 }
             return None
         except Exception as e:
-            print(f"❌ 사용자 정보 조회 에러: {e}")
+            logger.error("사용자 정보 조회 실패: %s", e, extra={"username": username})
             return None
 
     async def get_user_tweets(self, user_id: str, max_results: int = 10):
@@ -102,11 +108,12 @@ class TwitterClient:
         
         try:
             tweets = []
-            response = self.client.get_users_tweets(
-                id=user_id,
-                max_results=min(max_results, 100),
-                tweet_fields=["public_metrics", "created_at", "text"]
-            )
+            with track_upstream("x", "get_users_tweets"):
+                response = self.client.get_users_tweets(
+                    id=user_id,
+                    max_results=min(max_results, 100),
+                    tweet_fields=["public_metrics", "created_at", "text"]
+                )
             
             if response.data:
                 for tweet in response.data:
@@ -122,7 +129,7 @@ class TwitterClient:
             
             return tweets
         except Exception as e:
-            print(f"❌ 트윗 조회 에러: {e}")
+            logger.error("트윗 조회 실패: %s", e, extra={"user_id": user_id})
             return []
 
     async def post_tweet(self, text: str):
@@ -131,7 +138,8 @@ class TwitterClient:
         - 보상 받은 걸 자랑할 때 씁니다.
         """
         try:
-            response = self.client.create_tweet(text=text)
+            with track_upstream("x", "create_tweet"):
+                response = self.client.create_tweet(text=text)
             return {"status": "success", "id": response.data['id']}
         except Exception as e:
             return {"status": "error", "message": str(e)}
\ No newline at end of file
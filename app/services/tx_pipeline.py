@@ -0,0 +1,696 @@
+"""
+논스 관리 트랜잭션 전송 파이프라인
+- 보상 지갑(핫 월렛) 하나에서 여러 트랜잭션을 동시에 전송합니다.
+  (순차 전송이면 블록당 1건으로 처리량이 제한됨)
+- NonceManager가 동시 전송자에게 논스를 원자적으로 배정하고,
+  전송 실패로 반납된 논스는 다음 전송자가 먼저 재사용합니다.
+- 모니터가 블록 진행을 폴링하며
+  - 노드에서 사라진(drop) 트랜잭션을 같은 논스로 재전송해 논스 공백을 메우고,
+  - 오래 포함되지 않는(stuck) 트랜잭션을 수수료를 올려(기본 12.5%) 교체 전송하며,
+  - 재사용되지 않은 반납 논스는 0원 자기 전송으로 채워 뒤 논스들이 막히지 않게 합니다.
+- journal이 있으면 참조 ID가 있는 트랜잭션의 논스를 브로드캐스트 전에 기록합니다.
+  재시작한 프로세스나 다른 워커가 같은 참조 ID를 다시 보내면 submit(previous=...)로 받은
+  이 논스를 새 논스를 잡기 전에 노드에서 확인합니다. (포함됐으면 그 영수증, 대기 중이면
+  같은 논스로 이어서 처리하고, 다른 트랜잭션이 그 논스를 썼을 때만 새로 전송)
+- 노드와는 이더리움 JSON-RPC(eth_sendTransaction 등)로 통신합니다.
+  LocalJsonRpcNode는 블록 시간과 트랜잭션 유실을 흉내 내는 로컬 대역입니다.
+"""
+import asyncio
+import hashlib
+import heapq
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 교체 전송 시 수수료 인상 배율 (노드의 교체 최소 인상폭 10%보다 크게)
+TX_FEE_BUMP = 1.125
+# 현재 기본 수수료 대비 최초 전송 수수료 배율
+TX_FEE_MULTIPLIER = 1.25
+# 중복 전송 방지를 위해 기억할 최근 참조 ID 수
+TX_REFERENCE_CACHE_SIZE = 10000
+
+
+class JsonRpcError(Exception):
+    """노드가 JSON-RPC 오류를 반환한 경우"""
+    
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def to_hex(value: int) -> str:
+    return hex(value)
+
+
+def from_hex(value) -> int:
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class HttpJsonRpcClient:
+    """실제 노드용 JSON-RPC 클라이언트 (공유 aiohttp 세션 사용)"""
+    
+    def __init__(self, url: str):
+        self.url = url
+        self._next_id = 0
+    
+    async def request(self, method: str, params: List[Any]) -> Any:
+        from app.services.coin_service import get_http_session
+        
+        self._next_id += 1
+        payload = {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+        session = await get_http_session()
+        async with session.post(self.url, json=payload) as response:
+            body = await response.json(content_type=None)
+        if body.get("error"):
+            raise JsonRpcError(body["error"].get("code", -32000), body["error"].get("message", ""))
+        return body.get("result")
+
+
+class LocalJsonRpcNode:
+    """
+    로컬 JSON-RPC 노드 대역 (테스트/벤치마크용)
+    - block_time마다 블록이 생성되고, 블록당 max_txs_per_block건까지 포함합니다.
+    - 발신자별로 계정 논스부터 연속된 트랜잭션만 포함합니다. (공백이 있으면 뒤 논스는 대기)
+    - maxFeePerGas가 현재 base fee보다 낮은 트랜잭션은 포함되지 않고 대기합니다. (stuck)
+    - drop_rate 확률로 해시는 반환하지만 멤풀에 넣지 않습니다. (전파 중 유실)
+    - 같은 논스의 트랜잭션은 수수료가 10% 이상 높을 때만 교체합니다.
+    - 블록은 요청이 들어올 때 경과 시간만큼 한꺼번에 생성합니다. (백그라운드 작업 없음)
+    """
+    
+    REPLACEMENT_MIN_BUMP = 1.10
+    
+    def __init__(
+        self,
+        block_time: float = 1.0,
+        max_txs_per_block: int = 100,
+        base_fee: int = 10 ** 9,
+        drop_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.block_time = block_time
+        self.max_txs_per_block = max_txs_per_block
+        self.base_fee = base_fee
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self._started = time.monotonic()
+        self.block_number = 0
+        self.account_nonces: Dict[str, int] = {}
+        self.balances: Dict[str, int] = {}
+        self.mempool: Dict[str, Dict[int, Dict]] = {}  # 발신자 -> 논스 -> 트랜잭션
+        self.transactions: Dict[str, Dict] = {}  # 멤풀 또는 블록에 있는 트랜잭션
+        self.receipts: Dict[str, Dict] = {}
+        self.blocks: Dict[int, List[str]] = {}  # 블록 번호 -> 포함된 트랜잭션 해시
+        self.dropped = 0
+        self.replaced = 0
+        self.requests = 0
+    
+    async def request(self, method: str, params: List[Any]) -> Any:
+        """JSON-RPC 호출 (직렬화까지 실제 노드와 같은 경로로 처리)"""
+        payload = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        body = self.handle(json.loads(payload))
+        if "error" in body:
+            raise JsonRpcError(body["error"]["code"], body["error"]["message"])
+        return json.loads(json.dumps(body["result"]))
+    
+    def handle(self, payload: Dict) -> Dict:
+        """JSON-RPC 요청 1건 처리"""
+        self.requests += 1
+        self._mine_due_blocks()
+        handler = getattr(self, "_rpc_" + payload.get("method", ""), None)
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": payload.get("id"), "error": {"code": -32601, "message": "method not found"}}
+        try:
+            result = handler(*payload.get("params", []))
+        except JsonRpcError as e:
+            return {"jsonrpc": "2.0", "id": payload.get("id"), "error": {"code": e.code, "message": e.message}}
+        return {"jsonrpc": "2.0", "id": payload.get("id"), "result": result}
+    
+    def _mine_due_blocks(self):
+        due = int((time.monotonic() - self._started) / self.block_time) if self.block_time else self.block_number + 1
+        while self.block_number < due:
+            self._mine_block()
+    
+    def _mine_block(self):
+        self.block_number += 1
+        included = 0
+        hashes = self.blocks.setdefault(self.block_number, [])
+        for sender, pending in self.mempool.items():
+            nonce = self.account_nonces.get(sender, 0)
+            while included < self.max_txs_per_block and nonce in pending:
+                tx = pending[nonce]
+                if tx["maxFeePerGas"] < self.base_fee:
+                    break
+                del pending[nonce]
+                nonce += 1
+                included += 1
+                hashes.append(tx["hash"])
+                self.balances[tx["to"]] = self.balances.get(tx["to"], 0) + tx["value"]
+                self.receipts[tx["hash"]] = {
+                    "transactionHash": tx["hash"],
+                    "blockNumber": to_hex(self.block_number),
+                    "from": sender,
+                    "to": tx["to"],
+                    "nonce": to_hex(tx["nonce"]),
+                    "effectiveGasPrice": to_hex(self.base_fee),
+                    "status": "0x1"
+                }
+            self.account_nonces[sender] = nonce
+    
+    def _rpc_eth_blockNumber(self):
+        return to_hex(self.block_number)
+    
+    def _rpc_eth_gasPrice(self):
+        return to_hex(self.base_fee)
+    
+    def _rpc_eth_getTransactionCount(self, address: str, block: str = "latest"):
+        nonce = self.account_nonces.get(address, 0)
+        if block == "pending":
+            pending = self.mempool.get(address, {})
+            while nonce in pending:
+                nonce += 1
+        return to_hex(nonce)
+    
+    def _rpc_eth_sendTransaction(self, tx: Dict):
+        sender = tx["from"]
+        nonce = from_hex(tx["nonce"])
+        fee = from_hex(tx["maxFeePerGas"])
+        if nonce < self.account_nonces.get(sender, 0):
+            raise JsonRpcError(-32000, "nonce too low")
+        
+        tx_hash = "0x" + hashlib.sha256(
+            f"{sender}:{nonce}:{fee}:{tx['to']}:{tx['value']}:{tx.get('data', '')}".encode()
+        ).hexdigest()
+        if tx_hash in self.transactions:
+            raise JsonRpcError(-32000, "already known")
+        
+        pending = self.mempool.setdefault(sender, {})
+        existing = pending.get(nonce)
+        if existing is not None and fee < existing["maxFeePerGas"] * self.REPLACEMENT_MIN_BUMP:
+            raise JsonRpcError(-32000, "replacement transaction underpriced")
+        
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            self.dropped += 1
+            return tx_hash
+        
+        if existing is not None:
+            self.transactions.pop(existing["hash"], None)
+            self.replaced += 1
+        record = {
+            "hash": tx_hash,
+            "from": sender,
+            "to": tx["to"],
+            "value": from_hex(tx["value"]),
+            "nonce": nonce,
+            "maxFeePerGas": fee,
+            "data": tx.get("data") or "0x"
+        }
+        pending[nonce] = record
+        self.transactions[tx_hash] = record
+        return tx_hash
+    
+    def _rpc_eth_getBlockByNumber(self, number: str, full: bool = False):
+        hashes = self.blocks.get(from_hex(number))
+        if hashes is None:
+            return None
+        return {
+            "number": number,
+            "transactions": [self._rpc_eth_getTransactionByHash(tx_hash) for tx_hash in hashes] if full else list(hashes)
+        }
+    
+    def _rpc_eth_getTransactionByHash(self, tx_hash: str):
+        tx = self.transactions.get(tx_hash)
+        if tx is None:
+            return None
+        return {
+            "hash": tx["hash"],
+            "from": tx["from"],
+            "to": tx["to"],
+            "nonce": to_hex(tx["nonce"]),
+            "value": to_hex(tx["value"]),
+            "maxFeePerGas": to_hex(tx["maxFeePerGas"]),
+            "input": tx["data"]
+        }
+    
+    def _rpc_eth_getTransactionReceipt(self, tx_hash: str):
+        return self.receipts.get(tx_hash)
+    
+    def set_base_fee(self, base_fee: int):
+        """기본 수수료 변경 (혼잡 시뮬레이션: 낮은 수수료 트랜잭션이 stuck 상태가 됨)"""
+        self.base_fee = base_fee
+    
+    def balance_of(self, address: str) -> int:
+        return self.balances.get(address, 0)
+
+
+class NonceManager:
+    """
+    발신 주소 하나의 논스 배정기
+    - acquire()는 락 안에서 논스를 배정하므로 동시 전송자끼리 겹치지 않습니다.
+    - 전송 전에 실패한 논스는 release()로 반납하며, 가장 작은 반납 논스부터 재사용합니다.
+    """
+    
+    def __init__(self, rpc, address: str):
+        self.rpc = rpc
+        self.address = address
+        self._lock = asyncio.Lock()
+        self._next_nonce: Optional[int] = None
+        self._released: List[int] = []
+    
+    @property
+    def next_nonce(self) -> Optional[int]:
+        return self._next_nonce
+    
+    async def sync(self):
+        """노드의 pending 논스로 다음 논스를 맞춤 (로컬 값보다 앞서 있을 때만 당김)"""
+        chain_nonce = from_hex(await self.rpc.request("eth_getTransactionCount", [self.address, "pending"]))
+        async with self._lock:
+            if self._next_nonce is None or chain_nonce > self._next_nonce:
+                self._next_nonce = chain_nonce
+            self._released = [nonce for nonce in self._released if nonce < self._next_nonce]
+            heapq.heapify(self._released)
+    
+    async def acquire(self) -> int:
+        if self._next_nonce is None:
+            await self.sync()
+        async with self._lock:
+            if self._released:
+                return heapq.heappop(self._released)
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+    
+    async def reserve(self, nonce: int):
+        """이전 프로세스가 배정한 논스를 다시 배정하지 않도록 표시 (건너뛴 논스는 반납 목록으로)"""
+        if self._next_nonce is None:
+            await self.sync()
+        async with self._lock:
+            if nonce >= self._next_nonce:
+                for gap in range(self._next_nonce, nonce):
+                    heapq.heappush(self._released, gap)
+                self._next_nonce = nonce + 1
+            elif nonce in self._released:
+                self._released.remove(nonce)
+                heapq.heapify(self._released)
+    
+    def release(self, nonce: int):
+        """브로드캐스트하지 못한 논스 반납"""
+        heapq.heappush(self._released, nonce)
+    
+    def take_released(self, below: int) -> List[int]:
+        """below보다 작은 반납 논스를 모두 가져감 (공백 채우기용)"""
+        taken = []
+        while self._released and self._released[0] < below:
+            taken.append(heapq.heappop(self._released))
+        return taken
+    
+    def discard_released(self, below: int):
+        """이미 체인에서 사용된(below 미만) 반납 논스 정리"""
+        self.take_released(below)
+
+
+class PendingTx:
+    """전송 후 블록 포함을 기다리는 트랜잭션 (교체 전송 시 해시가 추가됨)"""
+    
+    def __init__(
+        self,
+        nonce: int,
+        to: str,
+        value: int,
+        fee: int,
+        future: Optional[asyncio.Future],
+        data: Optional[str] = None
+    ):
+        self.nonce = nonce
+        self.to = to
+        self.value = value
+        self.data = data  # 참조 ID (0x hex), 교체 전송에도 그대로 실림
+        self.fee = fee
+        self.future = future  # 공백 채우기 트랜잭션, 호출자가 취소한 트랜잭션은 None
+        self.hashes: List[str] = []
+        self.broadcast_at = 0.0
+        self.rebroadcasts = 0
+        self.sent_block = 0
+        # 전송 요청이 오류로 끝나 노드가 받았는지 모르는 경우 (해시를 모를 수 있음)
+        self.maybe_sent = False
+
+
+class TxPipeline:
+    """
+    동시 트랜잭션 전송 파이프라인
+    - 최대 max_in_flight건을 동시에 블록 포함 대기 상태로 둡니다.
+    - submit()은 트랜잭션이 블록에 포함될 때까지 기다려 영수증을 반환합니다.
+    """
+    
+    def __init__(
+        self,
+        rpc,
+        sender: str,
+        max_in_flight: int = 16,
+        poll_interval: float = 0.5,
+        stuck_after: float = 30.0,
+        fee_bump: float = TX_FEE_BUMP,
+        fee_multiplier: float = TX_FEE_MULTIPLIER,
+        max_fee: Optional[int] = None,
+        journal: Optional[Callable[[List[Dict]], Awaitable[None]]] = None
+    ):
+        """
+        Args:
+            rpc: request(method, params)를 제공하는 JSON-RPC 클라이언트
+            sender: 발신 주소 (노드에서 서명 가능한 계정)
+            max_in_flight: 동시에 블록 포함을 기다릴 최대 트랜잭션 수
+            poll_interval: 영수증/논스 확인 주기 (초)
+            stuck_after: 이 시간 동안 포함되지 않으면 수수료를 올려 재전송 (초)
+            fee_bump: 재전송 수수료 인상 배율
+            fee_multiplier: 최초 전송 시 현재 기본 수수료에 곱할 배율
+            max_fee: 수수료 상한 (None이면 제한 없음)
+            journal: 참조 ID가 있는 트랜잭션의 브로드캐스트 직전
+                [{"evaluation_id", "tx_nonce", "tx_sent_block"}]를 기록하는 함수
+                (기록이 실패하면 논스를 반납하고 보내지 않음)
+        """
+        self.rpc = rpc
+        self.sender = sender
+        self.nonces = NonceManager(rpc, sender)
+        self.poll_interval = poll_interval
+        self.stuck_after = stuck_after
+        self.fee_bump = fee_bump
+        self.fee_multiplier = fee_multiplier
+        self.max_fee = max_fee
+        self.journal = journal
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight: Dict[int, PendingTx] = {}
+        self._references: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._block_number = 0
+        self.confirmed = 0
+        self.rebroadcasts = 0
+        self.fee_bumps = 0
+        self.drop_refills = 0
+        self.gap_fills = 0
+    
+    async def start(self):
+        await self.nonces.sync()
+        self._block_number = from_hex(await self.rpc.request("eth_blockNumber", []))
+        if self._monitor_task is None or self._monitor_task.done():
+            self._monitor_task = asyncio.create_task(self._monitor())
+    
+    async def stop(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            try:
+                await self._monitor_task
+            except asyncio.CancelledError:
+                pass
+            self._monitor_task = None
+    
+    async def submit(
+        self,
+        to: str,
+        value: int,
+        reference: Optional[str] = None,
+        previous: Optional[Dict] = None
+    ) -> Dict:
+        """
+        토큰 전송 트랜잭션 1건을 보내고 블록에 포함될 때까지 대기
+        
+        Args:
+            reference: 중복 전송 방지용 참조 ID (보상 ID). 트랜잭션 data에 실리고,
+                같은 참조 ID로 다시 호출하면 새로 보내지 않고 처음 전송의 결과를 기다립니다.
+                (이 프로세스가 기억하는 최근 TX_REFERENCE_CACHE_SIZE건 기준)
+            previous: 이전 시도가 journal에 기록한 {"tx_nonce", "tx_sent_block"}.
+                재시작 후나 다른 워커에서 다시 보낼 때 이 논스를 노드에서 먼저 확인합니다.
+        
+        Returns:
+            {"tx_hash", "nonce", "block_number", "fee", "rebroadcasts"}
+        
+        Raises:
+            JsonRpcError: 노드가 전송을 거부한 경우 (논스는 반납됨)
+        """
+        if reference is None:
+            return await self._submit(to, value, None)
+        
+        task = self._references.get(reference)
+        if task is None:
+            task = asyncio.create_task(self._submit(to, value, reference, previous))
+            self._references[reference] = task
+            task.add_done_callback(lambda done: self._reference_done(reference, done))
+            while len(self._references) > TX_REFERENCE_CACHE_SIZE:
+                self._references.popitem(last=False)
+        # 호출자가 취소돼도 전송은 끝까지 진행 (다음 호출이 같은 결과를 받음)
+        return await asyncio.shield(task)
+    
+    def _reference_done(self, reference: str, task: asyncio.Task):
+        # 실패한 전송은 잊어서 다시 보낼 수 있게 함
+        if task.cancelled() or task.exception() is not None:
+            if self._references.get(reference) is task:
+                del self._references[reference]
+    
+    async def _submit(
+        self,
+        to: str,
+        value: int,
+        reference: Optional[str],
+        previous: Optional[Dict] = None
+    ) -> Dict:
+        data = "0x" + reference.encode().hex() if reference is not None else None
+        async with self._slots:
+            if previous and previous.get("tx_nonce") is not None:
+                tx = await self._resume(to, value, data, previous["tx_nonce"], previous.get("tx_sent_block") or 0)
+                if tx is not None:
+                    return await tx.future
+            
+            # 수수료 조회가 실패해도 논스가 새지 않도록 논스를 잡기 전에 조회
+            fee = await self._initial_fee()
+            for attempt in range(3):
+                nonce = await self.nonces.acquire()
+                tx = PendingTx(nonce, to, value, fee, asyncio.get_running_loop().create_future(), data)
+                tx.sent_block = self._block_number
+                try:
+                    if self.journal is not None and reference is not None:
+                        await self.journal([
+                            {"evaluation_id": reference, "tx_nonce": nonce, "tx_sent_block": tx.sent_block}
+                        ])
+                except BaseException:
+                    self.nonces.release(nonce)
+                    raise
+                try:
+                    await self._broadcast(tx)
+                except JsonRpcError as e:
+                    if "nonce too low" in e.message and attempt < 2:
+                        # 다른 곳에서 이 주소로 전송해 로컬 논스가 뒤처짐: 노드 기준으로 다시 맞춤
+                        await self.nonces.sync()
+                        continue
+                    self.nonces.release(nonce)
+                    raise
+                except BaseException as e:
+                    # 연결 오류/타임아웃/취소: 노드가 이미 받았을 수 있으므로 논스를 반납하지 않고
+                    # 전송된 것으로 취급해 모니터가 같은 논스로 재전송하고 포함 여부를 확인
+                    tx.maybe_sent = True
+                    self._in_flight[nonce] = tx
+                    if not isinstance(e, Exception):
+                        tx.future = None
+                        raise
+                    logger.warning("트랜잭션 전송 결과 불명, 같은 논스로 재확인: %s", e, extra={"nonce": nonce})
+                break
+            self._in_flight[nonce] = tx
+            return await tx.future
+    
+    async def _resume(self, to: str, value: int, data: str, nonce: int, sent_block: int) -> Optional[PendingTx]:
+        """
+        이전 프로세스가 이 참조 ID로 보낸 논스를 노드에서 확인
+        
+        Returns:
+            결과를 기다릴 PendingTx (이미 포함됐으면 결과가 설정된 상태),
+            그 논스를 다른 트랜잭션이 썼거나 이 프로세스가 다른 전송에 쓰고 있으면 None (새로 전송)
+        """
+        if nonce in self._in_flight:
+            return None
+        latest = from_hex(await self.rpc.request("eth_getTransactionCount", [self.sender, "latest"]))
+        self._block_number = from_hex(await self.rpc.request("eth_blockNumber", []))
+        tx = PendingTx(nonce, to, value, 0, asyncio.get_running_loop().create_future(), data)
+        tx.sent_block = sent_block
+        tx.maybe_sent = True
+        if nonce < latest:
+            receipt = await self._find_mined(tx)
+            if receipt is None:
+                return None
+            self.confirmed += 1
+            tx.future.set_result(self._result(tx, receipt))
+            return tx
+        
+        # 아직 포함되지 않음 (대기 중이거나 유실): 같은 논스로 이어서 처리해 모니터가 수수료를 올려 재전송
+        await self.nonces.reserve(nonce)
+        tx.fee = await self._initial_fee()
+        self._in_flight[nonce] = tx
+        logger.info("이전 전송의 논스로 이어서 처리", extra={"nonce": nonce})
+        return tx
+    
+    async def _initial_fee(self) -> int:
+        base_fee = from_hex(await self.rpc.request("eth_gasPrice", []))
+        fee = int(base_fee * self.fee_multiplier)
+        return min(fee, self.max_fee) if self.max_fee else fee
+    
+    async def _broadcast(self, tx: PendingTx):
+        params = {
+            "from": self.sender,
+            "to": tx.to,
+            "value": to_hex(tx.value),
+            "nonce": to_hex(tx.nonce),
+            "maxFeePerGas": to_hex(tx.fee)
+        }
+        if tx.data:
+            params["data"] = tx.data
+        try:
+            tx_hash = await self.rpc.request("eth_sendTransaction", [params])
+        except JsonRpcError as e:
+            if "already known" not in e.message:
+                raise
+            return
+        tx.hashes.append(tx_hash)
+        tx.broadcast_at = time.monotonic()
+    
+    async def _rebroadcast(self, tx: PendingTx, bump: bool, floor_fee: int = 0):
+        if bump:
+            # 최소 fee_bump만큼 올리되, 그동안 기본 수수료가 더 올랐으면 현재 기준 수수료까지 올림
+            bumped = max(int(tx.fee * self.fee_bump) + 1, floor_fee)
+            tx.fee = min(bumped, self.max_fee) if self.max_fee else bumped
+        try:
+            await self._broadcast(tx)
+        except JsonRpcError as e:
+            if "underpriced" in e.message:
+                # 노드가 요구하는 최소 인상폭보다 작음: 다음 확인 때 한 단계 더 올림
+                tx.broadcast_at = 0.0
+                return
+            if "nonce too low" in e.message:
+                # 이전 전송분이 이미 포함됨: 다음 확인 때 영수증으로 처리
+                return
+            raise
+        tx.rebroadcasts += 1
+        self.rebroadcasts += 1
+        if bump:
+            self.fee_bumps += 1
+    
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("트랜잭션 파이프라인 확인 실패: %s", e)
+    
+    async def check(self):
+        """블록 포함 확인, 유실/지연 트랜잭션 재전송, 논스 공백 채우기 (모니터가 주기적으로 호출)"""
+        latest = from_hex(await self.rpc.request("eth_getTransactionCount", [self.sender, "latest"]))
+        self._block_number = from_hex(await self.rpc.request("eth_blockNumber", []))
+        self.nonces.discard_released(latest)
+        current_fee = None
+        
+        for nonce in sorted(self._in_flight):
+            tx = self._in_flight[nonce]
+            if nonce < latest:
+                await self._settle(tx)
+                continue
+            
+            if not tx.hashes and tx.maybe_sent:
+                # 노드에 있을 수도 있는 트랜잭션: 같은 수수료로는 해시를 돌려받지 못하므로 교체 전송
+                if current_fee is None:
+                    current_fee = await self._initial_fee()
+                await self._rebroadcast(tx, bump=True, floor_fee=current_fee)
+                continue
+            
+            known = tx.hashes and await self.rpc.request("eth_getTransactionByHash", [tx.hashes[-1]])
+            if not known:
+                # 노드가 트랜잭션을 잃어버림: 같은 논스로 다시 보내 공백을 메움
+                self.drop_refills += 1
+                await self._rebroadcast(tx, bump=False)
+            elif time.monotonic() - tx.broadcast_at > self.stuck_after:
+                if current_fee is None:
+                    current_fee = await self._initial_fee()
+                await self._rebroadcast(tx, bump=True, floor_fee=current_fee)
+        
+        # 전송 전에 실패해 반납된 뒤 재사용되지 않은 논스는 뒤 논스들을 막으므로 0원 자기 전송으로 채움
+        highest = max(self._in_flight) if self._in_flight else -1
+        for nonce in self.nonces.take_released(highest):
+            filler = PendingTx(nonce, self.sender, 0, await self._initial_fee(), None)
+            try:
+                await self._broadcast(filler)
+            except JsonRpcError as e:
+                logger.warning("논스 공백 채우기 실패: %s", e, extra={"nonce": nonce})
+                self.nonces.release(nonce)
+                continue
+            self._in_flight[nonce] = filler
+            self.gap_fills += 1
+    
+    async def _settle(self, tx: PendingTx):
+        """포함된 논스: 교체 전송분까지 포함해 영수증을 찾아 호출자에게 전달"""
+        receipt = None
+        for tx_hash in reversed(tx.hashes):
+            receipt = await self.rpc.request("eth_getTransactionReceipt", [tx_hash])
+            if receipt:
+                break
+        if receipt is None and (tx.maybe_sent or tx.data):
+            # 해시를 모르거나, 다른 워커가 같은 참조 ID로 교체 전송한 경우
+            receipt = await self._find_mined(tx)
+        del self._in_flight[tx.nonce]
+        if tx.future is None or tx.future.done():
+            return
+        if receipt is None:
+            tx.future.set_exception(JsonRpcError(-32000, f"nonce {tx.nonce} was used by another transaction"))
+            return
+        self.confirmed += 1
+        tx.future.set_result(self._result(tx, receipt))
+    
+    @staticmethod
+    def _result(tx: PendingTx, receipt: Dict) -> Dict:
+        return {
+            "tx_hash": receipt["transactionHash"],
+            "nonce": tx.nonce,
+            "block_number": from_hex(receipt["blockNumber"]),
+            "fee": tx.fee,
+            "rebroadcasts": tx.rebroadcasts
+        }
+    
+    async def _find_mined(self, tx: PendingTx) -> Optional[Dict]:
+        """
+        해시를 모르는 트랜잭션의 영수증을 전송 이후 블록에서 발신자/논스로 찾음
+        (참조 ID가 있으면 data까지 같아야 함, 다른 트랜잭션이 그 논스를 썼으면 None)
+        """
+        for number in range(max(tx.sent_block, 1), self._block_number + 1):
+            block = await self.rpc.request("eth_getBlockByNumber", [to_hex(number), True])
+            for item in (block or {}).get("transactions", []):
+                if item["from"] == self.sender and from_hex(item["nonce"]) == tx.nonce:
+                    if tx.data and item.get("input") != tx.data:
+                        return None
+                    tx.fee = from_hex(item["maxFeePerGas"])
+                    return await self.rpc.request("eth_getTransactionReceipt", [item["hash"]])
+        return None
+    
+    async def get_confirmations(self, tx_hash: str) -> Optional[int]:
+        """
+        트랜잭션이 포함된 블록 이후 쌓인 블록 수
+        (포함 블록 포함, 아직 포함되지 않았으면 0, 노드가 모르는 트랜잭션이면 None)
+        """
+        receipt = await self.rpc.request("eth_getTransactionReceipt", [tx_hash])
+        if not receipt:
+            pending = await self.rpc.request("eth_getTransactionByHash", [tx_hash])
+            return 0 if pending else None
+        latest_block = from_hex(await self.rpc.request("eth_blockNumber", []))
+        return latest_block - from_hex(receipt["blockNumber"]) + 1
+    
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "next_nonce": self.nonces.next_nonce,
+            "confirmed": self.confirmed,
+            "rebroadcasts": self.rebroadcasts,
+            "fee_bumps": self.fee_bumps,
+            "drop_refills": self.drop_refills,
+            "gap_fills": self.gap_fills
+        }
@@ -0,0 +1,69 @@
+"""
+Bulk ad pricing benchmark: per-creator calculate_ad_pricing loop vs
+the vectorized calculate_ad_pricing_bulk, plus the full HTTP round trip of
+POST /advertisements/pricing/bulk (request parsing + JSON response).
+
+Usage:
+    python scripts/bench_ad_pricing.py [max_creators]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.advertisement_service import AdvertisementService
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv):
+    max_creators = int(argv[0]) if argv else 100_000
+    service = AdvertisementService()
+    rng = np.random.default_rng(7)
+    
+    client = None
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app
+        client = TestClient(app)
+    except Exception as e:
+        print(f"⚠️  HTTP round trip skipped: {e}")
+    
+    print(f"\n{'creators':>10} {'loop':>12} {'bulk':>12} {'speedup':>9} {'HTTP bulk':>12}")
+    size = 1000
+    while size <= max_creators:
+        followers = rng.integers(0, 200_000, size)
+        rates = np.round(rng.uniform(0, 25, size), 2)
+        
+        loop = best_of(lambda: [
+            service.calculate_ad_pricing(int(f), float(r)) for f, r in zip(followers, rates)
+        ])
+        bulk = best_of(lambda: service.calculate_ad_pricing_bulk(followers, rates, {"large": 1.5}))
+        
+        http = float("nan")
+        if client is not None:
+            payload = {
+                "followers": followers.tolist(),
+                "engagement_rates": rates.tolist(),
+                "tier_multipliers": {"large": 1.5}
+            }
+            http = best_of(lambda: client.post("/advertisements/pricing/bulk", json=payload))
+        
+        print(f"{size:>10,} {loop * 1000:>9.1f} ms {bulk * 1000:>9.2f} ms "
+              f"{loop / bulk:>8.0f}x {http * 1000:>9.1f} ms")
+        size *= 10
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
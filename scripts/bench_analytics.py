@@ -0,0 +1,121 @@
+"""
+Volume analytics benchmark: ISO string timestamps vs integer created_ts
+
+Fills a temporary database with synthetic purchases (10M rows by default)
+and times per-minute/hour/day volume queries two ways:
+- Before: range filter and bucketing on the created_at ISO string
+  (substr() grouping over a table scan)
+- After: app.db.get_volume_buckets on created_ts (covering index only)
+
+Usage:
+    python scripts/bench_analytics.py [rows] [days]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db as db
+
+COINS = ["BONK", "WIF", "POPCAT"]
+INSERT_CHUNK = 200_000
+
+# Before: same buckets computed from the ISO string column
+LEGACY_PREFIX_LENGTH = {60: 16, 3600: 13, 86400: 10}
+
+
+def fill(rows: int, days: int) -> tuple:
+    end_ts = int(time.time())
+    start_ts = end_ts - days * 86400
+    rng = np.random.default_rng(42)
+    
+    with db.get_db_connection() as conn:
+        cursor = conn.cursor()
+        for offset in range(0, rows, INSERT_CHUNK):
+            n = min(INSERT_CHUNK, rows - offset)
+            ts = np.sort(rng.integers(start_ts, end_ts, n))
+            coins = rng.integers(0, len(COINS), n)
+            amounts = np.round(rng.uniform(1, 1000, n), 2)
+            cursor.executemany("""
+                INSERT INTO purchases (username, coin_symbol, amount, tx_hash, created_at, created_ts)
+                VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'), ?)
+            """, (
+                (f"user{(offset + i) % 5000}", COINS[c], float(a), f"0x{offset + i:016x}", int(t), int(t))
+                for i, (t, c, a) in enumerate(zip(ts, coins, amounts))
+            ))
+            conn.commit()
+            print(f"   ... {offset + n:,} rows", end="\r")
+    print()
+    return start_ts, end_ts
+
+
+def legacy_buckets(start_ts: int, end_ts: int, bucket_seconds: int, coin_symbol: str):
+    prefix = LEGACY_PREFIX_LENGTH[bucket_seconds]
+    with db.get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT coin_symbol, substr(created_at, 1, ?) AS bucket, SUM(amount), COUNT(*)
+            FROM purchases NOT INDEXED
+            WHERE coin_symbol = ?
+              AND created_at >= datetime(?, 'unixepoch') AND created_at < datetime(?, 'unixepoch')
+            GROUP BY coin_symbol, bucket
+            ORDER BY coin_symbol, bucket
+        """, (prefix, coin_symbol, start_ts, end_ts))
+        return cursor.fetchall()
+
+
+def timed(fn, *args, repeat: int = 3) -> tuple:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, len(result)
+
+
+def main(argv):
+    rows = int(argv[0]) if len(argv) > 0 else 10_000_000
+    days = int(argv[1]) if len(argv) > 1 else 30
+    
+    tmp_dir = tempfile.mkdtemp()
+    db.DB_PATH = os.path.join(tmp_dir, "bench.db")
+    db.init_db()
+    
+    print(f"📥 Inserting {rows:,} purchases over {days} days")
+    started = time.perf_counter()
+    start_ts, end_ts = fill(rows, days)
+    print(f"   done in {time.perf_counter() - started:.1f}s")
+    
+    with db.get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("ANALYZE")
+        cursor.execute("EXPLAIN QUERY PLAN SELECT (created_ts / 60) * 60, SUM(amount), COUNT(*) "
+                       "FROM purchases WHERE coin_symbol = 'BONK' AND created_ts >= 0 AND created_ts < 1 "
+                       "GROUP BY 1")
+        print("\n🔎 Query plan (after):")
+        for row in cursor.fetchall():
+            print(f"   - {row[3]}")
+    
+    cases = [
+        ("minute, last 24h", 60, end_ts - 86400),
+        ("hour, last 7d", 3600, end_ts - 7 * 86400),
+        ("day, full range", 86400, start_ts),
+    ]
+    print(f"\n{'query':<20} {'before (ISO string)':>22} {'after (created_ts)':>20} {'speedup':>9}")
+    for label, bucket_seconds, range_start in cases:
+        before, n_before = timed(legacy_buckets, range_start, end_ts, bucket_seconds, "BONK")
+        after, n_after = timed(db.get_volume_buckets, range_start, end_ts, bucket_seconds, "BONK")
+        print(f"{label:<20} {before * 1000:>16.1f} ms ({n_before:>4}) "
+              f"{after * 1000:>12.1f} ms ({n_after:>4}) {before / max(after, 1e-9):>8.1f}x")
+    
+    db.close_db_connections()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
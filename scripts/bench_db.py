@@ -0,0 +1,116 @@
+"""
+SQLite throughput benchmark: connection-per-call vs pooled WAL connections
+
+Runs concurrent writer threads (insert_purchase) and reader threads
+(get_history_by_username) against a temporary database, first with the
+previous setup (new sqlite3.connect per call, rollback journal, default
+pragmas) and then with the pooled connections from app.db.
+
+Usage:
+    python scripts/bench_db.py [seconds] [writers] [readers]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db as db
+
+USERS = [f"user{i}" for i in range(200)]
+
+
+@contextmanager
+def legacy_connection():
+    """The previous get_db_connection: a fresh connection for every call"""
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def run_load(seconds: float, writers: int, readers: int) -> dict:
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+    
+    def writer(worker_id: int):
+        n = 0
+        while time.perf_counter() < stop_at:
+            try:
+                db.insert_purchase(USERS[n % len(USERS)], "BONK", 1.0, f"0x{worker_id:02x}{n:010x}{time.time_ns()}")
+                with lock:
+                    counts["writes"] += 1
+            except sqlite3.Error:
+                with lock:
+                    counts["errors"] += 1
+            n += 1
+    
+    def reader(worker_id: int):
+        n = worker_id
+        while time.perf_counter() < stop_at:
+            try:
+                db.get_history_by_username(USERS[n % len(USERS)], limit=20)
+                with lock:
+                    counts["reads"] += 1
+            except sqlite3.Error:
+                with lock:
+                    counts["errors"] += 1
+            n += 1
+    
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def bench(label: str, seconds: float, writers: int, readers: int, legacy: bool):
+    tmp_dir = tempfile.mkdtemp()
+    db.DB_PATH = os.path.join(tmp_dir, "bench.db")
+    db.init_db()
+    
+    original = db.get_db_connection
+    if legacy:
+        conn = sqlite3.connect(db.DB_PATH)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        db.get_db_connection = legacy_connection
+    try:
+        counts = run_load(seconds, writers, readers)
+    finally:
+        db.get_db_connection = original
+        db.close_db_connections()
+    
+    print(f"\n🗄️  {label}")
+    print(f"   - inserts/sec : {counts['writes'] / seconds:10.1f}")
+    print(f"   - reads/sec   : {counts['reads'] / seconds:10.1f}")
+    print(f"   - errors      : {counts['errors']}")
+    return counts
+
+
+def main(argv):
+    seconds = float(argv[0]) if len(argv) > 0 else 5.0
+    writers = int(argv[1]) if len(argv) > 1 else 4
+    readers = int(argv[2]) if len(argv) > 2 else 8
+    print(f"⏱️  {seconds:.0f}s per run, {writers} writer threads, {readers} reader threads")
+    
+    before = bench("Before: connect per call, rollback journal", seconds, writers, readers, legacy=True)
+    after = bench("After: pooled connections, WAL + tuned pragmas", seconds, writers, readers, legacy=False)
+    
+    print("\n📈 Improvement")
+    print(f"   - inserts: {after['writes'] / max(before['writes'], 1):.1f}x")
+    print(f"   - reads  : {after['reads'] / max(before['reads'], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,138 @@
+"""
+DexScreener pair parsing micro-benchmark
+
+Compares the old path (buffer the whole body, json.loads, walk every pair)
+with the streaming parser used by CoinService (feed 64KB chunks, keep only
+the best pair per tracked token). Reports wall time and tracemalloc peak.
+
+Usage:
+    python scripts/bench_dexscreener_parse.py                       # synthetic payloads
+    python scripts/bench_dexscreener_parse.py payload1.json ...     # recorded payloads
+    python scripts/bench_dexscreener_parse.py --record out.json ADDR1,ADDR2
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.dexscreener_parser import BestPairSelector, select_best_pairs
+
+CHUNK_SIZE = 64 * 1024
+REPEAT = 3
+
+
+def make_payload(tracked: list, pairs_per_token: int, seed: int = 7) -> bytes:
+    """Build a DexScreener-shaped /tokens body (most pairs quote the tracked token)"""
+    rng = random.Random(seed)
+    pairs = []
+    for address in tracked:
+        for i in range(pairs_per_token):
+            base_is_tracked = rng.random() < 0.2
+            other = "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz123456789") for _ in range(44))
+            base, quote = (address, other) if base_is_tracked else (other, address)
+            pairs.append({
+                "chainId": "solana",
+                "dexId": rng.choice(["raydium", "orca", "meteora"]),
+                "url": f"https://dexscreener.com/solana/{other.lower()}",
+                "pairAddress": other,
+                "labels": ["CLMM"],
+                "baseToken": {"address": base, "name": f"Token {base[:4]}", "symbol": base[:4].upper()},
+                "quoteToken": {"address": quote, "name": f"Token {quote[:4]}", "symbol": quote[:4].upper()},
+                "priceNative": f"{rng.random():.10f}",
+                "priceUsd": f"{rng.random():.10f}",
+                "txns": {k: {"buys": rng.randint(0, 5000), "sells": rng.randint(0, 5000)} for k in ("m5", "h1", "h6", "h24")},
+                "volume": {k: round(rng.random() * 1e6, 2) for k in ("h24", "h6", "h1", "m5")},
+                "priceChange": {k: round(rng.uniform(-50, 50), 2) for k in ("m5", "h1", "h6", "h24")},
+                "liquidity": {"usd": round(rng.random() * 1e7, 2), "base": rng.random() * 1e9, "quote": rng.random() * 1e5},
+                "fdv": rng.randint(1, 10**10),
+                "marketCap": rng.randint(1, 10**10),
+                "pairCreatedAt": 1700000000000 + i,
+                "info": {"imageUrl": "https://example.com/x.png", "websites": [], "socials": []},
+            })
+    return json.dumps({"schemaVersion": "1.0.0", "pairs": pairs}).encode("utf-8")
+
+
+def iter_chunks(body: bytes):
+    view = memoryview(body)
+    for i in range(0, len(body), CHUNK_SIZE):
+        yield bytes(view[i:i + CHUNK_SIZE])
+
+
+def parse_full(body: bytes, tracked: list) -> dict:
+    """Previous approach: buffer the whole body, load it, walk all pairs"""
+    data = json.loads(b"".join(iter_chunks(body)).decode("utf-8"))
+    selector = BestPairSelector(tracked)
+    for pair in data.get("pairs", []):
+        selector.offer(pair)
+    return selector.best
+
+
+def parse_streaming(body: bytes, tracked: list) -> dict:
+    return select_best_pairs(iter_chunks(body), tracked)
+
+
+def measure(fn, body: bytes, tracked: list):
+    best_time = float("inf")
+    for _ in range(REPEAT):
+        gc.collect()
+        started = time.perf_counter()
+        result = fn(body, tracked)
+        best_time = min(best_time, time.perf_counter() - started)
+    
+    gc.collect()
+    tracemalloc.start()
+    fn(body, tracked)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best_time, peak
+
+
+def run(label: str, body: bytes, tracked: list):
+    full_result, full_time, full_peak = measure(parse_full, body, tracked)
+    stream_result, stream_time, stream_peak = measure(parse_streaming, body, tracked)
+    
+    same = {k: v["pair"].get("pairAddress") for k, v in full_result.items()} == \
+        {k: v["pair"].get("pairAddress") for k, v in stream_result.items()}
+    print(f"\n📦 {label}: {len(body) / 1e6:.1f} MB body, {len(tracked)} tracked tokens")
+    print(f"   - json.loads + walk : {full_time * 1000:8.1f} ms, peak {full_peak / 1e6:8.1f} MB")
+    print(f"   - streaming parser  : {stream_time * 1000:8.1f} ms, peak {stream_peak / 1e6:8.1f} MB")
+    print(f"   - speedup {full_time / stream_time:.2f}x, peak memory {full_peak / max(stream_peak, 1):.1f}x lower"
+          f", same selection: {'✅' if same else '❌'}")
+
+
+def record(path: str, addresses: str):
+    import urllib.request
+    url = f"https://api.dexscreener.com/latest/dex/tokens/{addresses}"
+    with urllib.request.urlopen(url, timeout=30) as response, open(path, "wb") as f:
+        f.write(response.read())
+    print(f"✅ Recorded {url} -> {path}")
+
+
+def main(argv):
+    if len(argv) >= 3 and argv[0] == "--record":
+        record(argv[1], argv[2])
+        return
+    
+    if argv:
+        for path in argv:
+            with open(path, "rb") as f:
+                body = f.read()
+            pairs = json.loads(body).get("pairs") or []
+            tracked = sorted({p["baseToken"]["address"] for p in pairs if p.get("baseToken")})[:30]
+            run(os.path.basename(path), body, tracked)
+        return
+    
+    tracked = [f"TRACKED{i:02d}" + "x" * 36 for i in range(30)]
+    for pairs_per_token in (100, 500, 2000):
+        body = make_payload(tracked, pairs_per_token)
+        run(f"synthetic {pairs_per_token * len(tracked):,} pairs", body, tracked)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+"""
+Reward settlement benchmark on the in-memory chain stand-in:
+one transaction per reward vs RewardSettlementBatcher (multi-recipient transfers).
+
+Every transaction waits one simulated block time and transactions are
+included one after another, so the per-reward mode pays one confirmation
+per wallet while the batched mode pays one per batch.
+
+Usage:
+    python scripts/bench_reward_settlement.py [rewards] [block_time_ms] [batch_size]
+"""
+import asyncio
+import os
+import sys
+import time
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.contract_service import ContractService, RewardSettlementBatcher
+from app.services.local_chain import InMemoryChain
+
+
+async def run_single(rewards, block_time: float) -> tuple:
+    chain = InMemoryChain(block_time=block_time)
+    started = time.perf_counter()
+    await asyncio.gather(*[chain.send_transfer(wallet, amount) for wallet, amount in rewards])
+    return time.perf_counter() - started, chain
+
+
+async def run_batched(rewards, block_time: float, batch_size: int) -> tuple:
+    chain = InMemoryChain(block_time=block_time)
+    batcher = RewardSettlementBatcher(chain, max_size=batch_size, max_delay=0.05)
+    started = time.perf_counter()
+    results = await asyncio.gather(*[batcher.submit(wallet, amount) for wallet, amount in rewards])
+    elapsed = time.perf_counter() - started
+    
+    # Every caller must get its own slot in its batch transaction
+    slots = {(r["tx_hash"], r["batch_index"]) for r in results}
+    assert len(slots) == len(rewards), "duplicate batch positions"
+    for (wallet, amount), result in zip(rewards, results):
+        transfer = chain.get_receipt(result["tx_hash"])["transfers"][result["batch_index"]]
+        assert transfer["to"] == wallet and transfer["amount"] == amount
+    return elapsed, chain
+
+
+def main(argv):
+    count = int(argv[0]) if len(argv) > 0 else 2000
+    block_time = float(argv[1]) / 1000 if len(argv) > 1 else 0.005
+    batch_size = int(argv[2]) if len(argv) > 2 else 200
+    
+    rewards = [
+        (f"wallet_{i:06d}", ContractService.calculate_reward_amount(i % 101))
+        for i in range(count)
+    ]
+    
+    single_time, single_chain = asyncio.run(run_single(rewards, block_time))
+    batched_time, batched_chain = asyncio.run(run_batched(rewards, block_time, batch_size))
+    assert single_chain.balances == batched_chain.balances
+    
+    print(f"\n{count:,} rewards, block time {block_time * 1000:.1f} ms, batch size {batch_size}")
+    print(f"{'mode':>10} {'txs':>8} {'gas used':>14} {'gas/reward':>11} {'wall time':>11}")
+    for name, elapsed, chain in (
+        ("single", single_time, single_chain),
+        ("batched", batched_time, batched_chain),
+    ):
+        print(f"{name:>10} {chain.transaction_count:>8,} {chain.gas_used:>14,} "
+              f"{chain.gas_used / count:>11,.0f} {elapsed:>9.2f} s")
+    print(f"\nspeedup: {single_time / batched_time:.1f}x, gas saved: "
+          f"{1 - batched_chain.gas_used / single_chain.gas_used:.1%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,82 @@
+"""
+Transaction pipeline benchmark against the local JSON-RPC node stand-in:
+one transaction in flight at a time vs the nonce-managed pipeline.
+
+The node produces a block every block_time and silently drops a share of
+submitted transactions. A few blocks into each run the base fee jumps above
+the fee of every pending transaction, so they get stuck until the pipeline
+re-broadcasts them with bumped fees. Every reward must land exactly once.
+
+Usage:
+    python scripts/bench_tx_pipeline.py [transfers] [block_time_ms] [drop_rate] [max_in_flight]
+"""
+import asyncio
+import os
+import sys
+import time
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.tx_pipeline import LocalJsonRpcNode, TxPipeline
+
+SENDER = "0xreward000000000000000000000000000000000"
+
+
+async def run(transfers: int, block_time: float, drop_rate: float, max_in_flight: int) -> dict:
+    node = LocalJsonRpcNode(block_time=block_time, max_txs_per_block=200, drop_rate=drop_rate, seed=11)
+    pipeline = TxPipeline(
+        node,
+        SENDER,
+        max_in_flight=max_in_flight,
+        poll_interval=block_time / 2,
+        stuck_after=block_time * 4
+    )
+    await pipeline.start()
+    
+    wallets = [f"0xwallet{i:032d}" for i in range(transfers)]
+    
+    # Raise the base fee while transactions are still waiting for inclusion
+    spike = asyncio.get_running_loop().call_later(block_time * 3.5, lambda: node.set_base_fee(node.base_fee * 3))
+    
+    started = time.perf_counter()
+    receipts = await asyncio.gather(*[pipeline.submit(wallets[i], 100 + i) for i in range(transfers)])
+    elapsed = time.perf_counter() - started
+    spike.cancel()
+    await pipeline.stop()
+    
+    nonces = sorted(receipt["nonce"] for receipt in receipts)
+    assert nonces == list(range(transfers)), "nonces are not contiguous"
+    for i, wallet in enumerate(wallets):
+        assert node.balance_of(wallet) == 100 + i, f"{wallet} paid {node.balance_of(wallet)}"
+    
+    return {
+        "elapsed": elapsed,
+        "blocks": node.block_number,
+        "dropped": node.dropped,
+        "replaced": node.replaced,
+        **pipeline.stats(),
+    }
+
+
+def main(argv):
+    transfers = int(argv[0]) if len(argv) > 0 else 300
+    block_time = float(argv[1]) / 1000 if len(argv) > 1 else 0.02
+    drop_rate = float(argv[2]) if len(argv) > 2 else 0.05
+    max_in_flight = int(argv[3]) if len(argv) > 3 else 64
+    
+    print(f"\n{transfers:,} transfers, block time {block_time * 1000:.0f} ms, drop rate {drop_rate:.0%}")
+    print(f"{'in flight':>10} {'wall time':>11} {'tx/s':>8} {'blocks':>8} {'dropped':>8} "
+          f"{'refilled':>9} {'fee bumps':>10}")
+    results = {}
+    for in_flight in (1, max_in_flight):
+        result = asyncio.run(run(transfers, block_time, drop_rate, in_flight))
+        results[in_flight] = result
+        print(f"{in_flight:>10} {result['elapsed']:>9.2f} s {transfers / result['elapsed']:>8.1f} "
+              f"{result['blocks']:>8} {result['dropped']:>8} {result['drop_refills']:>9} "
+              f"{result['fee_bumps']:>10}")
+    print(f"\nspeedup: {results[1]['elapsed'] / results[max_in_flight]['elapsed']:.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
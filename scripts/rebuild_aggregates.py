@@ -0,0 +1,30 @@
+"""
+Recompute the volume aggregate tables (user_coin_totals, coin_totals)
+from the raw purchases rows.
+
+Usage:
+    python scripts/rebuild_aggregates.py
+"""
+import os
+import sys
+import time
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import DB_PATH, init_db, rebuild_aggregates, close_db_connections
+
+
+def main():
+    print(f"--- 🔄 집계 테이블 재계산 시작: {DB_PATH} ---")
+    init_db()
+    started = time.perf_counter()
+    counts = rebuild_aggregates()
+    close_db_connections()
+    print(f"✅ 완료 ({time.perf_counter() - started:.2f}s)")
+    print(f"   - user_coin_totals: {counts['user_coin_totals']:,} rows")
+    print(f"   - coin_totals: {counts['coin_totals']:,} rows")
+
+
+if __name__ == "__main__":
+    main()
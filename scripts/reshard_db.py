@@ -0,0 +1,206 @@
+"""
+Redistribute per-user tables across a new number of username shards
+
+Copies every purchase (IDs, tx hashes and timestamps preserved) and ad
+selection from the current layout into the target layout, routing each
+row by the same CRC32(username) rule as app.db, then rebuilds the volume
+aggregates.
+
+- Target shards are built under temporary names and swapped in at the end;
+  replaced shard files are kept with a .bak suffix.
+- The main database is backed up to <DB_PATH>.bak before its purchase
+  tables are touched (when moving to or from the unsharded layout).
+
+Stop every application worker before running, then restart them with
+DB_SHARDS set to the target count.
+
+Usage:
+    python scripts/reshard_db.py <target_shards> [source_shards]
+
+    source_shards defaults to the current DB_SHARDS (0 = unsharded).
+"""
+import os
+import sqlite3
+import sys
+import time
+
+# 현재 폴더 위치를 파이썬에게 알려줌 (app 폴더를 찾기 위해)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.db as db
+
+PER_USER_TABLES = ["purchases", "user_coin_totals", "coin_totals", "ad_selections"]
+STAGING_SUFFIX = ".resharding"
+
+
+def backup(path: str):
+    target = f"{path}.bak"
+    src = sqlite3.connect(path)
+    dst = sqlite3.connect(target)
+    with dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
+    print(f"💾 Backed up {os.path.basename(path)} -> {os.path.basename(target)}")
+
+
+def checkpoint(path: str):
+    """Fold the WAL into the database file so the file alone holds every row"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def max_ids_by_span(source_paths: list) -> dict:
+    """Highest existing purchase ID within each shard ID range, across all sources"""
+    highest = {}
+    for path in source_paths:
+        conn = sqlite3.connect(path)
+        for span_index, max_id in conn.execute(
+            "SELECT id / ?, MAX(id) FROM purchases GROUP BY id / ?",
+            (db.SHARD_ID_SPAN, db.SHARD_ID_SPAN)
+        ):
+            highest[span_index] = max(highest.get(span_index, 0), max_id)
+        conn.close()
+    return highest
+
+
+def copy_into(conn: sqlite3.Connection, source_paths: list, shard_index: int, target_shards: int) -> tuple:
+    """Copy the rows routed to shard_index from every source; returns (copied, skipped)"""
+    conn.create_function(
+        "shard_of", 1,
+        lambda username: db.shard_index_for(username, target_shards),
+        deterministic=True
+    )
+    copied = skipped = 0
+    for path in source_paths:
+        conn.execute("ATTACH DATABASE ? AS src", (path,))
+        total = conn.execute(
+            "SELECT COUNT(*) FROM src.purchases WHERE shard_of(username) = ?",
+            (shard_index,)
+        ).fetchone()[0]
+        # tx_hash stays unique per shard; collisions only occur when merging shards
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO purchases (id, username, coin_symbol, amount, tx_hash, created_at, created_ts)
+            SELECT id, username, coin_symbol, amount, tx_hash, created_at, created_ts
+            FROM src.purchases
+            WHERE shard_of(username) = ?
+        """, (shard_index,))
+        copied += cursor.rowcount
+        skipped += total - cursor.rowcount
+        
+        has_selections = conn.execute(
+            "SELECT 1 FROM src.sqlite_master WHERE type = 'table' AND name = 'ad_selections'"
+        ).fetchone()
+        if has_selections:
+            conn.execute("""
+                INSERT OR REPLACE INTO ad_selections (username, ad_id, wallet_address, is_active, selected_at)
+                SELECT username, ad_id, wallet_address, is_active, selected_at
+                FROM src.ad_selections
+                WHERE shard_of(username) = ?
+            """, (shard_index,))
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+    return copied, skipped
+
+
+def reserve_id_range(conn: sqlite3.Connection, shard_index: int, highest: dict):
+    """Make sure this shard never generates an ID that already exists elsewhere"""
+    existing = highest.get(shard_index)
+    if existing is None:
+        return
+    conn.execute(
+        "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'purchases'",
+        (existing,)
+    )
+    if conn.execute("SELECT changes()").fetchone()[0] == 0:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('purchases', ?)", (existing,))
+    conn.commit()
+
+
+def remove_with_sidecars(path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        sys.exit(1)
+    target_shards = int(argv[0])
+    source_shards = int(argv[1]) if len(argv) > 1 else db.DB_SHARDS
+    
+    source_paths = db.shard_paths(source_shards)
+    target_paths = db.shard_paths(target_shards)
+    if source_paths == target_paths:
+        print("✅ Source and target layouts are identical; nothing to do")
+        return
+    for path in source_paths:
+        if not os.path.exists(path):
+            print(f"❌ Source shard not found: {path}")
+            sys.exit(1)
+    
+    print(f"--- 🔀 Resharding {len(source_paths)} -> {len(target_paths)} database file(s) ---")
+    started = time.perf_counter()
+    for path in source_paths:
+        checkpoint(path)
+    highest = max_ids_by_span(source_paths)
+    unsharded_target = target_shards <= 1
+    if db.DB_PATH in source_paths or unsharded_target:
+        backup(db.DB_PATH)
+    
+    staged = []
+    total_copied = total_skipped = 0
+    for shard_index, final_path in enumerate(target_paths):
+        # The unsharded layout keeps purchases in the main database, next to the coin registry
+        path = final_path if unsharded_target else final_path + STAGING_SUFFIX
+        if not unsharded_target:
+            remove_with_sidecars(path)
+        db._init_shard(path, shard_index)
+        
+        conn = sqlite3.connect(path)
+        if unsharded_target:
+            for table in PER_USER_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.commit()
+        copied, skipped = copy_into(conn, source_paths, shard_index, target_shards)
+        reserve_id_range(conn, shard_index, highest)
+        db._rebuild_aggregates(conn)
+        conn.close()
+        
+        staged.append((path, final_path))
+        total_copied += copied
+        total_skipped += skipped
+        print(f"   - shard {shard_index}: {copied:,} purchases -> {os.path.basename(final_path)}")
+    
+    if not unsharded_target:
+        for path, final_path in staged:
+            if os.path.exists(final_path):
+                remove_with_sidecars(final_path + ".bak")
+                os.replace(final_path, final_path + ".bak")
+                remove_with_sidecars(final_path)
+            os.replace(path, final_path)
+        # Purchases now live in the shards; clear the main database copy
+        if db.DB_PATH in source_paths:
+            conn = sqlite3.connect(db.DB_PATH)
+            for table in PER_USER_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.commit()
+            conn.close()
+    
+    # Shard files dropped by the new layout
+    for path in source_paths:
+        if path not in target_paths and path != db.DB_PATH:
+            remove_with_sidecars(path + ".bak")
+            os.replace(path, path + ".bak")
+            remove_with_sidecars(path)
+    
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s: {total_copied:,} purchases copied")
+    if total_skipped:
+        print(f"⚠️  {total_skipped:,} rows skipped (tx_hash already present in the target shard)")
+    print(f"👉 Restart the workers with DB_SHARDS={target_shards if target_shards > 1 else 0}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app.services import advertisement_service
+from app.services.advertisement_service import AdCatalog, AdvertisementService, DEFAULT_AD_CAMPAIGNS
+
+
+@pytest.fixture
+def service(monkeypatch):
+    catalog = AdCatalog(1, [dict(campaign, is_active=True) for campaign in DEFAULT_AD_CAMPAIGNS])
+    
+    async def load_ad_catalog():
+        return catalog
+    
+    monkeypatch.setattr(advertisement_service, "load_ad_catalog", load_ad_catalog)
+    return AdvertisementService()
+
+
+def _recommend(service, followers, **kwargs):
+    ads = asyncio.run(service.get_recommended_advertisements(
+        "creator", {"followers": followers, "engagement_rate": 1.0}, **kwargs
+    ))
+    return [ad["ad_id"] for ad in ads]
+
+
+@pytest.mark.parametrize("followers, expected", [
+    # 소형: 중형 이상용(ad_003)은 빠짐 (예전 필터는 5개 모두)
+    (0, ["ad_001", "ad_002", "ad_004", "ad_005"]),
+    (4999, ["ad_001", "ad_002", "ad_004", "ad_005"]),
+    # 중형: 소형~중형 광고도 포함 (예전 필터는 2개만 남아 앞 3개로 대체)
+    (5000, ["ad_001", "ad_002", "ad_003", "ad_004"]),
+    (19999, ["ad_001", "ad_002", "ad_003", "ad_004"]),
+    # 대형: 구간에 맞는 광고 다음에 카탈로그 순으로 3개까지 채움
+    (20000, ["ad_003", "ad_004", "ad_001"]),
+    (1000000, ["ad_003", "ad_004", "ad_001"]),
+])
+def test_recommendations_follow_campaign_follower_ranges(service, followers, expected):
+    assert _recommend(service, followers) == expected
+
+
+def test_category_filter_applies_to_top_up(service):
+    assert _recommend(service, 50000, category="펫 케어") == ["ad_004", "ad_001"]
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app.services.contract_service import RewardSettlementBatcher
+from app.services.local_chain import InMemoryChain
+
+
+def _submit_all(batcher, rewards):
+    async def main():
+        return await asyncio.gather(*[batcher.submit(*reward) for reward in rewards])
+    return asyncio.run(main())
+
+
+def test_batch_positions_follow_submission_order():
+    chain = InMemoryChain()
+    batcher = RewardSettlementBatcher(chain, max_size=3, max_delay=60)
+    
+    results = _submit_all(batcher, [("0xa", 100, "ev-a"), ("0xb", 200, "ev-b"), ("0xc", 300, "ev-c")])
+    
+    assert len({result["tx_hash"] for result in results}) == 1
+    assert [result["batch_index"] for result in results] == [0, 1, 2]
+    assert [result["batch_size"] for result in results] == [3, 3, 3]
+    receipt = chain.get_receipt(results[0]["tx_hash"])
+    assert [(t["to"], t["amount"], t["reference"]) for t in receipt["transfers"]] == [
+        ("0xa", 100, "ev-a"), ("0xb", 200, "ev-b"), ("0xc", 300, "ev-c")
+    ]
+    assert chain.transaction_count == 1
+
+
+def test_duplicate_reference_in_flight_is_paid_once():
+    chain = InMemoryChain()
+    batcher = RewardSettlementBatcher(chain, max_delay=0.01)
+    
+    first, second = _submit_all(batcher, [("0xa", 100, "ev-a"), ("0xa", 100, "ev-a")])
+    
+    assert first == second
+    assert chain.balance_of("0xa") == 100
+
+
+def test_duplicate_reference_after_settlement_returns_original_position():
+    chain = InMemoryChain()
+    first = _submit_all(RewardSettlementBatcher(chain, max_delay=0.01), [("0xa", 100, None), ("0xb", 200, "ev-b")])
+    
+    # 다른 배처(재시작한 워커)가 같은 보상을 다시 보냄: 체인의 참조 ID 확인으로 처음 위치 반환
+    again = _submit_all(RewardSettlementBatcher(chain, max_delay=0.01), [("0xb", 200, "ev-b")])
+    
+    assert again[0]["tx_hash"] == first[1]["tx_hash"]
+    assert again[0]["batch_index"] == 1
+    assert chain.balance_of("0xb") == 200
+    assert chain.transaction_count == 1
+
+
+def test_chain_skips_duplicate_reference_inside_batch():
+    chain = InMemoryChain()
+    receipt = asyncio.run(chain.send_multi_transfer([("0xa", 100), ("0xa", 100)], ["ev-a", "ev-a"]))
+    
+    assert [t["duplicate"] for t in receipt["transfers"]] == [False, True]
+    assert chain.balance_of("0xa") == 100
+
+
+def test_recorded_send_is_not_paid_again_without_process_memory():
+    chain = InMemoryChain()
+    journal = []
+    
+    async def record(sends):
+        journal.extend(sends)
+    
+    first = _submit_all(
+        RewardSettlementBatcher(chain, max_delay=0.01, journal=record),
+        [("0xa", 100, "ev-a"), ("0xb", 200, "ev-b")]
+    )
+    assert journal == [
+        {"evaluation_id": "ev-a", "tx_hash": first[0]["tx_hash"], "batch_index": 0},
+        {"evaluation_id": "ev-b", "tx_hash": first[0]["tx_hash"], "batch_index": 1},
+    ]
+    
+    # 참조 ID 색인이 없는 체인에서도 아웃박스 기록만으로 지급 여부를 확인
+    chain.references.clear()
+    previous = journal[1]
+    again = _submit_all(RewardSettlementBatcher(chain, max_delay=0.01), [("0xb", 200, "ev-b", previous)])
+    
+    assert again[0]["tx_hash"] == first[1]["tx_hash"]
+    assert again[0]["batch_index"] == 1
+    assert chain.balance_of("0xb") == 200
+    assert chain.transaction_count == 1
+
+
+def test_recorded_send_that_never_landed_is_sent_again():
+    chain = InMemoryChain()
+    unsent = chain.prepare_multi_transfer([("0xa", 100)], ["ev-a"])
+    previous = {"tx_hash": unsent["tx_hash"], "batch_index": 0}
+    
+    result = _submit_all(RewardSettlementBatcher(chain, max_delay=0.01), [("0xa", 100, "ev-a", previous)])[0]
+    
+    assert result["tx_hash"] != unsent["tx_hash"]
+    assert chain.balance_of("0xa") == 100
+
+
+def test_journal_failure_keeps_batch_off_chain():
+    chain = InMemoryChain()
+    
+    async def record(sends):
+        raise RuntimeError("database is locked")
+    
+    with pytest.raises(RuntimeError):
+        _submit_all(RewardSettlementBatcher(chain, max_delay=0.01, journal=record), [("0xa", 100, "ev-a")])
+    assert chain.transaction_count == 0
+    assert chain.balance_of("0xa") == 0
@@ -0,0 +1,159 @@
+import asyncio
+
+from app.services.tx_pipeline import LocalJsonRpcNode, TxPipeline
+
+SENDER = "0xsender"
+
+
+def _run(node, scenario, **options):
+    """파이프라인을 시작해 scenario(pipeline)를 실행하고 모니터를 멈춘 뒤 결과 반환"""
+    options.setdefault("poll_interval", 0.005)
+    options.setdefault("stuck_after", 0.02)
+    
+    async def main():
+        pipeline = TxPipeline(node, SENDER, **options)
+        await pipeline.start()
+        try:
+            return await asyncio.wait_for(scenario(pipeline), 10)
+        finally:
+            await pipeline.stop()
+    return asyncio.run(main())
+
+
+def test_concurrent_submits_take_consecutive_nonces():
+    node = LocalJsonRpcNode(block_time=0)
+    
+    async def scenario(pipeline):
+        return await asyncio.gather(*[pipeline.submit(f"0x{i}", 10) for i in range(5)])
+    
+    results = _run(node, scenario)
+    
+    assert sorted(result["nonce"] for result in results) == [0, 1, 2, 3, 4]
+    assert all(node.balance_of(f"0x{i}") == 10 for i in range(5))
+
+
+def test_duplicate_reference_is_sent_once():
+    node = LocalJsonRpcNode(block_time=0)
+    
+    async def scenario(pipeline):
+        return await asyncio.gather(pipeline.submit("0xa", 10, "ev-a"), pipeline.submit("0xa", 10, "ev-a"))
+    
+    first, second = _run(node, scenario)
+    
+    assert first == second
+    assert node.balance_of("0xa") == 10
+
+
+def test_dropped_transaction_is_refilled_with_same_nonce():
+    node = LocalJsonRpcNode(block_time=0, drop_rate=1.0)
+    
+    async def scenario(pipeline):
+        task = asyncio.create_task(pipeline.submit("0xa", 10))
+        while not pipeline.stats()["in_flight"]:
+            await asyncio.sleep(0.001)
+        node.drop_rate = 0.0
+        return await task, pipeline.stats()
+    
+    result, stats = _run(node, scenario)
+    
+    assert result["nonce"] == 0
+    assert stats["drop_refills"] >= 1
+    assert node.balance_of("0xa") == 10
+
+
+def test_released_nonce_gap_is_filled():
+    node = LocalJsonRpcNode(block_time=0)
+    
+    async def scenario(pipeline):
+        # 논스 0을 잡은 전송이 브로드캐스트 전에 실패해 반납되고, 논스 1이 그 뒤에서 대기
+        gap = await pipeline.nonces.acquire()
+        task = asyncio.create_task(pipeline.submit("0xa", 10))
+        while not pipeline.stats()["in_flight"]:
+            await asyncio.sleep(0.001)
+        pipeline.nonces.release(gap)
+        return await task, pipeline.stats()
+    
+    result, stats = _run(node, scenario)
+    
+    assert result["nonce"] == 1
+    assert stats["gap_fills"] == 1
+    assert node.balance_of("0xa") == 10
+    assert node.account_nonces[SENDER] == 2
+
+
+def test_stuck_transaction_is_rebroadcast_with_bumped_fee():
+    node = LocalJsonRpcNode(block_time=0, base_fee=1000)
+    
+    async def scenario(pipeline):
+        return await pipeline.submit("0xa", 10), pipeline.stats()
+    
+    # 기본 수수료의 절반으로 보내 포함되지 않게 함: 기본 수수료를 넘을 때까지 교체 전송
+    result, stats = _run(node, scenario, fee_multiplier=0.5)
+    
+    assert result["fee"] >= 1000
+    assert result["rebroadcasts"] == stats["fee_bumps"] >= 1
+    assert node.replaced >= 1
+    assert node.balance_of("0xa") == 10
+
+
+def test_recorded_nonce_returns_mined_receipt_after_restart():
+    node = LocalJsonRpcNode(block_time=0)
+    journal = []
+    
+    async def record(sends):
+        journal.extend(sends)
+    
+    async def first(pipeline):
+        return await pipeline.submit("0xa", 10, "ev-a")
+    
+    async def again(pipeline):
+        return await pipeline.submit("0xa", 10, "ev-a", previous=journal[0]), pipeline.nonces.next_nonce
+    
+    sent = _run(node, first, journal=record)
+    resumed, next_nonce = _run(node, again)
+    
+    assert journal == [{"evaluation_id": "ev-a", "tx_nonce": 0, "tx_sent_block": journal[0]["tx_sent_block"]}]
+    assert resumed["tx_hash"] == sent["tx_hash"]
+    assert node.balance_of("0xa") == 10
+    assert next_nonce == 1
+
+
+def test_recorded_nonce_used_by_another_transaction_sends_fresh():
+    node = LocalJsonRpcNode(block_time=0)
+    
+    async def other(pipeline):
+        return await pipeline.submit("0xb", 10, "ev-b")
+    
+    async def scenario(pipeline):
+        return await pipeline.submit("0xa", 10, "ev-a", previous={"tx_nonce": 0, "tx_sent_block": 0})
+    
+    _run(node, other)
+    result = _run(node, scenario)
+    
+    assert result["nonce"] == 1
+    assert node.balance_of("0xa") == 10
+
+
+def test_recorded_nonce_not_mined_is_resumed_on_same_nonce():
+    node = LocalJsonRpcNode(block_time=0, drop_rate=1.0)
+    journal = []
+    
+    async def record(sends):
+        journal.extend(sends)
+    
+    async def crashed(pipeline):
+        # 브로드캐스트 직후 프로세스가 죽음 (노드는 트랜잭션을 잃어버림)
+        asyncio.create_task(pipeline.submit("0xa", 10, "ev-a"))
+        while not pipeline.stats()["in_flight"]:
+            await asyncio.sleep(0.001)
+    
+    async def resumed(pipeline):
+        node.drop_rate = 0.0
+        return await pipeline.submit("0xa", 10, "ev-a", previous=journal[0]), pipeline.stats()
+    
+    _run(node, crashed, journal=record)
+    result, stats = _run(node, resumed)
+    
+    assert result["nonce"] == journal[0]["tx_nonce"] == 0
+    assert stats["fee_bumps"] >= 1
+    assert node.balance_of("0xa") == 10